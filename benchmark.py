@@ -0,0 +1,422 @@
+"""
+Офлайн-бенчмарк парсера концертов
+Поднимает локальный HTTP сервер, имитирующий museshow.ru/concerts/ и qtickets,
+запускает parse_concerts против него и сохраняет результаты в JSON
+"""
+
+import argparse
+import json
+import math
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+import concerts_parser
+
+
+CITIES = ["Москве", "Санкт-Петербурге", "Казани", "Екатеринбурге", "Новосибирске", "Сочи"]
+PROGRAMS = ["Оркестр при свечах", "Симфония № 5", "Хиты Queen", "Музыка Ханса Циммера", "Вивальди. Времена года"]
+VENUES = ["ДК Горбунова", "БКЗ Октябрьский", "Концертный зал Зарядье", "Дом музыки", "Филармония"]
+SECTIONS = ["Партер", "Амфитеатр", "Балкон", "Ложа"]
+MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня",
+          "июля", "августа", "сентября", "октября", "ноября", "декабря"]
+
+DEFAULT_RESULTS_DIR = "bench_results"
+
+# Бюджет времени импорта concerts_parser: тяжелые зависимости грузятся лениво
+IMPORT_BUDGET_MS = 150
+LAZY_MODULES = ("playwright", "pandas", "openpyxl", "pyarrow", "zstandard", "httpx", "selectolax", "asyncio")
+
+# Бесконечный скролл как у Elementor: при докрутке до низа догружает следующую
+# страницу по data-next-page якоря и переносит карточки в контейнер
+LISTING_SCRIPT = """
+<script>
+let loading = false;
+window.addEventListener("scroll", async () => {
+    const anchor = document.querySelector(".e-load-more-anchor");
+    if (loading || !anchor) return;
+    if (+anchor.dataset.page >= +anchor.dataset.maxPage) return;
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+    loading = true;
+    const html = await (await fetch(anchor.dataset.nextPage)).text();
+    const doc = new DOMParser().parseFromString(html, "text/html");
+    document.querySelector(".elementor-loop-container")
+        .append(...doc.querySelectorAll(".elementor-loop-container > div"));
+    anchor.replaceWith(doc.querySelector(".e-load-more-anchor"));
+    loading = false;
+});
+</script>
+"""
+
+# Схема зала внутри iframe: данные мест грузятся отдельным JSON запросом
+# (его же напрямую запрашивает --ticket-engine api), при наведении на секцию
+# показывается подсказка "Свободных мест: X"
+WIDGET_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"></head><body>
+<div id="tooltip"></div>
+<svg id="scheme" width="800" height="400"></svg>
+<script>
+fetch("/api/seats/{event_id}.json").then((r) => r.json()).then((data) => {{
+    const svg = document.getElementById("scheme");
+    data.zones.forEach((zone, i) => {{
+        const g = document.createElementNS("http://www.w3.org/2000/svg", "g");
+        const rect = document.createElementNS("http://www.w3.org/2000/svg", "rect");
+        rect.setAttribute("x", 20 + i * 90);
+        rect.setAttribute("y", 20);
+        rect.setAttribute("width", 80);
+        rect.setAttribute("height", 80);
+        g.appendChild(rect);
+        g.addEventListener("mouseover", () => {{
+            document.getElementById("tooltip").textContent =
+                zone.name + " 1 - " + zone.rows + " Свободных мест: " + zone.free_seats;
+        }});
+        svg.appendChild(g);
+    }});
+}});
+</script>
+</body></html>
+"""
+
+
+class StandInSite:
+    """
+    Синтетический museshow.ru + qtickets
+    
+    Карточки генерируются детерминированно по seed: часть распродана, часть
+    в продаже; среди концертов в продаже часть показывает плашку
+    "мероприятие прошло", остальные - iframe со схемой зала.
+    """
+    
+    def __init__(self, cards=50, page_size=None, on_sale_share=0.5, passed_share=0.1, seed=42, latency_ms=0):
+        self.cards = cards
+        # Лимит итераций скроллинга парсера - 50, поэтому страниц не больше ~20
+        self.page_size = page_size or max(12, math.ceil(cards / 20))
+        self.pages = max(1, math.ceil(cards / self.page_size))
+        self.latency_ms = latency_ms
+        
+        rng = random.Random(seed)
+        self.concerts = []
+        for idx in range(1, cards + 1):
+            on_sale = rng.random() < on_sale_share
+            self.concerts.append({
+                "id": idx,
+                "date": f"{rng.randint(1, 28)} {rng.choice(MONTHS)}",
+                "time": f"{rng.randint(12, 21)}:00",
+                "city": rng.choice(CITIES),
+                "program": rng.choice(PROGRAMS),
+                "venue": rng.choice(VENUES),
+                "on_sale": on_sale,
+                "passed": on_sale and rng.random() < passed_share,
+                "zones": [
+                    {"name": name, "rows": rng.randint(5, 30), "free_seats": rng.randint(0, 300)}
+                    for name in SECTIONS[:rng.randint(1, len(SECTIONS))]
+                ],
+            })
+    
+    def _card_html(self, concert, base):
+        if concert["on_sale"]:
+            button = (f'<a class="elementor-button" href="{base}/qtickets/event/{concert["id"]}">'
+                      f'<span class="elementor-button-text">Купить билет</span></a>')
+        else:
+            button = ('<a class="elementor-button" href="#">'
+                      '<span class="elementor-button-text">Все билеты проданы</span></a>')
+        return (
+            '<div class="e-loop-item">'
+            f'<div class="jet-listing-dynamic-field__content">{concert["date"]}</div>'
+            f'<div class="jet-listing-dynamic-field__content">{concert["time"]}</div>'
+            f'<div class="jet-listing-dynamic-field__content">{concert["venue"]}</div>'
+            f'<a href="{base}/concert-21-{concert["id"]}/">{concert["program"]} в {concert["city"]}</a>'
+            f'{button}</div>'
+        )
+    
+    def listing_page(self, page_num, base):
+        start = (page_num - 1) * self.page_size
+        cards = "".join(self._card_html(c, base) for c in self.concerts[start:start + self.page_size])
+        anchor = (f'<div class="e-load-more-anchor" data-page="{page_num}" data-max-page="{self.pages}" '
+                  f'data-next-page="{base}/concerts/page/{page_num + 1}/"></div>')
+        return (f'<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>'
+                f'<div class="elementor-loop-container">{cards}</div>{anchor}{LISTING_SCRIPT}</body></html>')
+    
+    def ticket_page(self, concert):
+        if concert["passed"]:
+            body = '<div class="jquery-message-container">Мероприятие прошло</div>'
+        else:
+            body = f'<iframe src="/qtickets/widget/{concert["id"]}" width="820" height="420"></iframe>'
+        return f'<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>{body}</body></html>'
+    
+    def route(self, path, base):
+        """(статус, content-type, тело) для пути запроса"""
+        parts = [part for part in path.split("/") if part]
+        
+        if parts == ["concerts"]:
+            return 200, "text/html", self.listing_page(1, base)
+        if len(parts) == 3 and parts[:2] == ["concerts", "page"] and parts[2].isdigit():
+            page_num = int(parts[2])
+            if 1 <= page_num <= self.pages:
+                return 200, "text/html", self.listing_page(page_num, base)
+        if len(parts) == 3 and parts[0] == "qtickets" and parts[2].isdigit():
+            concert_id = int(parts[2])
+            if 1 <= concert_id <= self.cards:
+                concert = self.concerts[concert_id - 1]
+                if parts[1] == "event":
+                    return 200, "text/html", self.ticket_page(concert)
+                if parts[1] == "widget":
+                    return 200, "text/html", WIDGET_TEMPLATE.format(event_id=concert_id)
+        if len(parts) == 3 and parts[:2] == ["api", "seats"] and parts[2].endswith(".json"):
+            concert_id = parts[2][:-len(".json")]
+            # Прошедшее мероприятие API не отдает - парсер проверяет его страницу в браузере
+            if concert_id.isdigit() and 1 <= int(concert_id) <= self.cards:
+                concert = self.concerts[int(concert_id) - 1]
+                if not concert["passed"]:
+                    return 200, "application/json", json.dumps({"zones": concert["zones"]}, ensure_ascii=False)
+        return 404, "text/plain", "not found"
+    
+    def expected_seats(self):
+        """Ожидаемые свободные места по ID концерта (для проверки результата)"""
+        return {c["id"]: sum(z["free_seats"] for z in c["zones"])
+                for c in self.concerts if c["on_sale"] and not c["passed"]}
+
+
+class StandInServer:
+    """Локальный HTTP сервер для StandInSite (в фоновом потоке)"""
+    
+    def __init__(self, site, host="127.0.0.1", port=0):
+        self.site = site
+        site_ref = site
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if site_ref.latency_ms:
+                    time.sleep(site_ref.latency_ms / 1000)
+                base = f"http://{self.headers.get('Host')}"
+                status, content_type, body = site_ref.route(urlparse(self.path).path, base)
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stand-in-server", daemon=True)
+    
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
+
+
+def git_revision():
+    """Текущий коммит (для сравнения результатов между коммитами)"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=Path(__file__).parent, text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def measure_import_time(repeat=5):
+    """
+    Время `import concerts_parser` в чистом процессе (минимум из repeat запусков)
+    
+    Returns:
+        dict: Время импорта в мс и тяжелые модули, загруженные при импорте
+    """
+    probe = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import concerts_parser\n"
+        "elapsed = (time.perf_counter() - started) * 1000\n"
+        "heavy = [name for name in %r if name in sys.modules]\n"
+        "print(elapsed, ','.join(heavy))\n"
+    ) % (LAZY_MODULES,)
+    package_dir = str(Path(__file__).parent)
+    # Первый запуск компилирует байткод, его не учитываем
+    subprocess.run([sys.executable, "-c", "import concerts_parser"], cwd=package_dir, check=True)
+    
+    timings = []
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", probe], cwd=package_dir, text=True).split()
+        timings.append(float(output[0]))
+        heavy = output[1].split(",") if len(output) > 1 else []
+    return {"import_ms": round(min(timings), 1), "heavy_modules": heavy}
+
+
+def run_benchmark(cards=50, engine="browser", concurrency=concerts_parser.DEFAULT_TICKET_CONCURRENCY,
+                  latency_ms=0, seed=42, ticket_engine="browser", memory_budget_mb=None, jsonl=False):
+    """
+    Один прогон parse_concerts против локального сервера
+    
+    С jsonl=True результаты пишутся в поток JSON lines (XLSX собирается из него
+    в конце), в результат попадает время до первой строки потока.
+    
+    Returns:
+        dict: Результат прогона (время, этапы, память, строк в секунду)
+    """
+    site = StandInSite(cards=cards, latency_ms=latency_ms, seed=seed)
+    
+    with StandInServer(site) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        started = time.monotonic()
+        summary = concerts_parser.parse_concerts(
+            ticket_concurrency=concurrency,
+            base_url=f"{server.base_url}/concerts/",
+            engine=engine,
+            cache_path=None,
+            output_path=str(Path(tmp_dir) / "bench.xlsx"),
+            metrics_json=None,
+            metrics_prom=None,
+            history_dir=None,
+            journal_path=None,
+            profile_path=None,
+            ticket_engine=ticket_engine,
+            memory_budget_mb=memory_budget_mb,
+            jsonl_path=str(Path(tmp_dir) / "bench.jsonl") if jsonl else None,
+        )
+        wall_time = time.monotonic() - started
+    
+    # Пик именно этого прогона (MemoryMonitor сбрасывается в parse_concerts), а не
+    # ru_maxrss - максимум за всю жизнь процесса
+    peak = summary["memory"]["peak"]
+    return {
+        "cards": cards,
+        "engine": engine,
+        "ticket_engine": ticket_engine,
+        "concurrency": concurrency,
+        "latency_ms": latency_ms,
+        "parsed": summary["parsed"],
+        "wall_time_s": round(wall_time, 3),
+        "rows_per_s": round(summary["parsed"] / wall_time, 2) if wall_time else None,
+        "stages": summary["stages"],
+        "ticket_api": summary.get("ticket_api"),
+        "peak_rss_mb": {"python": peak.get("python_rss_mb"), "browser": peak.get("browser_rss_mb")},
+        "memory": summary.get("memory"),
+        "jsonl": summary.get("jsonl"),
+    }
+
+
+def run_benchmark_isolated(**kwargs):
+    """
+    run_benchmark в отдельном процессе
+    
+    Пики памяти, кэши и прогретые модули одного прогона не переходят в
+    следующий, поэтому результаты разных размеров и движков сравнимы.
+    """
+    output = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--run-one", json.dumps(kwargs)],
+                            check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def compare_results(previous, current):
+    """Сравнение двух файлов результатов: изменение времени по совпадающим прогонам"""
+    def run_id(run):
+        return run["cards"], run["engine"], run.get("ticket_engine", "browser"), run["concurrency"], run["latency_ms"]
+    
+    previous_runs = {run_id(run): run for run in previous["runs"]}
+    lines = []
+    for run in current["runs"]:
+        old = previous_runs.get(run_id(run))
+        if not old:
+            continue
+        delta = (run["wall_time_s"] - old["wall_time_s"]) / old["wall_time_s"] * 100 if old["wall_time_s"] else 0
+        lines.append(f"{run['cards']:>5} карточек, {run['engine']:<7} {run.get('ticket_engine', 'browser'):<7}: "
+                     f"{old['wall_time_s']:.2f} с -> {run['wall_time_s']:.2f} с ({delta:+.1f}%)")
+    return lines
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Офлайн-бенчмарк парсера концертов")
+    arg_parser.add_argument("--cards", type=int, nargs="+", default=[50, 500],
+                            help="размеры списка концертов (например: 50 500 5000)")
+    arg_parser.add_argument("--engine", nargs="+", choices=["browser", "http"], default=["browser"])
+    arg_parser.add_argument("--ticket-engine", nargs="+", choices=["browser", "api"], default=["browser"],
+                            help="места: страницы билетов в браузере или API qtickets")
+    arg_parser.add_argument("--concurrency", type=int, default=concerts_parser.DEFAULT_TICKET_CONCURRENCY)
+    arg_parser.add_argument("--latency-ms", type=int, default=0, help="искусственная задержка ответов сервера")
+    arg_parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR, help="папка для JSON результатов")
+    arg_parser.add_argument("--compare", default=None, help="JSON предыдущего прогона для сравнения")
+    arg_parser.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                            help="бюджет памяти парсера и браузера, МБ (пересоздание страниц и контекстов)")
+    arg_parser.add_argument("--jsonl", action="store_true",
+                            help="писать результаты в поток JSON lines и замерить время до первой строки")
+    arg_parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                            help="бюджет времени импорта concerts_parser, мс (превышение - код выхода 1)")
+    arg_parser.add_argument("--import-only", action="store_true",
+                            help="только проверить время импорта, без прогонов парсера")
+    arg_parser.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+    
+    if args.run_one:
+        # Дочерний процесс run_benchmark_isolated: лог в stderr, результат - JSON в stdout
+        concerts_parser.setup_logging()
+        print(json.dumps(run_benchmark(**json.loads(args.run_one)), ensure_ascii=False))
+        return 0
+    
+    import_check = measure_import_time()
+    import_check["budget_ms"] = args.import_budget_ms
+    import_ok = import_check["import_ms"] <= args.import_budget_ms and not import_check["heavy_modules"]
+    print(f"Импорт concerts_parser: {import_check['import_ms']:.1f} мс (бюджет {args.import_budget_ms:.0f} мс)"
+          + (f", загружены при импорте: {', '.join(import_check['heavy_modules'])}"
+             if import_check["heavy_modules"] else ""))
+    if args.import_only:
+        return 0 if import_ok else 1
+    
+    runs = []
+    for cards in args.cards:
+        for engine in args.engine:
+            for ticket_engine in args.ticket_engine:
+                result = run_benchmark_isolated(cards=cards, engine=engine, concurrency=args.concurrency,
+                                                latency_ms=args.latency_ms, ticket_engine=ticket_engine,
+                                                memory_budget_mb=args.memory_budget, jsonl=args.jsonl)
+                runs.append(result)
+                stages = ", ".join(f"{stage} {stats['total']:.2f} с" for stage, stats in result["stages"].items())
+                first_line = (f", первая строка потока {result['jsonl']['first_line_s']} с"
+                              if result["jsonl"] else "")
+                print(f"{cards:>5} карточек, {engine:<7} {ticket_engine:<7}: {result['wall_time_s']:.2f} с, "
+                      f"{result['rows_per_s']} строк/с{first_line}, этапы: {stages}")
+    
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "import": import_check,
+        "runs": runs,
+    }
+    
+    results_dir = Path(args.results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    results_file = results_dir / f"bench_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{results['git_revision'] or 'nogit'}.json"
+    results_file.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результаты сохранены: {results_file}")
+    
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        for line in compare_results(previous, results):
+            print(line)
+    
+    if not import_ok:
+        print("Время импорта превышает бюджет")
+    return 0 if import_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,44 +4,472 @@
 С подробным логированием с ID концертов
 """
 
+import argparse
+import atexit
+import contextvars
+import hashlib
+import heapq
+import json
 import logging
+import math
+import os
+import queue
+import random
 import re
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait as futures_wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime
+from enum import StrEnum
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from urllib.parse import parse_qs, urljoin, urlparse
+
+
+# Ключ концерта, который сейчас обрабатывается (попадает в поле concert_key логов)
+current_concert_key = contextvars.ContextVar("current_concert_key", default=None)
+
+LOG_FORMAT = "[%(asctime)s] %(levelname)s - %(message)s"
+LOG_FILE = "parser.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Фоновый поток записи логов (QueueListener), см. setup_logging
+_log_listener = None
+
+
+class ConcertKeyFilter(logging.Filter):
+    """Добавляет в запись ключ текущего концерта из contextvar (в потоке, который пишет лог)"""
+    
+    def filter(self, record):
+        record.concert_key = current_concert_key.get()
+        return True
+
+
+class InProcessQueueHandler(QueueHandler):
+    """
+    QueueHandler для очереди внутри процесса
+    
+    Стандартный prepare() форматирует сообщение и traceback в потоке, который
+    пишет лог, и убирает exc_info (запись готовится к pickle). Очереди внутри
+    процесса pickle не нужен: запись передается как есть, сообщение и traceback
+    форматирует поток QueueListener.
+    """
+    
+    def prepare(self, record):
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Компактный формат JSON lines: одна запись - одна строка"""
+    
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        concert_key = getattr(record, "concert_key", None)
+        if concert_key:
+            entry["concert_key"] = concert_key
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
 
 
 # Настройка логирования
-def setup_logging():
-    """Настройка системы логирования"""
-    log_format = "[%(asctime)s] %(levelname)s - %(message)s"
+def setup_logging(level=logging.INFO, log_format="text", log_file=LOG_FILE,
+                  max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """
+    Настройка системы логирования
+    
+    Поток парсера только кладет записи в очередь (QueueHandler), запись в файл
+    с ротацией по размеру и вывод в консоль выполняет фоновый QueueListener.
+    Повторный вызов перенастраивает логгер без дублирования обработчиков.
+    
+    Args:
+        level: Уровень логгера (INFO - рабочий режим, DEBUG - подробности по селекторам)
+        log_format: "text" - читаемый формат, "json" - JSON lines с полем concert_key
+        log_file: Файл лога (None - только консоль)
+        max_bytes: Размер файла лога, после которого он ротируется
+        backup_count: Сколько старых файлов лога хранить
+    """
+    global _log_listener
     
     # Создаем логгер
     logger = logging.getLogger("museshow_parser")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(level)
+    logger.propagate = False
+    
+    # Останавливаем прежний слушатель и убираем прежние обработчики
+    if _log_listener:
+        _log_listener.stop()
+        _log_listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
     
-    # Обработчик для файла
-    file_handler = logging.FileHandler("parser.log", encoding="utf-8")
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(logging.Formatter(log_format))
+    formatter = JsonLinesFormatter() if log_format == "json" else logging.Formatter(LOG_FORMAT)
+    handlers = []
+    
+    # Обработчик для файла (с ротацией по размеру)
+    if log_file:
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
     
     # Обработчик для консоли
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter(log_format))
+    console_handler.setFormatter(formatter)
+    handlers.append(console_handler)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = InProcessQueueHandler(log_queue)
+    queue_handler.addFilter(ConcertKeyFilter())
+    logger.addHandler(queue_handler)
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
     
     return logger
 
 
-# Инициализация логгера
-logger = setup_logging()
+def _stop_log_listener():
+    """Дописать оставшиеся в очереди записи при выходе (повторный вызов безопасен)"""
+    global _log_listener
+    
+    if _log_listener:
+        _log_listener.stop()
+        _log_listener = None
+
+
+atexit.register(_stop_log_listener)
+
+
+# Логгер модуля; обработчики подключает setup_logging (вызывается из main),
+# импорт модуля не открывает файл лога
+logger = logging.getLogger("museshow_parser")
+
+# Параметры контекста браузера (общие для страницы концертов и пула страниц билетов)
+BROWSER_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+}
+
+# Страница со списком концертов
+BASE_URL = "https://museshow.ru/concerts/"
+
+# Параллельная загрузка страниц билетов
+DEFAULT_TICKET_CONCURRENCY = 4
+DEFAULT_PER_HOST_LIMIT = 2
+# Как часто сохранять готовые результаты, пока список еще загружается (с)
+COLLECT_POLL_INTERVAL = 0.2
+
+
+class RunMetrics:
+    """
+    Длительности этапов запуска: count, total и перцентили p50/p95/p99
+    
+    Запись - одно добавление float в список, поэтому спаны можно оставлять
+    включенными в продакшене. Подходит и для async кода (замеряется wall time).
+    
+    Использование:
+        with metrics.span("page_goto"):
+            page.goto(url)
+    
+    В конце каждого спана MemoryMonitor снимает замер памяти для этапа.
+    Словарь timings дополнительно получает длительность спана по имени этапа
+    (длительности этапов одного концерта для потока JSON lines).
+    """
+    
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self._samples = {}
+        self.gauges = {}
+        self.started_at = time.time()
+    
+    def record(self, stage, seconds):
+        self._samples.setdefault(stage, []).append(seconds)
+    
+    @contextmanager
+    def span(self, stage, timings=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.record(stage, elapsed)
+            if timings is not None:
+                timings[stage] = elapsed
+            memory.sample(stage)
+    
+    def set_gauge(self, name, value):
+        """Итоговое значение запуска (количество концертов, попадания кэша и т.д.)"""
+        self.gauges[name] = value
+    
+    @staticmethod
+    def _quantile(sorted_samples, q):
+        # Метод ближайшего ранга
+        index = max(0, math.ceil(q * len(sorted_samples)) - 1)
+        return sorted_samples[index]
+    
+    def summary(self):
+        """
+        Returns:
+            dict: {этап: {"count", "total", "p50", "p95", "p99", "max"}} (секунды)
+        """
+        result = {}
+        for stage, samples in list(self._samples.items()):
+            ordered = sorted(samples)
+            stats = {"count": len(ordered), "total": round(sum(ordered), 6)}
+            for q in self.QUANTILES:
+                stats[f"p{round(q * 100)}"] = round(self._quantile(ordered, q), 6)
+            stats["max"] = round(ordered[-1], 6)
+            result[stage] = stats
+        return result
+    
+    def write_json(self, path):
+        """JSON сводка запуска"""
+        data = {
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "gauges": self.gauges,
+            "stages": self.summary(),
+        }
+        _write_atomic(path, json.dumps(data, ensure_ascii=False, indent=2))
+    
+    def write_prometheus(self, path, prefix="museshow_parser"):
+        """Файл в текстовом формате Prometheus для textfile collector node_exporter"""
+        metric = f"{prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {metric} Длительность этапов последнего запуска парсера",
+            f"# TYPE {metric} summary",
+        ]
+        for stage, stats in self.summary().items():
+            for q in self.QUANTILES:
+                lines.append(f'{metric}{{stage="{stage}",quantile="{q}"}} {stats[f"p{round(q * 100)}"]}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {stats["total"]}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {stats["count"]}')
+        
+        for name, value in self.gauges.items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{prefix}_last_run_timestamp_seconds {self.started_at:.0f}")
+        
+        # textfile collector читает файл в любой момент - пишем атомарно
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Метрики текущего запуска (сбрасываются в начале parse_concerts)
+metrics = RunMetrics()
+
+
+# Замеры памяти не чаще, чем раз в MEMORY_SAMPLE_INTERVAL секунд (обход /proc)
+MEMORY_SAMPLE_INTERVAL = 0.5
+_PAGE_SIZE_MB = os.sysconf("SC_PAGE_SIZE") / 1024 / 1024 if hasattr(os, "sysconf") else None
+
+
+def _process_rss_mb(pid):
+    """RSS процесса по /proc/<pid>/statm, МБ (None - процесса нет или не Linux)"""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE_MB
+    except (OSError, ValueError, IndexError, TypeError):
+        return None
+
+
+def child_processes_rss_mb(pid=None):
+    """
+    Суммарный RSS всех потомков процесса (драйвер Playwright, Chromium, рабочие процессы), МБ
+    
+    Returns:
+        float или None: None - /proc недоступен (не Linux)
+    """
+    pid = os.getpid() if pid is None else pid
+    try:
+        entries = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    
+    children = {}
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Имя процесса в скобках может содержать пробелы - поля после последней ")"
+        ppid = int(stat[stat.rfind(b")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    
+    total = 0.0
+    stack = list(children.get(pid, ()))
+    while stack:
+        child = stack.pop()
+        total += _process_rss_mb(child) or 0.0
+        stack.extend(children.get(child, ()))
+    return total
+
+
+class MemoryMonitor:
+    """
+    Память парсера и браузера по этапам с отметками максимума
+    
+    Замер: RSS процесса Python, куча Python по tracemalloc (если включен
+    trace_python) и суммарный RSS дочерних процессов (Playwright, Chromium).
+    Для каждого этапа хранится максимум. Если задан budget_mb, over_budget()
+    сообщает о превышении суммарного RSS - пулы страниц по нему пересоздают
+    страницы и контексты браузера.
+    
+    Использование:
+        memory.configure(budget_mb=2048, trace_python=True)
+        memory.sample("ticket_page_load")
+        if memory.over_budget():
+            ...
+    """
+    
+    def __init__(self, budget_mb=None, trace_python=False):
+        self._lock = threading.Lock()
+        self.configure(budget_mb, trace_python)
+    
+    def configure(self, budget_mb=None, trace_python=False):
+        """Бюджет памяти (МБ, None - только замеры) и замер кучи Python через tracemalloc"""
+        self.budget_mb = budget_mb
+        self.trace_python = trace_python
+        if trace_python or "tracemalloc" in sys.modules:
+            import tracemalloc
+            
+            if trace_python and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif not trace_python and tracemalloc.is_tracing():
+                tracemalloc.stop()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.recycles = 0
+            self.last = None
+            self._last_sampled = 0.0
+        if self.trace_python:
+            import tracemalloc
+            
+            tracemalloc.reset_peak()
+    
+    def sample(self, stage="", force=False):
+        """
+        Замер памяти с отметкой максимума этапа (не чаще MEMORY_SAMPLE_INTERVAL,
+        первый замер нового этапа - сразу)
+        
+        Returns:
+            dict: {"python_rss_mb", "python_heap_mb", "browser_rss_mb"} последнего замера
+        """
+        now = time.monotonic()
+        if (not force and self.last is not None and stage in self.stages
+                and now - self._last_sampled < MEMORY_SAMPLE_INTERVAL):
+            return self.last
+        self._last_sampled = now
+        
+        python_heap = None
+        if self.trace_python:
+            import tracemalloc
+            
+            python_heap = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        current = {
+            "python_rss_mb": _process_rss_mb(os.getpid()),
+            "python_heap_mb": python_heap,
+            "browser_rss_mb": child_processes_rss_mb(),
+        }
+        with self._lock:
+            self.last = current
+            marks = self.stages.setdefault(stage, {})
+            for name, value in current.items():
+                if value is not None and value > marks.get(name, 0.0):
+                    marks[name] = value
+        return current
+    
+    def total_mb(self):
+        """Суммарный RSS парсера и дочерних процессов по последнему замеру"""
+        if self.last is None:
+            return None
+        return (self.last["python_rss_mb"] or 0.0) + (self.last["browser_rss_mb"] or 0.0)
+    
+    def over_budget(self):
+        """Суммарный RSS превысил бюджет (без бюджета - всегда False)"""
+        if not self.budget_mb:
+            return False
+        total = self.total_mb()
+        return total is not None and total > self.budget_mb
+    
+    def record_recycle(self, what):
+        """Учет пересоздания страниц/контекста по бюджету (новый замер - сразу)"""
+        with self._lock:
+            self.recycles += 1
+        logger.warning("Память %.0f МБ больше бюджета %s МБ: %s", self.total_mb() or 0.0, self.budget_mb, what)
+    
+    def summary(self):
+        """
+        Returns:
+            dict: {"peak": {замер: МБ}, "stages": {этап: {замер: МБ}}, "recycles": int}
+        """
+        with self._lock:
+            stages = {stage: {name: round(value, 1) for name, value in marks.items()}
+                      for stage, marks in self.stages.items()}
+            recycles = self.recycles
+        peak = {}
+        for marks in stages.values():
+            for name, value in marks.items():
+                peak[name] = max(peak.get(name, 0.0), value)
+        return {"peak": peak, "stages": stages, "recycles": recycles}
+    
+    def update_gauges(self):
+        """Максимумы памяти и число пересозданий в метрики запуска"""
+        summary = self.summary()
+        for name, value in summary["peak"].items():
+            metrics.set_gauge(f"memory_{name.replace('_mb', '')}_peak_mb", value)
+        metrics.set_gauge("memory_recycles", summary["recycles"])
+        return summary
+    
+    def log_summary(self):
+        """Максимумы памяти по этапам в лог и в метрики"""
+        summary = self.update_gauges()
+        for stage, marks in sorted(summary["stages"].items(), key=lambda item: -item[1].get("browser_rss_mb", 0)):
+            logger.info("Память на этапе %s: %s", stage or "-",
+                        ", ".join(f"{name} {value:.0f}" for name, value in marks.items()))
+        peak = summary["peak"]
+        logger.info("Максимум памяти: Python %s МБ (куча %s МБ), браузер %s МБ, пересоздано по бюджету: %s",
+                    _format_mb(peak.get("python_rss_mb")), _format_mb(peak.get("python_heap_mb")),
+                    _format_mb(peak.get("browser_rss_mb")), summary["recycles"])
+        return summary
+
+
+def _format_mb(value):
+    return "-" if value is None else f"{value:.0f}"
+
+
+# Память текущего запуска (бюджет задается в parse_concerts/ConcertDaemon)
+memory = MemoryMonitor()
+
+# Файлы метрик по умолчанию
+DEFAULT_METRICS_JSON = "parser_metrics.json"
+DEFAULT_METRICS_PROM = "parser_metrics.prom"
 
 
 def get_xlsx_filename_with_timestamp():
@@ -52,131 +480,731 @@ def get_xlsx_filename_with_timestamp():
     """
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     filename = f"concerts_{timestamp}.xlsx"
-    logger.info(f"Создан файл: {filename}")
+    logger.info("Создан файл: %s", filename)
     return filename
 
 
+# Оформление XLSX отчета (общие объекты стилей, создаются один раз)
+XLSX_SHEET_TITLE = "Концерты"
+XLSX_HEADERS = ["Дата концерта", "Город", "Площадка", "Программа", "Статус билетов", "Вместимость зала"]
+XLSX_COLUMN_WIDTHS = {
+    'A': 15,  # Дата
+    'B': 20,  # Город
+    'C': 35,  # Площадка
+    'D': 40,  # Программа
+    'E': 20,  # Статус
+    'F': 18,  # Вместимость
+}
+# Дата, Город, Статус, Вместимость - по центру; Площадка, Программа - по левому краю
+XLSX_CENTER_COLUMNS = (1, 2, 5, 6)
+
+@lru_cache(maxsize=None)
+def xlsx_styles():
+    """
+    Объекты стилей openpyxl для заголовка и строк
+    
+    Создаются при первой записи XLSX, чтобы импорт модуля не загружал openpyxl.
+    
+    Returns:
+        dict: header_fill, header_font, header_alignment, header_border,
+            row_border, row_alignment_left, row_alignment_center, row_even_fill
+    """
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    
+    return {
+        "header_fill": PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+        "header_font": Font(bold=True, color="FFFFFF", size=12),
+        "header_alignment": Alignment(horizontal="center", vertical="center", wrap_text=True),
+        "header_border": Border(
+            left=Side(style='thin', color='000000'),
+            right=Side(style='thin', color='000000'),
+            top=Side(style='thin', color='000000'),
+            bottom=Side(style='thin', color='000000')
+        ),
+        "row_border": Border(
+            left=Side(style='thin', color='D3D3D3'),
+            right=Side(style='thin', color='D3D3D3'),
+            top=Side(style='thin', color='D3D3D3'),
+            bottom=Side(style='thin', color='D3D3D3')
+        ),
+        "row_alignment_left": Alignment(horizontal="left", vertical="center", wrap_text=True),
+        "row_alignment_center": Alignment(horizontal="center", vertical="center"),
+        "row_even_fill": PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid"),
+    }
+
+
+def concert_to_row(concert_data):
+    """Преобразование записи концерта (ConcertRecord или прежний dict) в строку XLSX"""
+    if isinstance(concert_data, dict):
+        concert_data = ConcertRecord.from_dict(concert_data)
+    return concert_data.to_row()
+
+
 def init_xlsx_file(filename="concerts.xlsx"):
     """Инициализация XLSX файла с красивым форматированием"""
-    logger.info(f"Инициализация XLSX файла: {filename}")
+    from openpyxl import Workbook
+    
+    logger.info("Инициализация XLSX файла: %s", filename)
+    styles = xlsx_styles()
     
     # Создаем новую книгу
     wb = Workbook()
     ws = wb.active
-    ws.title = "Концерты"
+    ws.title = XLSX_SHEET_TITLE
     
     # Заголовки на русском
-    headers = ["Дата концерта", "Город", "Площадка", "Программа", "Статус билетов", "Вместимость зала"]
-    ws.append(headers)
+    ws.append(XLSX_HEADERS)
     
     # Стилизация заголовков
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    
-    border_style = Border(
-        left=Side(style='thin', color='000000'),
-        right=Side(style='thin', color='000000'),
-        top=Side(style='thin', color='000000'),
-        bottom=Side(style='thin', color='000000')
-    )
-    
-    for col_num, header in enumerate(headers, 1):
+    for col_num, header in enumerate(XLSX_HEADERS, 1):
         cell = ws.cell(row=1, column=col_num)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-        cell.border = border_style
+        cell.fill = styles["header_fill"]
+        cell.font = styles["header_font"]
+        cell.alignment = styles["header_alignment"]
+        cell.border = styles["header_border"]
     
     # Устанавливаем ширину столбцов
-    ws.column_dimensions['A'].width = 15  # Дата
-    ws.column_dimensions['B'].width = 20  # Город
-    ws.column_dimensions['C'].width = 35  # Площадка
-    ws.column_dimensions['D'].width = 40  # Программа
-    ws.column_dimensions['E'].width = 20  # Статус
-    ws.column_dimensions['F'].width = 18  # Вместимость
+    for column, width in XLSX_COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
     
     # Закрепляем первую строку
     ws.freeze_panes = 'A2'
     
     wb.save(filename)
-    logger.info(f"XLSX файл создан с заголовками: {headers}")
+    logger.info("XLSX файл создан с заголовками: %s", XLSX_HEADERS)
 
 
 def save_concert_to_xlsx(concert_data, filename="concerts.xlsx"):
-    """Сохранение данных концерта в XLSX файл"""
-    logger.info(f"Сохранение концерта в XLSX: {concert_data}")
+    """Сохранение данных концерта в XLSX файл
+    
+    Открывает и пересохраняет файл целиком на каждый вызов - подходит
+    для единичных дописываний. Для пакетной записи используйте ConcertXlsxWriter.
+    """
+    logger.info("Сохранение концерта в XLSX: %s", concert_data)
     
     # Открываем существующий файл
     from openpyxl import load_workbook
+    styles = xlsx_styles()
     wb = load_workbook(filename)
     ws = wb.active
     
     # Добавляем строку с данными
-    row_data = [
-        concert_data.get("date", ""),
-        concert_data.get("city", ""),
-        concert_data.get("venue", ""),
-        concert_data.get("program", ""),
-        concert_data.get("ticket_status", ""),
-        concert_data.get("available_seats", "")
-    ]
-    ws.append(row_data)
+    ws.append(concert_to_row(concert_data))
     
     # Применяем стили к новой строке
     row_num = ws.max_row
-    border_style = Border(
-        left=Side(style='thin', color='D3D3D3'),
-        right=Side(style='thin', color='D3D3D3'),
-        top=Side(style='thin', color='D3D3D3'),
-        bottom=Side(style='thin', color='D3D3D3')
-    )
-    
-    alignment_left = Alignment(horizontal="left", vertical="center", wrap_text=True)
-    alignment_center = Alignment(horizontal="center", vertical="center")
-    
-    for col_num in range(1, 7):
+    for col_num in range(1, len(XLSX_HEADERS) + 1):
         cell = ws.cell(row=row_num, column=col_num)
-        cell.border = border_style
+        cell.border = styles["row_border"]
         
         # Выравнивание
-        if col_num in [1, 2, 5, 6]:  # Дата, Город, Статус, Вместимость - по центру
-            cell.alignment = alignment_center
-        else:  # Площадка, Программа - по левому краю
-            cell.alignment = alignment_left
+        if col_num in XLSX_CENTER_COLUMNS:
+            cell.alignment = styles["row_alignment_center"]
+        else:
+            cell.alignment = styles["row_alignment_left"]
         
         # Цвет строки (чередование)
         if row_num % 2 == 0:
-            cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
+            cell.fill = styles["row_even_fill"]
     
     wb.save(filename)
     logger.info("Концерт успешно сохранен в XLSX")
 
 
-def parse_available_seats(iframe, concert_idx):
+class ConcertXlsxWriter:
+    """
+    Потоковая запись концертов в XLSX
+    
+    Файл открывается один раз на весь запуск. Строки копятся в буфере и
+    пачками по batch_size сбрасываются в книгу openpyxl в write-only режиме
+    с общими именованными стилями (без создания объектов стилей на каждую ячейку).
+    Каждые checkpoint_every строк целевой файл атомарно перезаписывается
+    снимком всех строк, поэтому даже убитый процесс оставляет валидный XLSX.
+    checkpoint_every=None - без контрольных точек, файл пишется один раз при
+    закрытии (сборка отчета из готовых записей, см. save_concerts_xlsx).
+    
+    Использование:
+        with ConcertXlsxWriter("concerts.xlsx") as writer:
+            writer.add(concert_data)
+    """
+    
+    HEADER_STYLE = "concert_header"
+    ROW_STYLES = {
+        # (по центру, четная строка) -> имя стиля
+        (True, False): "concert_center",
+        (False, False): "concert_left",
+        (True, True): "concert_center_even",
+        (False, True): "concert_left_even",
+    }
+    
+    def __init__(self, filename="concerts.xlsx", batch_size=50, checkpoint_every=100):
+        self.filename = str(filename)
+        self.batch_size = max(1, batch_size)
+        self.checkpoint_every = max(1, checkpoint_every) if checkpoint_every else None
+        self.rows_written = 0
+        
+        self._rows = []      # все строки запуска (нужны для контрольных точек)
+        self._pending = []   # строки, еще не сброшенные в книгу
+        self._rows_since_checkpoint = 0
+        self._closed = False
+        
+        self._wb, self._ws = self._new_workbook()
+        logger.info("Инициализация XLSX файла: %s (пачка: %s, контрольная точка: %s)",
+                    self.filename, self.batch_size, self.checkpoint_every)
+        # Сразу создаем файл с заголовками, как и раньше
+        if self.checkpoint_every:
+            self.checkpoint()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def _new_workbook(self):
+        """Создание write-only книги с заголовками, шириной столбцов и именованными стилями"""
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import NamedStyle
+        
+        self._cell_class = WriteOnlyCell
+        styles = xlsx_styles()
+        wb = Workbook(write_only=True)
+        
+        wb.add_named_style(NamedStyle(
+            name=self.HEADER_STYLE,
+            font=styles["header_font"],
+            fill=styles["header_fill"],
+            alignment=styles["header_alignment"],
+            border=styles["header_border"],
+        ))
+        for (centered, even), style_name in self.ROW_STYLES.items():
+            style = NamedStyle(
+                name=style_name,
+                border=styles["row_border"],
+                alignment=styles["row_alignment_center"] if centered else styles["row_alignment_left"],
+            )
+            if even:
+                style.fill = styles["row_even_fill"]
+            wb.add_named_style(style)
+        
+        ws = wb.create_sheet(XLSX_SHEET_TITLE)
+        # Ширина столбцов и закрепление задаются до записи строк
+        for column, width in XLSX_COLUMN_WIDTHS.items():
+            ws.column_dimensions[column].width = width
+        ws.freeze_panes = 'A2'
+        
+        ws.append([self._styled_cell(ws, header, self.HEADER_STYLE) for header in XLSX_HEADERS])
+        return wb, ws
+    
+    def _styled_cell(self, ws, value, style_name):
+        cell = self._cell_class(ws, value=value)
+        cell.style = style_name
+        return cell
+    
+    def _append_rows(self, ws, rows, first_row_num):
+        """Запись строк в write-only лист (first_row_num - номер строки в Excel)"""
+        for row_num, row in enumerate(rows, first_row_num):
+            even = row_num % 2 == 0
+            ws.append([
+                self._styled_cell(ws, value, self.ROW_STYLES[(col_num in XLSX_CENTER_COLUMNS, even)])
+                for col_num, value in enumerate(row, 1)
+            ])
+    
+    def _save_atomic(self, wb):
+        """Сохранение книги во временный файл и атомарная подмена целевого"""
+        tmp_filename = f"{self.filename}.tmp"
+        wb.save(tmp_filename)
+        os.replace(tmp_filename, self.filename)
+    
+    def add(self, concert_data):
+        """Добавление концерта в буфер (сброс и контрольная точка - по порогам)"""
+        if self._closed:
+            raise RuntimeError(f"XLSX файл уже закрыт: {self.filename}")
+        
+        with metrics.span("xlsx_save"):
+            self._add_row(concert_to_row(concert_data))
+    
+    def _add_row(self, row):
+        if self.checkpoint_every:
+            self._rows.append(row)
+        self._pending.append(row)
+        self._rows_since_checkpoint += 1
+        
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        if self.checkpoint_every and self._rows_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+    
+    def flush(self):
+        """Сброс буфера в write-only книгу"""
+        if not self._pending:
+            return
+        # Строка 1 - заголовки, данные начинаются со строки 2
+        first_row_num = self.rows_written + 2
+        self._append_rows(self._ws, self._pending, first_row_num)
+        self.rows_written += len(self._pending)
+        logger.debug("XLSX: записано строк %s (всего %s)", len(self._pending), self.rows_written)
+        self._pending = []
+    
+    def checkpoint(self):
+        """Атомарная запись снимка всех строк в целевой файл
+        
+        Write-only книгу можно сохранить лишь один раз, поэтому снимок
+        собирается в отдельной книге из накопленных строк.
+        """
+        wb, ws = self._new_workbook()
+        self._append_rows(ws, self._rows, 2)
+        self._save_atomic(wb)
+        self._rows_since_checkpoint = 0
+        logger.info("XLSX: контрольная точка сохранена (%s строк) -> %s", len(self._rows), self.filename)
+    
+    def close(self):
+        """Финальный сброс буфера и сохранение файла"""
+        if self._closed:
+            return
+        with metrics.span("xlsx_save"):
+            self.flush()
+            self._save_atomic(self._wb)
+        self._closed = True
+        logger.info("XLSX файл сохранен: %s (%s строк)", self.filename, self.rows_written)
+
+
+def save_concerts_xlsx(records, filename):
+    """
+    XLSX отчет одним проходом по готовым записям концертов
+    
+    Без контрольных точек и промежуточных сохранений: строки пишутся одной
+    пачкой в write-only книгу, файл сохраняется один раз.
+    
+    Returns:
+        int: Количество записанных строк
+    """
+    records = list(records)
+    with ConcertXlsxWriter(filename, batch_size=max(1, len(records)), checkpoint_every=None) as writer:
+        for concert_data in records:
+            writer.add(concert_data)
+    return writer.rows_written
+
+
+def timing_callback(timings, stage):
+    """Callback для Future: время от постановки задачи до результата -> timings[stage]"""
+    started = time.perf_counter()
+    
+    def done(_future):
+        timings[stage] = time.perf_counter() - started
+    
+    return done
+
+
+class ConcertJsonlSink:
+    """
+    Потоковая запись концертов в JSON lines
+    
+    Одна строка - один концерт: пишется, как только запись концерта
+    окончательна, и сбрасывается сразу (читателю не нужно ждать конца запуска
+    и закрытия XLSX). В строке: run_id запуска, номер карточки idx, источник
+    данных source (page - страница билетов, card - карточка без билетов, cache,
+    journal), поля ConcertRecord.to_dict, длительности этапов концерта stages
+    (секунды) и время записи emitted_at.
+    
+    target: "-" - stdout (лог идет в stderr), путь к файлу (дописывается) или
+    именованный канал (FIFO, открытие ждет читателя). Если читатель закрыл
+    канал, запись в поток прекращается, а запуск продолжается.
+    
+    Использование:
+        with ConcertJsonlSink("concerts.jsonl", run_id="2025-10-22_00-45-30") as sink:
+            sink.write(concert_data, idx=1, source="page", stages={"ticket_page": 1.2})
+    """
+    
+    def __init__(self, target="-", run_id=None):
+        self.target = str(target)
+        self.run_id = run_id
+        self.lines_written = 0
+        self.first_line_at = None  # time.perf_counter() первой строки
+        self._closed = False
+        
+        if self.target == "-":
+            self._file = sys.stdout
+        else:
+            if Path(self.target).is_fifo():
+                logger.info("JSON lines: ожидание читателя канала %s", self.target)
+            self._file = open(self.target, "a", encoding="utf-8", buffering=1)
+        logger.info("JSON lines: поток концертов -> %s", "stdout" if self.target == "-" else self.target)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def write(self, concert_data, idx=None, source="page", stages=None):
+        """
+        Строка концерта в поток со сбросом буфера
+        
+        Returns:
+            bool: False, если поток уже отключен
+        """
+        if self._file is None:
+            return False
+        line = {"run_id": self.run_id, "idx": idx, "source": source, **concert_data.to_dict(),
+                "stages": {stage: round(seconds, 6) for stage, seconds in (stages or {}).items()},
+                "emitted_at": datetime.now().isoformat(timespec="milliseconds")}
+        try:
+            with metrics.span("jsonl_write"):
+                self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+                self._file.flush()
+        except OSError as e:
+            # BrokenPipeError - читатель канала или stdout закрыл его
+            logger.error("✗ Поток JSON lines отключен (%s): %s", self.target, e)
+            self._release()
+            return False
+        
+        if self.first_line_at is None:
+            self.first_line_at = time.perf_counter()
+        self.lines_written += 1
+        return True
+    
+    def _release(self):
+        if self._file is not None and self._file is not sys.stdout:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+        self._file = None
+    
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._release()
+        logger.info("JSON lines: записано строк %s -> %s", self.lines_written,
+                    "stdout" if self.target == "-" else self.target)
+
+
+def read_concerts_jsonl(path, run_id=None):
+    """
+    Записи концертов из потока ConcertJsonlSink
+    
+    Для каждого концерта берется последняя строка (в режиме демона концерт
+    пишется при каждом опросе), записи сортируются по номеру карточки.
+    
+    Args:
+        path: Файл JSON lines
+        run_id: Запуск (None - запуск последней строки файла)
+    
+    Returns:
+        tuple: (run_id, список ConcertRecord в порядке карточек)
+    """
+    runs = {}
+    last_run_id = None
+    with open(path, encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("JSON lines: строка %s не разобрана, пропущена", line_num)
+                continue
+            last_run_id = data.get("run_id")
+            records = runs.setdefault(last_run_id, {})
+            records[data.get("key") or data.get("idx")] = data
+    
+    run_id = last_run_id if run_id is None else run_id
+    lines = sorted(runs.get(run_id, {}).values(), key=lambda data: data.get("idx") or 0)
+    return run_id, [ConcertRecord.from_dict(data) for data in lines]
+
+
+# Сторонние трекеры и реклама (блокируются по домену)
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "mc.yandex.ru",
+    "mc.yandex.com",
+    "an.yandex.ru",
+    "top-fwz1.mail.ru",
+    "connect.facebook.net",
+    "vk.com/rtrg",
+    "top.mail.ru",
+)
+
+
+class ResourcePolicy:
+    """
+    Политика блокировки тяжелых ресурсов через context.route
+    
+    Отменяет картинки, медиа и шрифты (по типу ресурса) и трекеры (по домену).
+    Ресурсы с доменов из allowed_domains не блокируются никогда - это хосты
+    схемы зала, которой нужны свои стили, скрипты и SVG.
+    Считает заблокированные запросы по типам и объем загруженных ответов.
+    """
+    
+    def __init__(self, blocked_types=("image", "media", "font"), blocked_domains=TRACKER_DOMAINS,
+                 allowed_domains=("qtickets",), fast_wait=True):
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.allowed_domains = tuple(allowed_domains)
+        # domcontentloaded + явные проверки готовности вместо networkidle
+        self.fast_wait = fast_wait
+        
+        self.blocked = {}
+        self.allowed_requests = 0
+        self.loaded_bytes = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def wait_until(self):
+        return "domcontentloaded" if self.fast_wait else "networkidle"
+    
+    def block_reason(self, request):
+        """Причина блокировки запроса (тип ресурса/домен) или None"""
+        url = request.url
+        host = urlparse(url).netloc
+        if any(domain in host for domain in self.allowed_domains):
+            return None
+        if any(domain in url for domain in self.blocked_domains):
+            return "tracker"
+        if request.resource_type in self.blocked_types:
+            return request.resource_type
+        return None
+    
+    def _count(self, reason):
+        with self._lock:
+            if reason:
+                self.blocked[reason] = self.blocked.get(reason, 0) + 1
+            else:
+                self.allowed_requests += 1
+    
+    def _on_response(self, response):
+        size = response.headers.get("content-length")
+        if size and size.isdigit():
+            with self._lock:
+                self.loaded_bytes += int(size)
+    
+    def install(self, context):
+        """Установка политики в sync контекст браузера"""
+        def handle(route):
+            reason = self.block_reason(route.request)
+            self._count(reason)
+            if reason:
+                route.abort()
+            else:
+                route.continue_()
+        
+        context.route("**/*", handle)
+        context.on("response", self._on_response)
+    
+    async def install_async(self, context):
+        """Установка политики в async контекст браузера"""
+        async def handle(route):
+            reason = self.block_reason(route.request)
+            self._count(reason)
+            if reason:
+                await route.abort()
+            else:
+                await route.continue_()
+        
+        await context.route("**/*", handle)
+        context.on("response", self._on_response)
+    
+    def summary(self):
+        """Строка со счетчиками для лога"""
+        blocked_total = sum(self.blocked.values())
+        by_type = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.blocked.items())) or "-"
+        return (f"заблокировано запросов: {blocked_total} ({by_type}), пропущено: {self.allowed_requests}, "
+                f"загружено: {self.loaded_bytes / 1024:.0f} КБ")
+
+
+# Ответы виджета схемы зала, в которых ищем данные о местах
+SEAT_PAYLOAD_URL_PATTERNS = ("seat", "scheme", "hall", "place", "zone", "map")
+
+# Ключи JSON данных схемы зала (варианты написания у разных версий виджета)
+SECTION_NAME_KEYS = ("zone_name", "sector_name", "section_name", "zone", "sector", "section", "name", "title")
+# Секция у отдельного места (name/title места - обычно его номер, а не секция)
+SEAT_SECTION_KEYS = SECTION_NAME_KEYS[:6]
+SECTION_FREE_KEYS = ("free_seats", "free_places", "places_free", "seats_free", "available_seats", "free_count", "free")
+SEAT_ROW_KEYS = ("row", "row_name", "seat", "place", "number")
+SEAT_FREE_FLAGS = ("is_free", "free", "available", "is_available")
+SEAT_BUSY_FLAGS = ("busy", "disabled", "sold", "reserved", "is_busy")
+
+
+def _section_name(item, keys=SECTION_NAME_KEYS):
+    for key in keys:
+        value = item.get(key)
+        if isinstance(value, dict):
+            value = next((value[k] for k in ("name", "title") if isinstance(value.get(k), str)), None)
+        if isinstance(value, (str, int)) and not isinstance(value, bool) and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def _seat_is_free(item):
+    """True/False для отдельного места, None - объект не похож на место"""
+    if not any(key in item for key in SEAT_ROW_KEYS):
+        return None
+    for key in SEAT_FREE_FLAGS:
+        if isinstance(item.get(key), bool):
+            return item[key]
+    for key in SEAT_BUSY_FLAGS:
+        if isinstance(item.get(key), bool):
+            return not item[key]
+    status = item.get("status")
+    if isinstance(status, str):
+        return status.lower() in ("free", "available", "vacant")
+    return None
+
+
+def _walk_seat_payload(node, parent_section):
+    """Рекурсивный обход JSON схемы: (сводки по секциям, поштучно свободные места)"""
+    summaries = {}
+    seat_counts = {}
+    
+    if isinstance(node, list):
+        children, section = node, parent_section
+    elif isinstance(node, dict):
+        children, section = node.values(), _section_name(node) or parent_section
+    else:
+        return summaries, seat_counts
+    
+    for child in children:
+        if isinstance(child, (dict, list)):
+            child_summaries, child_seats = _walk_seat_payload(child, section)
+            for name, count in child_summaries.items():
+                summaries[name] = summaries.get(name, 0) + count
+            for name, count in child_seats.items():
+                seat_counts[name] = seat_counts.get(name, 0) + count
+    
+    if isinstance(node, dict):
+        seat_free = _seat_is_free(node)
+        if seat_free is not None:
+            # Место в плоском списке само называет свою зону/сектор
+            name = _section_name(node, SEAT_SECTION_KEYS) or parent_section or "Без секции"
+            seat_counts[name] = seat_counts.get(name, 0) + (1 if seat_free else 0)
+        elif not summaries and section:
+            # Сводка узла учитывается, только если во вложенных узлах сводок нет
+            # (иначе итог по мероприятию сложится с итогами по секциям)
+            free_value = next((node[key] for key in SECTION_FREE_KEYS
+                               if isinstance(node.get(key), int) and not isinstance(node.get(key), bool)), None)
+            if free_value is not None:
+                summaries = {section: free_value}
+    
+    return summaries, seat_counts
+
+
+def parse_seat_payload(payload):
+    """
+    Подсчет свободных мест по секциям из JSON данных схемы зала за один проход
+    
+    Понимает оба вида данных: сводки по секциям (имя + число свободных мест)
+    и списки отдельных мест (секция + признак занятости).
+    
+    Args:
+        payload: Разобранный JSON (dict/list) из ответа виджета
+        
+    Returns:
+        dict: {название секции: свободных мест}; пустой, если мест не найдено
+    """
+    summaries, seat_counts = _walk_seat_payload(payload, None)
+    # Сводки надежнее поштучного подсчета, если виджет отдал и то и другое
+    return summaries or {name: count for name, count in seat_counts.items() if count > 0}
+
+
+def merge_seat_payloads(payloads):
+    """
+    Места по секциям из нескольких JSON ответов схемы зала
+    
+    Ответы разных адресов часто описывают одни и те же места (сводка по
+    секциям и список мест, повторный опрос схемы), поэтому по каждой секции
+    берется максимум, а не сумма.
+    
+    Returns:
+        dict: {название секции: свободных мест}
+    """
+    seat_sections = {}
+    for payload in payloads:
+        for section, seats in parse_seat_payload(payload).items():
+            seat_sections[section] = max(seat_sections.get(section, 0), seats)
+    return seat_sections
+
+
+def capture_seat_payloads(page):
+    """
+    Подписка на JSON ответы схемы зала (включая запросы iframe)
+    
+    Вызывается до page.goto. Возвращает корутину-функцию, которая отписывается
+    от событий (повторный вызов безопасен) и возвращает разобранные JSON ответы -
+    по одному на адрес (повторные и опрашиваемые ответы: последний прочитанный).
+    """
+    import asyncio
+    
+    read_tasks = []
+    subscribed = [True]
+    
+    async def read_json(response):
+        try:
+            return await response.json()
+        except Exception:
+            return None
+    
+    def on_response(response):
+        content_type = response.headers.get("content-type", "")
+        url = response.url.lower()
+        if "json" in content_type and any(pattern in url for pattern in SEAT_PAYLOAD_URL_PATTERNS):
+            read_tasks.append((response.url, asyncio.ensure_future(read_json(response))))
+    
+    page.on("response", on_response)
+    
+    async def collect():
+        if subscribed[0]:
+            page.remove_listener("response", on_response)
+            subscribed[0] = False
+        payloads = await asyncio.gather(*(task for _, task in read_tasks))
+        by_url = {}
+        for (url, _), payload in zip(read_tasks, payloads):
+            if payload is not None:
+                by_url.pop(url, None)
+                by_url[url] = payload
+        return list(by_url.values())
+    
+    return collect
+
+
+# Подсказка схемы зала при наведении: "Свободных мест: N" и название секции с диапазоном мест
+FREE_SEATS_TEXT_PATTERN = re.compile(r'свободных мест[:\s]*(\d+)', re.IGNORECASE)
+SECTION_NAME_TEXT_PATTERN = re.compile(r'(Партер|Балкон|Амфитеатр|Ложа|[А-Яа-я\s]+)\s+\d+\s*[-–]\s*\d+')
+
+
+async def parse_available_seats(iframe, concert_idx):
     """
     Парсинг свободных мест через наведение на элементы схемы зала
     
+    Запасной путь, когда данные схемы не удалось получить из сетевых ответов:
+    наводит курсор только на первые 12 SVG элементов.
+    
     Args:
-        iframe: Frame объект Playwright с схемой зала
+        iframe: Frame объект async Playwright с схемой зала
         concert_idx: Номер концерта для логирования
         
     Returns:
-        int: Общее количество свободных мест (сумма по всем секциям)
+        dict: {название секции: свободных мест}
     """
-    logger.info(f"[Концерт #{concert_idx}] Начинаем парсинг свободных мест")
+    logger.debug("[Концерт #%s] Начинаем парсинг свободных мест", concert_idx)
     
     try:
         # Ждем загрузки схемы (уменьшено для ускорения)
-        iframe.wait_for_timeout(1500)
+        await iframe.wait_for_timeout(1500)
         
         # Ищем SVG элементы (места обычно рендерятся как SVG)
-        svg_elements = iframe.query_selector_all("svg circle, svg rect, svg path, svg g")
-        logger.info(f"[Концерт #{concert_idx}] Найдено SVG элементов: {len(svg_elements)}")
+        svg_elements = await iframe.query_selector_all("svg circle, svg rect, svg path, svg g")
+        logger.debug("[Концерт #%s] Найдено SVG элементов: %s", concert_idx, len(svg_elements))
         
         if len(svg_elements) == 0:
-            logger.warning(f"[Концерт #{concert_idx}] SVG элементы не найдены")
-            return 0
+            logger.warning("[Концерт #%s] SVG элементы не найдены", concert_idx)
+            return {}
         
         # Словарь для хранения уникальных секций с их количеством мест
         sections_data = {}
@@ -184,21 +1212,21 @@ def parse_available_seats(iframe, concert_idx):
         # Наводим курсор на элементы (уменьшаем до 12 для ускорения)
         for idx, element in enumerate(svg_elements[:12], 1):
             try:
-                element.hover(timeout=400)
-                iframe.wait_for_timeout(250)
+                await element.hover(timeout=400)
+                await iframe.wait_for_timeout(250)
                 
                 # Получаем весь текст страницы
-                page_text = iframe.text_content("body")
+                page_text = await iframe.text_content("body")
                 
                 # Ищем все упоминания "Свободных мест: X"
-                matches = re.findall(r'свободных мест[:\s]*(\d+)', page_text, re.IGNORECASE)
+                matches = FREE_SEATS_TEXT_PATTERN.findall(page_text)
                 
                 if matches:
                     # Берем первое найденное значение (это текущая секция)
                     seats = int(matches[0])
                     
                     # Пытаемся найти название секции (Партер, Балкон и т.д.)
-                    section_name_match = re.search(r'(Партер|Балкон|Амфитеатр|Ложа|[А-Яа-я\s]+)\s+\d+\s*[-–]\s*\d+', page_text)
+                    section_name_match = SECTION_NAME_TEXT_PATTERN.search(page_text)
                     
                     if section_name_match:
                         section_name = section_name_match.group(0)
@@ -209,385 +1237,3400 @@ def parse_available_seats(iframe, concert_idx):
                     # Добавляем секцию, если её ещё нет
                     if section_name not in sections_data:
                         sections_data[section_name] = seats
-                        logger.info(f"[Концерт #{concert_idx}]   ✓ {section_name}: {seats} мест")
+                        logger.debug("[Концерт #%s]   ✓ %s: %s мест", concert_idx, section_name, seats)
                 
-            except Exception as e:
+            except Exception:
                 # Игнорируем ошибки на отдельных элементах
                 pass
         
         # Суммируем все найденные места
         total_seats = sum(sections_data.values())
         
-        logger.info(f"[Концерт #{concert_idx}] Найдено секций: {len(sections_data)}")
+        logger.debug("[Концерт #%s] Найдено секций: %s", concert_idx, len(sections_data))
         if len(sections_data) > 0:
-            logger.info(f"[Концерт #{concert_idx}] Детализация:")
+            logger.debug("[Концерт #%s] Детализация:", concert_idx)
             for section, seats in sections_data.items():
-                logger.info(f"[Концерт #{concert_idx}]   - {section}: {seats} мест")
+                logger.debug("[Концерт #%s]   - %s: %s мест", concert_idx, section, seats)
         
-        logger.info(f"[Концерт #{concert_idx}] ✓ ИТОГО свободных мест: {total_seats}")
-        return total_seats
+        logger.debug("[Концерт #%s] ✓ ИТОГО свободных мест: %s", concert_idx, total_seats)
+        return sections_data
         
     except Exception as e:
-        logger.error(f"[Концерт #{concert_idx}] ✗ Ошибка при парсинге свободных мест: {e}")
-        return 0
+        logger.error("[Концерт #%s] ✗ Ошибка при парсинге свободных мест: %s", concert_idx, e)
+        return {}
 
 
-def scroll_to_load_all_concerts(page):
+def failed_ticket_result(error=""):
     """
-    Скроллинг страницы для загрузки всех концертов
+    Результат страницы билетов без мест (формат fetch_ticket_page)
+    
+    Общая заготовка для всех пулов: error - код ошибки ("timeout", "circuit_open",
+    "worker_failed", ...), "" - начальный результат, который дополняется по ходу разбора.
+    """
+    return {"event_passed": False, "message": "", "available_seats": 0,
+            "seat_sections": {}, "seats_source": "", "error": error}
+
+
+async def fetch_ticket_page(page, ticket_url, concert_idx, wait_until="networkidle", snapshot=False):
+    """
+    Загрузка страницы билетов и подсчет свободных мест
+    
+    Места считаются по JSON данным схемы зала, которые виджет загружает сам
+    (перехват ответов страницы и iframe); наведение курсора - запасной путь.
+    
+    Args:
+        page: Page объект async Playwright (переиспользуется пулом)
+        ticket_url: Ссылка на страницу билетов
+        concert_idx: Номер концерта для логирования
+        wait_until: Событие загрузки для goto; при "domcontentloaded" готовность
+            проверяется явно (плашка или iframe, затем SVG схемы)
+        snapshot: Сохранить в результат снимок страницы для архива (ключ "snapshot":
+            HTML страницы и iframe, JSON ответы схемы зала, результат наведения)
+        
+    Returns:
+        dict: {"event_passed": bool, "message": str, "available_seats": int,
+            "seat_sections": {секция: мест}, "seats_source": "network"/"hover"/"", "error": str}
+    """
+    from playwright.async_api import TimeoutError as AsyncPlaywrightTimeout
+    
+    result = failed_ticket_result()
+    collect_payloads = capture_seat_payloads(page)
+    page_snapshot = {"url": ticket_url, "html": "", "iframe_html": "", "payloads": [],
+                     "banner": None, "hover_sections": None}
+    
+    try:
+        logger.debug("[ID:%s] Загрузка страницы билетов: %s", concert_idx, ticket_url)
+        with metrics.span("ticket_page_load"):
+            await page.goto(ticket_url, wait_until=wait_until, timeout=15000)
+            if wait_until != "networkidle":
+                # Явная готовность вместо ожидания тишины в сети
+                await page.wait_for_selector("div.jquery-message-container, iframe", state="attached", timeout=15000)
+        logger.debug("[ID:%s] Страница билетов загружена", concert_idx)
+        
+        # Проверка на плашку "мероприятие прошло"
+        logger.debug("[ID:%s] Проверка на плашку 'мероприятие прошло'", concert_idx)
+        event_passed = await page.query_selector("div.jquery-message-container")
+        if event_passed:
+            result["event_passed"] = True
+            result["message"] = (await event_passed.text_content() or "").strip()
+            page_snapshot["banner"] = result["message"]
+            logger.warning("[ID:%s] ✗ Мероприятие прошло: '%s'", concert_idx, result['message'])
+            return result
+        
+        # Получаем iframe со схемой зала
+        logger.debug("[ID:%s] Поиск iframe со схемой зала", concert_idx)
+        iframe_element = await page.query_selector("iframe")
+        if not iframe_element:
+            logger.warning("[ID:%s] ✗ Iframe не найден", concert_idx)
+            return result
+        
+        ticket_iframe = await iframe_element.content_frame()
+        if not ticket_iframe:
+            logger.warning("[ID:%s] ✗ Не удалось получить content_frame", concert_idx)
+            return result
+        
+        logger.debug("[ID:%s] ✓ Iframe найден", concert_idx)
+        if wait_until != "networkidle":
+            # Схема отрисована - значит данные мест уже получены виджетом
+            try:
+                await ticket_iframe.wait_for_selector("svg", state="attached", timeout=10000)
+            except AsyncPlaywrightTimeout:
+                logger.warning("[ID:%s] ✗ SVG схемы зала не появился", concert_idx)
+        payloads = await collect_payloads()
+        if snapshot:
+            page_snapshot["payloads"] = payloads
+            page_snapshot["iframe_html"] = await ticket_iframe.content()
+        
+        # Данные схемы зала из сетевых ответов виджета - все секции за один проход
+        with metrics.span("seat_payload_parse"):
+            seat_sections = merge_seat_payloads(payloads)
+        
+        if seat_sections:
+            result["seats_source"] = "network"
+            logger.debug("[ID:%s] ✓ Места из данных схемы (%s ответов): %s секций",
+                         concert_idx, len(payloads), len(seat_sections))
+        else:
+            logger.debug("[ID:%s] Данные схемы не найдены в ответах, наводим курсор на схему", concert_idx)
+            with metrics.span("parse_available_seats"):
+                seat_sections = await parse_available_seats(ticket_iframe, concert_idx)
+            result["seats_source"] = "hover" if seat_sections else ""
+            page_snapshot["hover_sections"] = seat_sections
+        
+        result["seat_sections"] = seat_sections
+        result["available_seats"] = sum(seat_sections.values())
+        
+    except AsyncPlaywrightTimeout:
+        logger.error("[ID:%s] ✗ Таймаут при загрузке страницы билетов", concert_idx)
+        result["error"] = "timeout"
+    except Exception as e:
+        logger.error("[ID:%s] ✗ Ошибка при получении вместимости: %s", concert_idx, e)
+        result["error"] = str(e)
+    finally:
+        # Страница переиспользуется пулом - снимаем подписку в любом случае
+        await collect_payloads()
+    
+    if snapshot:
+        try:
+            page_snapshot["html"] = await page.content()
+        except Exception as e:
+            logger.debug("[ID:%s] Не удалось получить HTML страницы билетов: %s", concert_idx, e)
+        result["snapshot"] = page_snapshot
+    return result
+
+
+class RetryPolicy:
+    """
+    Повторы загрузки страницы билетов: экспоненциальная задержка с полным jitter
+    
+    Задержка перед повтором attempt (с 1): случайная в [0, min(max_delay, base_delay * 2**(attempt-1))].
+    """
+    
+    def __init__(self, attempts=3, base_delay=1.0, max_delay=30.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Предохранитель на хост: после failure_threshold ошибок подряд загрузки с
+    хоста не выполняются reset_timeout секунд, затем пропускается одна пробная
+    загрузка (успех закрывает предохранитель, ошибка открывает снова).
+    """
+    
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probe = False
+    
+    def allow(self, now=None):
+        """Можно ли загружать страницу сейчас"""
+        if self.opened_at is None:
+            return True
+        now = time.monotonic() if now is None else now
+        if now - self.opened_at >= self.reset_timeout and not self._probe:
+            self._probe = True
+            return True
+        return False
+    
+    def record(self, success, now=None):
+        """Учет результата загрузки"""
+        self._probe = False
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic() if now is None else now
+
+
+class TicketPagePool:
+    """
+    Пул переиспользуемых страниц async Playwright для страниц билетов
+    
+    Работает в отдельном потоке со своим event loop и своим браузером, поэтому
+    не мешает sync Playwright основного потока. Задачи ставятся через submit()
+    сразу по мере обхода карточек и выполняются параллельно на concurrency
+    страницах, но не более per_host_limit одновременно на один хост.
+    
+    Использование:
+        with TicketPagePool(concurrency=4) as pool:
+            futures = [pool.submit(url, idx) for idx, url in jobs]
+            results = [f.result() for f in futures]  # порядок исходных карточек
+    
+    В долгоживущем режиме recycle_after ограничивает число загрузок на одну
+    страницу: после него страница закрывается и заменяется новой, чтобы память
+    Chromium не росла бесконечно.
+    
+    Таймауты загрузки повторяются по retry_policy (страница и место в лимите
+    хоста на время паузы освобождаются). Для каждого хоста работает
+    CircuitBreaker: пока он открыт, страницы хоста сразу возвращают ошибку
+    "circuit_open" без загрузки.
+    
+    Если суммарная память превысила бюджет MemoryMonitor, создается новый
+    контекст: свободные страницы сразу заменяются страницами нового контекста,
+    занятые - после своей загрузки, старый контекст закрывается вместе с
+    последней страницей. Загрузки при этом не прерываются.
+    """
+    
+    def __init__(self, concurrency=4, per_host_limit=2, resource_policy=None, recycle_after=None, record=False,
+                 retry_policy=None, breaker_threshold=5, breaker_reset=60.0):
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.resource_policy = resource_policy
+        self.recycle_after = recycle_after
+        self.record = record
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.recycled = 0
+        self.retries = 0
+        self.breaker_skips = 0
+        self.context_recycles = 0
+        
+        self._loop = None
+        self._thread = None
+        self._startup_future = None
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._context_pages = {}
+        self._loads_since_context = 0
+        self._recycling_context = False
+        self._pages = None
+        self._page_uses = {}
+        self._host_limits = {}
+        self._breakers = {}
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def start(self):
+        """Запуск потока с event loop и браузера (не блокирует вызывающий поток)"""
+        import asyncio
+        
+        if self._thread:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ticket-pool", daemon=True)
+        self._thread.start()
+        self._startup_future = asyncio.run_coroutine_threadsafe(self._startup(), self._loop)
+        logger.info("Пул страниц билетов запускается (страниц: %s, на хост: %s)",
+                    self.concurrency, self.per_host_limit)
+    
+    async def _startup(self):
+        import asyncio
+        from playwright.async_api import async_playwright
+        
+        with metrics.span("browser_launch"):
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+        await self._new_context()
+        self._pages = asyncio.Queue()
+        for _ in range(self.concurrency):
+            self._pages.put_nowait(await self._new_page())
+        logger.info("Пул страниц билетов готов")
+    
+    async def _new_context(self):
+        context = await self._browser.new_context(**BROWSER_CONTEXT_OPTIONS)
+        if self.resource_policy:
+            await self.resource_policy.install_async(context)
+        # Без await между заменой и счетчиком: страницы других задач видят готовый контекст
+        self._context_pages[context] = 0
+        self._context = context
+        self._loads_since_context = 0
+    
+    async def _new_page(self):
+        page = await self._context.new_page()
+        self._context_pages[self._context] += 1
+        return page
+    
+    async def _replace_page(self, page):
+        """Закрытие страницы (и ее контекста, если он устарел и страниц в нем не осталось) и новая страница"""
+        context = page.context
+        if not page.is_closed():
+            await page.close()
+        self._page_uses.pop(page, None)
+        if context in self._context_pages:
+            self._context_pages[context] -= 1
+            if context is not self._context and self._context_pages[context] <= 0:
+                del self._context_pages[context]
+                await context.close()
+                logger.debug("Прежний контекст пула закрыт")
+        return await self._new_page()
+    
+    async def _recycle_context_if_over_budget(self):
+        """Новый контекст, если память больше бюджета (не чаще, чем раз в concurrency загрузок)"""
+        if self._recycling_context or self._loads_since_context < self.concurrency:
+            return
+        memory.sample("ticket_page_load")
+        if not memory.over_budget():
+            return
+        self._recycling_context = True
+        try:
+            memory.record_recycle(f"новый контекст пула страниц билетов после {self._loads_since_context} загрузок")
+            await self._new_context()
+            idle = []
+            while not self._pages.empty():
+                idle.append(self._pages.get_nowait())
+            for page in idle:
+                self._pages.put_nowait(await self._replace_page(page))
+            self.context_recycles += 1
+            memory.sample("ticket_context_recycle", force=True)
+        except Exception as e:
+            logger.error("✗ Не удалось пересоздать контекст пула: %s", e)
+        finally:
+            self._recycling_context = False
+    
+    def _host_limit(self, ticket_url):
+        import asyncio
+        
+        host = urlparse(ticket_url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+    
+    def _breaker(self, ticket_url):
+        host = urlparse(ticket_url).netloc
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+        return self._breakers[host]
+    
+    async def _fetch(self, ticket_url, concert_idx):
+        import asyncio
+        
+        current_concert_key.set(ticket_url)
+        await asyncio.wrap_future(self._startup_future)
+        breaker = self._breaker(ticket_url)
+        
+        for attempt in range(1, self.retry_policy.attempts + 1):
+            if not breaker.allow():
+                self.breaker_skips += 1
+                logger.warning("[ID:%s] ✗ Хост %s временно отключен после серии ошибок",
+                               concert_idx, urlparse(ticket_url).netloc)
+                return failed_ticket_result("circuit_open")
+            
+            async with self._host_limit(ticket_url):
+                page = await self._pages.get()
+                try:
+                    if page.is_closed():
+                        page = await self._replace_page(page)
+                    wait_until = self.resource_policy.wait_until if self.resource_policy else "networkidle"
+                    result = await fetch_ticket_page(page, ticket_url, concert_idx, wait_until=wait_until,
+                                                     snapshot=self.record)
+                finally:
+                    self._loads_since_context += 1
+                    self._pages.put_nowait(await self._recycle_if_needed(page))
+            await self._recycle_context_if_over_budget()
+            
+            # Любая ошибка загрузки (не только таймаут) - неудача для предохранителя
+            breaker.record(not result["error"])
+            if result["error"] != "timeout" or attempt == self.retry_policy.attempts:
+                return result
+            
+            delay = self.retry_policy.delay(attempt)
+            self.retries += 1
+            logger.info("[ID:%s] Повтор загрузки страницы билетов через %.1f с (попытка %s из %s)",
+                        concert_idx, delay, attempt + 1, self.retry_policy.attempts)
+            await asyncio.sleep(delay)
+        return result
+    
+    async def _recycle_if_needed(self, page):
+        """Замена страницы новой после recycle_after загрузок или если ее контекст пересоздан"""
+        stale = page.context is not self._context
+        if not self.recycle_after and not stale:
+            return page
+        uses = self._page_uses.pop(page, 0) + 1
+        if not stale and uses < self.recycle_after and not page.is_closed():
+            self._page_uses[page] = uses
+            return page
+        try:
+            new_page = await self._replace_page(page)
+            if not stale:
+                self.recycled += 1
+                logger.debug("Страница пула заменена после %s загрузок", uses)
+            return new_page
+        except Exception as e:
+            logger.error("✗ Не удалось заменить страницу пула: %s", e)
+            return page
+    
+    def submit(self, ticket_url, concert_idx):
+        """Постановка страницы билетов в очередь
+        
+        Returns:
+            concurrent.futures.Future: результат fetch_ticket_page
+        """
+        import asyncio
+        
+        if not self._thread:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(self._fetch(ticket_url, concert_idx), self._loop)
+    
+    def map(self, jobs):
+        """Обработка списка (ticket_url, concert_idx) с результатами в исходном порядке"""
+        futures = [self.submit(ticket_url, concert_idx) for ticket_url, concert_idx in jobs]
+        return [future.result() for future in futures]
+    
+    async def _shutdown(self):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+    
+    def close(self):
+        """Закрытие браузера пула и остановка потока"""
+        import asyncio
+        
+        if not self._thread:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        except Exception as e:
+            logger.error("✗ Ошибка при закрытии пула страниц билетов: %s", e)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+        logger.info("Пул страниц билетов закрыт (повторов загрузки: %s, пропущено предохранителем: %s, "
+                    "контекстов пересоздано по бюджету памяти: %s)",
+                    self.retries, self.breaker_skips, self.context_recycles)
+        if self.resource_policy:
+            logger.info("Ресурсы страниц билетов: %s", self.resource_policy.summary())
+
+
+# Места без браузера: JSON схемы зала qtickets напрямую по ID мероприятия.
+# Шаблоны адресов: {origin} - схема и хост ссылки на билеты, {event_id} - ID мероприятия
+QTICKETS_SEAT_ENDPOINTS = ("{origin}/api/seats/{event_id}.json",)
+QTICKETS_API_CONCURRENCY = 32
+QTICKETS_API_PER_HOST_LIMIT = 8
+QTICKETS_API_TIMEOUT = 10.0
+# ID мероприятия - последний числовой сегмент пути ссылки (/event/123, /123-slug)
+QTICKETS_EVENT_ID_PATTERN = re.compile(r'/(\d+)(?:-[^/]*)?/?$')
+QTICKETS_EVENT_ID_PARAMS = ("event_id", "event", "id")
+
+
+def qtickets_event_id(ticket_url):
+    """ID мероприятия qtickets из ссылки на билеты (None - ссылка не похожа на мероприятие)"""
+    parsed = urlparse(ticket_url)
+    match = QTICKETS_EVENT_ID_PATTERN.search(parsed.path)
+    if match:
+        return match.group(1)
+    query = parse_qs(parsed.query)
+    for name in QTICKETS_EVENT_ID_PARAMS:
+        value = query.get(name, [""])[0]
+        if value.isdigit():
+            return value
+    return None
+
+
+class QticketsApiPool:
+    """
+    Места на мероприятия qtickets без браузера
+    
+    По ссылке на билеты определяется ID мероприятия и запрашиваются JSON данные
+    схемы зала (QTICKETS_SEAT_ENDPOINTS) - те же, что виджет загружает в iframe.
+    Запросы идут из отдельного потока со своим event loop через один
+    httpx.AsyncClient (keep-alive, не более concurrency соединений, не более
+    per_host_limit одновременных запросов на хост, таймаут timeout).
+    
+    Если ID не найден, адрес не ответил, ответ не JSON или мест в нем нет
+    (в том числе прошедшее мероприятие), страница этого концерта загружается
+    пулом fallback (TicketPagePool/ShardedTicketPool). Браузер fallback
+    запускается только при первой такой загрузке.
+    
+    Интерфейс как у TicketPagePool (start/submit/close), результат в формате
+    fetch_ticket_page с seats_source "api".
+    """
+    
+    def __init__(self, fallback, concurrency=QTICKETS_API_CONCURRENCY, per_host_limit=QTICKETS_API_PER_HOST_LIMIT,
+                 timeout=QTICKETS_API_TIMEOUT, endpoints=QTICKETS_SEAT_ENDPOINTS, record=False):
+        self.fallback = fallback
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.endpoints = tuple(endpoints)
+        self.record = record
+        self.api_hits = 0
+        self.fallbacks = 0
+        
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._disabled = False
+        self._host_limits = {}
+    
+    @property
+    def recycled(self):
+        """Пересозданные страницы браузера fallback (режим демона)"""
+        return getattr(self.fallback, "recycled", 0)
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def start(self):
+        """Запуск потока с event loop и HTTP клиентом (браузер fallback не запускается)"""
+        import asyncio
+        
+        if self._thread or self._disabled:
+            return
+        try:
+            import httpx
+        except ImportError as e:
+            self._disabled = True
+            logger.warning("✗ Места по API недоступны (не установлен %s), страницы билетов - через браузер", e.name)
+            return
+        
+        self._loop = asyncio.new_event_loop()
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": BROWSER_CONTEXT_OPTIONS["user_agent"], "Accept": "application/json"},
+            timeout=self.timeout, follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ticket-api", daemon=True)
+        self._thread.start()
+        logger.info("Места по API qtickets (соединений: %s, на хост: %s, таймаут %.0f с)",
+                    self.concurrency, self.per_host_limit, self.timeout)
+    
+    def _host_limit(self, url):
+        import asyncio
+        
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+    
+    async def _fetch(self, ticket_url, concert_idx):
+        """
+        Места по API
+        
+        Returns:
+            dict или None: результат в формате fetch_ticket_page; None - нужен браузер
+        """
+        current_concert_key.set(ticket_url)
+        event_id = qtickets_event_id(ticket_url)
+        if not event_id:
+            logger.debug("[ID:%s] ID мероприятия не найден в ссылке: %s", concert_idx, ticket_url)
+            return None
+        
+        parsed = urlparse(ticket_url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        for template in self.endpoints:
+            url = template.format(origin=origin, event_id=event_id)
+            try:
+                async with self._host_limit(url):
+                    with metrics.span("ticket_api"):
+                        response = await self._client.get(url)
+                if response.status_code != 200 or "json" not in response.headers.get("content-type", ""):
+                    logger.debug("[ID:%s] API %s: HTTP %s (%s)", concert_idx, url, response.status_code,
+                                 response.headers.get("content-type", ""))
+                    continue
+                payload = response.json()
+            except Exception as e:
+                logger.debug("[ID:%s] API %s: %s", concert_idx, url, e.__class__.__name__)
+                continue
+            
+            with metrics.span("seat_payload_parse"):
+                seat_sections = parse_seat_payload(payload)
+            if not seat_sections:
+                continue
+            
+            logger.debug("[ID:%s] ✓ Места по API (%s): %s секций", concert_idx, url, len(seat_sections))
+            result = failed_ticket_result()
+            result.update(available_seats=sum(seat_sections.values()), seat_sections=seat_sections,
+                          seats_source="api")
+            if self.record:
+                result["snapshot"] = {"url": ticket_url, "html": "", "iframe_html": "", "payloads": [payload],
+                                      "banner": None, "hover_sections": None}
+            return result
+        return None
+    
+    def submit(self, ticket_url, concert_idx):
+        """Постановка концерта в очередь (при неудаче API - в очередь браузера)
+        
+        Returns:
+            concurrent.futures.Future: результат в формате fetch_ticket_page
+        """
+        import asyncio
+        
+        if not self._thread and not self._disabled:
+            self.start()
+        if self._disabled:
+            self.fallbacks += 1
+            return self.fallback.submit(ticket_url, concert_idx)
+        
+        future = Future()
+        
+        def resolve_from(source):
+            try:
+                future.set_result(source.result())
+            except Exception as e:
+                future.set_exception(e)
+        
+        def on_api_done(api_future):
+            try:
+                result = api_future.result()
+            except Exception as e:
+                logger.error("[ID:%s] ✗ Ошибка запроса мест по API: %s", concert_idx, e)
+                result = None
+            if result is not None:
+                self.api_hits += 1
+                future.set_result(result)
+                return
+            self.fallbacks += 1
+            logger.debug("[ID:%s] Места по API не получены, загружаем страницу билетов", concert_idx)
+            try:
+                self.fallback.submit(ticket_url, concert_idx).add_done_callback(resolve_from)
+            except Exception as e:
+                future.set_exception(e)
+        
+        api_future = asyncio.run_coroutine_threadsafe(self._fetch(ticket_url, concert_idx), self._loop)
+        api_future.add_done_callback(on_api_done)
+        return future
+    
+    def close(self):
+        """Закрытие HTTP клиента, потока и пула fallback"""
+        import asyncio
+        
+        if self._thread:
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            except Exception as e:
+                logger.error("✗ Ошибка при закрытии HTTP клиента мест: %s", e)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+        self.fallback.close()
+        logger.info("Места по API: %s концертов, через страницу билетов: %s", self.api_hits, self.fallbacks)
+
+
+def forward_logging_to_queue(log_queue, level=logging.INFO):
+    """
+    Логирование рабочего процесса через очередь родителя
+    
+    Файл лога пишет только родительский процесс (ротация из нескольких
+    процессов небезопасна), рабочие процессы отправляют ему записи.
+    """
+    global _log_listener
+    
+    logger = logging.getLogger("museshow_parser")
+    logger.setLevel(level)
+    logger.propagate = False
+    if _log_listener:
+        _log_listener.stop()
+        _log_listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ConcertKeyFilter())
+    logger.addHandler(queue_handler)
+    return logger
+
+
+def _ticket_worker_main(shard_id, jobs, results, log_queue, log_level, concurrency, per_host_limit,
+                        block_resources, record=False, retries=3, memory_budget_mb=None):
+    """
+    Рабочий процесс шарда: свой браузер и свой TicketPagePool
+    
+    Получает задачи (job_id, ticket_url, concert_idx) из jobs до None, результаты
+    по мере готовности отправляет в results, в конце - итоги шарда.
+    """
+    forward_logging_to_queue(log_queue, log_level)
+    # Бюджет шарда - его доля общего бюджета (свой Python и свой Chromium)
+    memory.configure(budget_mb=memory_budget_mb)
+    metrics.reset()
+    started = time.perf_counter()
+    pool = TicketPagePool(concurrency=concurrency, per_host_limit=per_host_limit,
+                          resource_policy=ResourcePolicy() if block_resources else None, record=record,
+                          retry_policy=RetryPolicy(attempts=retries))
+    pool.start()
+    
+    def send_result(job_id, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = failed_ticket_result(str(e))
+        results.put(("result", shard_id, job_id, result))
+    
+    pending = []
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            job_id, ticket_url, concert_idx = job
+            future = pool.submit(ticket_url, concert_idx)
+            future.add_done_callback(lambda f, job_id=job_id: send_result(job_id, f))
+            pending.append(future)
+        futures_wait(pending)
+    finally:
+        pool.close()
+        results.put(("done", shard_id, None, {"jobs": len(pending), "elapsed": time.perf_counter() - started,
+                                              "stages": metrics.summary()}))
+
+
+class ShardedTicketPool:
+    """
+    Страницы билетов в нескольких процессах: по браузеру и TicketPagePool на шард
+    
+    Интерфейс как у TicketPagePool (start/submit/close), поэтому parse_concerts
+    использует его без изменений. Задача уходит в шард с наименьшим числом
+    незавершенных задач. Падение рабочего процесса затрагивает только его
+    шард: незавершенные задачи шарда получают результат с ошибкой.
+    per_host_limit действует внутри каждого шарда.
+    """
+    
+    def __init__(self, workers=2, concurrency=4, per_host_limit=2, block_resources=True, record=False, retries=3,
+                 memory_budget_mb=None):
+        self.workers = max(1, workers)
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.block_resources = block_resources
+        self.record = record
+        self.retries = retries
+        self.memory_budget_mb = memory_budget_mb
+        self.shard_stats = {}
+        
+        self._processes = []
+        self._job_queues = []
+        self._results = None
+        self._log_queue = None
+        self._log_forwarder = None
+        self._collector = None
+        self._futures = {}
+        self._outstanding = []
+        self._next_job_id = 0
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def start(self):
+        """Запуск рабочих процессов (spawn: без наследования потоков родителя)"""
+        import multiprocessing
+        
+        if self._processes:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._results = ctx.Queue()
+        self._log_queue = ctx.Queue()
+        parent_handlers = _log_listener.handlers if _log_listener else ()
+        self._log_forwarder = QueueListener(self._log_queue, *parent_handlers, respect_handler_level=True)
+        self._log_forwarder.start()
+        
+        log_level = logging.getLogger("museshow_parser").level
+        for shard_id in range(self.workers):
+            jobs = ctx.Queue()
+            process = ctx.Process(
+                target=_ticket_worker_main, name=f"ticket-shard-{shard_id}", daemon=True,
+                args=(shard_id, jobs, self._results, self._log_queue, log_level,
+                      self.concurrency, self.per_host_limit, self.block_resources, self.record, self.retries,
+                      self.memory_budget_mb / self.workers if self.memory_budget_mb else None),
+            )
+            process.start()
+            self._processes.append(process)
+            self._job_queues.append(jobs)
+            self._outstanding.append(set())
+        
+        self._collector = threading.Thread(target=self._collect, name="ticket-shards", daemon=True)
+        self._collector.start()
+        logger.info("Запущено шардов страниц билетов: %s (страниц в каждом: %s)", self.workers, self.concurrency)
+    
+    def submit(self, ticket_url, concert_idx):
+        """Постановка страницы билетов в наименее загруженный шард
+        
+        Returns:
+            concurrent.futures.Future: результат fetch_ticket_page
+        """
+        if not self._processes:
+            self.start()
+        future = Future()
+        with self._lock:
+            alive = [shard_id for shard_id in range(self.workers) if shard_id not in self.shard_stats]
+            if not alive:
+                logger.error("✗ Все шарды завершились, страница билетов не загружена: %s", ticket_url)
+                future.set_result(failed_ticket_result("worker_failed"))
+                return future
+            shard_id = min(alive, key=lambda shard: len(self._outstanding[shard]))
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._futures[job_id] = future
+            self._outstanding[shard_id].add(job_id)
+        self._job_queues[shard_id].put((job_id, ticket_url, concert_idx))
+        return future
+    
+    def _resolve(self, shard_id, job_id, result):
+        with self._lock:
+            self._outstanding[shard_id].discard(job_id)
+            future = self._futures.pop(job_id, None)
+        if future is not None:
+            future.set_result(result)
+    
+    def _fail_shard(self, shard_id, error):
+        """Незавершенные задачи упавшего шарда получают результат с ошибкой"""
+        with self._lock:
+            self.shard_stats[shard_id] = {"jobs": 0, "elapsed": 0.0, "stages": {}, "error": error}
+            job_ids = list(self._outstanding[shard_id])
+        logger.error("✗ Шард %s завершился с ошибкой (%s), задач без результата: %s", shard_id, error, len(job_ids))
+        for job_id in job_ids:
+            self._resolve(shard_id, job_id, failed_ticket_result("worker_failed"))
+    
+    def _collect(self):
+        """Поток приема результатов и контроля рабочих процессов"""
+        while len(self.shard_stats) < self.workers:
+            try:
+                kind, shard_id, job_id, payload = self._results.get(timeout=0.5)
+            except queue.Empty:
+                for shard_id, process in enumerate(self._processes):
+                    if shard_id not in self.shard_stats and not process.is_alive():
+                        self._fail_shard(shard_id, f"код завершения {process.exitcode}")
+                continue
+            if kind == "result":
+                self._resolve(shard_id, job_id, payload)
+            elif shard_id not in self.shard_stats:
+                self.shard_stats[shard_id] = payload
+    
+    def close(self):
+        """Завершение шардов, сбор и вывод времени по шардам"""
+        if not self._processes:
+            return
+        for jobs in self._job_queues:
+            jobs.put(None)
+        self._collector.join()
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self._log_forwarder.stop()
+        
+        for shard_id in sorted(self.shard_stats):
+            stats = self.shard_stats[shard_id]
+            metrics.record("ticket_shard", stats["elapsed"])
+            metrics.set_gauge(f"shard_{shard_id}_pages", stats["jobs"])
+            metrics.set_gauge(f"shard_{shard_id}_seconds", round(stats["elapsed"], 3))
+            if stats.get("error"):
+                continue
+            logger.info("Шард %s: %s страниц за %.2f с (%.2f стр/с)", shard_id, stats["jobs"], stats["elapsed"],
+                        stats["jobs"] / stats["elapsed"] if stats["elapsed"] else 0.0)
+        self._processes = []
+        logger.info("Шарды страниц билетов закрыты")
+
+
+# Селекторы карточек концертов (пробуются по порядку)
+CARD_SELECTORS = [
+    "div.elementor-loop-container > div",
+    "div[data-elementor-type='loop-item']",
+    "article.elementor-post",
+    "div.e-loop-item",
+]
+
+# Признаки XHR подгрузки следующей порции карточек (Elementor / JetEngine)
+LISTING_XHR_PATTERNS = ("admin-ajax.php", "wp-json", "e-page-", "/page/")
+
+# Ожидание появления новых карточек: MutationObserver через polling="mutation"
+CARD_COUNT_GREW_JS = "([selector, count]) => document.querySelectorAll(selector).length > count"
+
+# Сколько ждать новых карточек после скролла, прежде чем считать список законченным
+SCROLL_IDLE_TIMEOUT = 3000
+SCROLL_MAX_ITERATIONS = 50
+
+
+def _is_listing_request(request):
+    """XHR/fetch запрос подгрузки карточек"""
+    return (request.resource_type in ("xhr", "fetch")
+            and any(pattern in request.url for pattern in LISTING_XHR_PATTERNS))
+
+
+def wait_for_concert_cards(page, timeout=15000):
+    """
+    Ожидание появления первых карточек концертов вместо фиксированной паузы
+    
+    Returns:
+        float: Время ожидания в секундах
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+    
+    started = time.monotonic()
+    try:
+        page.wait_for_selector(", ".join(CARD_SELECTORS), state="attached", timeout=timeout)
+        logger.info("Карточки концертов появились через %.2f с", time.monotonic() - started)
+    except PlaywrightTimeout:
+        logger.warning("✗ Карточки концертов не появились за %.0f с", timeout / 1000)
+    return time.monotonic() - started
+
+
+# Адрес следующей страницы пагинации из якоря Elementor (null - страниц больше нет)
+NEXT_PAGE_URL_JS = """
+(anchorSelector) => {
+    const anchor = document.querySelector(anchorSelector);
+    if (!anchor || !anchor.dataset.nextPage) return null;
+    if (anchor.dataset.maxPage && +anchor.dataset.page >= +anchor.dataset.maxPage) return null;
+    return new URL(anchor.dataset.nextPage, document.baseURI).href;
+}
+"""
+
+
+def scroll_to_load_all_concerts(page, idle_timeout=SCROLL_IDLE_TIMEOUT, max_iterations=SCROLL_MAX_ITERATIONS,
+                                on_cards=None, seen_keys=None):
+    """
+    Скроллинг страницы для загрузки всех концертов
+    
+    После каждого скролла ждет сигнала, а не фиксированную паузу: рост числа
+    карточек (MutationObserver) или завершение XHR подгрузки. Если за
+    idle_timeout новых карточек нет и подгрузка не идет - список закончился.
+    
+    Args:
+        page: Page объект Playwright
+        idle_timeout: Таймаут ожидания новых карточек, мс
+        max_iterations: Защита от бесконечного цикла
+        on_cards: Вызывается с сырыми полями новых карточек сразу после их
+            появления (конвейер: обработка идет, пока список еще грузится).
+            Повторы (бесконечный скролл дублирует карточки, список может быть
+            перерисован целиком) отсеиваются по ключу и не передаются.
+        seen_keys: Ключи уже переданных карточек (общие для продолжений списка)
+    
+    Если память больше бюджета MemoryMonitor и у списка есть следующая страница
+    пагинации, скроллинг останавливается: вызывающий продолжает список с нее
+    на новой странице браузера (DOM всех загруженных карточек освобождается).
+        
+    Returns:
+        tuple: (количество концертов, рабочий селектор, суммарное ожидание в секундах,
+            URL продолжения списка или None)
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+    
+    logger.info("Начинаем скроллинг страницы для загрузки всех концертов")
+    
+    count_js = "(selector) => document.querySelectorAll(selector).length"
+    working_selector = None
+    for selector in selector_profile.ordered("card", CARD_SELECTORS):
+        # Только количество: ElementHandle карточек не создаются и не удерживают DOM
+        found = page.evaluate(count_js, selector)
+        if found > 0:
+            working_selector = selector
+            logger.info("✓ Найден рабочий селектор: '%s' (%s элементов)", selector, found)
+            break
+    selector_profile.record("card", working_selector)
+    
+    if not working_selector:
+        logger.error("✗ Не найден рабочий селектор для концертов")
+        return 0, None, 0.0, None
+    
+    # Отслеживаем незавершенные запросы подгрузки карточек
+    pending_requests = set()
+    
+    def on_request(request):
+        if _is_listing_request(request):
+            pending_requests.add(request)
+    
+    def on_request_done(request):
+        pending_requests.discard(request)
+    
+    page.on("request", on_request)
+    page.on("requestfinished", on_request_done)
+    page.on("requestfailed", on_request_done)
+    
+    current_count = page.evaluate(count_js, working_selector)
+    total_wait = 0.0
+    scroll_iteration = 0
+    emitted = 0
+    seen_keys = set() if seen_keys is None else seen_keys
+    resume_url = None
+    
+    def emit_new_cards():
+        nonlocal emitted
+        if on_cards is None:
+            return
+        if current_count < emitted:
+            emitted = 0
+        batch = extract_cards(page, working_selector, start=emitted)
+        emitted += len(batch)
+        batch = unique_cards(batch, seen_keys)
+        if batch:
+            on_cards(batch)
+    
+    try:
+        emit_new_cards()
+        while scroll_iteration < max_iterations:
+            scroll_iteration += 1
+            
+            # Скроллим вниз и ждем новые карточки
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            started = time.monotonic()
+            try:
+                page.wait_for_function(
+                    CARD_COUNT_GREW_JS,
+                    arg=[working_selector, current_count],
+                    polling="mutation",
+                    timeout=idle_timeout,
+                )
+                grew = True
+            except PlaywrightTimeout:
+                grew = False
+            total_wait += time.monotonic() - started
+            
+            if grew:
+                current_count = page.evaluate(count_js, working_selector)
+                logger.debug("Скроллинг #%s: найдено концертов: %s", scroll_iteration, current_count)
+                emit_new_cards()
+                if on_cards is not None and memory.over_budget():
+                    resume_url = page.evaluate(NEXT_PAGE_URL_JS, LOAD_MORE_ANCHOR_SELECTOR)
+                    if resume_url:
+                        memory.record_recycle(f"страница концертов заменяется после {current_count} карточек, "
+                                              f"список продолжается с {resume_url}")
+                        break
+                continue
+            
+            if pending_requests:
+                # Подгрузка еще идет - ждем ее завершения и проверяем снова
+                logger.debug("Скроллинг #%s: ожидание завершения подгрузки (%s запросов)",
+                             scroll_iteration, len(pending_requests))
+                continue
+            
+            logger.info("✓ Все концерты загружены. Итого: %s (новых карточек нет %.1f с)",
+                        current_count, idle_timeout / 1000)
+            break
+        else:
+            logger.warning("Достигнут лимит скроллинга (%s итераций). Загружено: %s",
+                           max_iterations, current_count)
+        current_count = page.evaluate(count_js, working_selector)
+        emit_new_cards()
+    finally:
+        page.remove_listener("request", on_request)
+        page.remove_listener("requestfinished", on_request_done)
+        page.remove_listener("requestfailed", on_request_done)
+    
+    logger.info("Скроллинг завершен: итераций %s, суммарное ожидание %.2f с", scroll_iteration, total_wait)
+    return current_count, working_selector, total_wait, resume_url
+
+
+# Каскады селекторов полей карточки концерта (порядок = приоритет)
+DATE_SELECTORS = [
+    "div.jet-listing-dynamic-field__content",
+    "div[class*='date']",
+    "div.elementor-widget-container",
+    "div",
+]
+LINK_SELECTORS = ["a[href*='-21-']", "a[href*='concert']", "a"]
+VENUE_SELECTOR = "div.jet-listing-dynamic-field__content"
+BUTTON_SELECTORS = [
+    "a.elementor-button span.elementor-button-text",
+    "span.elementor-button-text",
+    "a.elementor-button",
+    "a[class*='button']",
+]
+TICKET_LINK_SELECTORS = [
+    "a.elementor-button[href*='qtickets']",
+    "a[href*='qtickets']",
+    "a[href*='ticket']",
+    "a.elementor-button",
+]
+
+# Профиль селекторов: какой селектор каскада срабатывает, сохраняется между запусками
+DEFAULT_SELECTOR_PROFILE = "selector_profile.json"
+# Доля карточек, на которых выученный селектор должен срабатывать (иначе предупреждение)
+SELECTOR_HIT_WARN_RATE = 0.9
+SELECTOR_FIELDS = ("card", "date", "link", "button", "ticket")
+
+
+class SelectorProfile:
+    """
+    Выученный порядок каскадов селекторов
+    
+    Для каждого поля запоминается селектор, который сработал чаще всего, и в
+    следующих запусках он пробуется первым; остальная часть каскада - только
+    если он не сработал. Статистика попаданий выученного селектора выводится
+    в лог, падение доли попаданий - признак изменившейся разметки сайта.
+    """
+    
+    def __init__(self):
+        self.learned = {}
+        self.reset()
+    
+    def reset(self):
+        """Сброс статистики (выученные селекторы сохраняются)"""
+        self.hits = {field: 0 for field in SELECTOR_FIELDS}
+        self.fallbacks = {field: 0 for field in SELECTOR_FIELDS}
+        self.not_found = {field: 0 for field in SELECTOR_FIELDS}
+        self.winners = {field: {} for field in SELECTOR_FIELDS}
+    
+    def load(self, path):
+        """Загрузка профиля с диска (нет файла или он поврежден - полные каскады)"""
+        self.reset()
+        try:
+            self.learned = json.loads(Path(path).read_text(encoding="utf-8")).get("fields", {})
+            logger.info("Профиль селекторов загружен: %s", path)
+        except FileNotFoundError:
+            self.learned = {}
+        except (OSError, ValueError) as e:
+            logger.warning("✗ Профиль селекторов не прочитан (%s), используем полные каскады", e)
+            self.learned = {}
+    
+    def ordered(self, field, cascade):
+        """
+        Каскад с выученным селектором на первом месте
+        
+        Последний селектор каскада - самый общий ("div", "a"), вперед он не
+        переносится: иначе он перехватывал бы поля у более точных селекторов.
+        """
+        learned = self.learned.get(field)
+        if learned not in cascade[:-1] or cascade[0] == learned:
+            return list(cascade)
+        return [learned] + [selector for selector in cascade if selector != learned]
+    
+    def record(self, field, selector):
+        """Учет сработавшего селектора поля (None - ни один селектор каскада не сработал)"""
+        if selector is None:
+            self.not_found[field] += 1
+            return
+        if selector == self.learned.get(field):
+            self.hits[field] += 1
+        else:
+            self.fallbacks[field] += 1
+        self.winners[field][selector] = self.winners[field].get(selector, 0) + 1
+    
+    def record_cards(self, raw_cards):
+        """Учет селекторов по сырым полям карточек (date_selector, link_selector, ...)"""
+        for raw in raw_cards:
+            for field in ("date", "link", "button", "ticket"):
+                self.record(field, raw.get(f"{field}_selector"))
+    
+    def log_stats(self):
+        """Статистика попаданий по полям; предупреждение, если выученный селектор перестал срабатывать"""
+        for field in SELECTOR_FIELDS:
+            found = self.hits[field] + self.fallbacks[field]
+            if not found and not self.not_found[field]:
+                continue
+            logger.info("Селекторы '%s': выученный сработал %s, запасной %s, не найдено %s",
+                        field, self.hits[field], self.fallbacks[field], self.not_found[field])
+            if self.learned.get(field) and found and self.hits[field] / found < SELECTOR_HIT_WARN_RATE:
+                logger.warning("✗ Селектор '%s' для поля '%s' срабатывает на %.0f%% карточек - "
+                               "возможно, изменилась разметка сайта",
+                               self.learned[field], field, 100 * self.hits[field] / found)
+    
+    def save(self, path):
+        """Запись профиля: для каждого поля - селектор, сработавший чаще всего в этом запуске"""
+        for field, counts in self.winners.items():
+            if counts:
+                self.learned[field] = max(counts, key=counts.get)
+        try:
+            _write_atomic(path, json.dumps({"fields": self.learned, "updated_at": datetime.now().isoformat()},
+                                           ensure_ascii=False, indent=2))
+        except OSError as e:
+            logger.error("✗ Не удалось записать профиль селекторов: %s", e)
+
+
+# Профиль селекторов текущего процесса (см. parse_concerts)
+selector_profile = SelectorProfile()
+
+
+# Извлечение полей всех карточек за один вызов page.evaluate
+# (те же каскады, что и раньше выполнялись через query_selector по каждой карточке;
+#  порядок каскадов передается из SelectorProfile)
+EXTRACT_CARDS_JS = """
+([cardSelector, s, start]) => {
+    const text = (el) => (el.textContent || "").trim();
+    return Array.from(document.querySelectorAll(cardSelector)).slice(start).map((card) => {
+        const raw = {
+            date: "", date_selector: null,
+            link_text: null, link_href: null, link_selector: null,
+            venues: [],
+            button_text: null, button_selector: null,
+            ticket_href: null, ticket_selector: null,
+        };
+        for (const sel of s.date) {
+            const el = card.querySelector(sel);
+            if (el && text(el)) {
+                raw.date = text(el);
+                raw.date_selector = sel;
+                break;
+            }
+        }
+        for (const sel of s.link) {
+            const el = card.querySelector(sel);
+            if (el) {
+                raw.link_text = text(el);
+                raw.link_href = el.getAttribute("href") && new URL(el.getAttribute("href"), document.baseURI).href;
+                raw.link_selector = sel;
+                break;
+            }
+        }
+        raw.venues = Array.from(card.querySelectorAll(s.venue)).map(text);
+        for (const sel of s.button) {
+            const el = card.querySelector(sel);
+            if (el) {
+                raw.button_text = text(el);
+                raw.button_selector = sel;
+                break;
+            }
+        }
+        for (const sel of s.ticket) {
+            const el = card.querySelector(sel);
+            const href = el ? el.getAttribute("href") : null;
+            if (href && (href.includes("qtickets") || href.includes("ticket"))) {
+                raw.ticket_href = new URL(href, document.baseURI).href;
+                raw.ticket_selector = sel;
+                break;
+            }
+        }
+        return raw;
+    });
+}
+"""
+
+
+def extract_cards(page, working_selector, start=0):
+    """
+    Извлечение сырых полей всех карточек концертов за один round-trip в браузер
+    
+    Args:
+        page: Page объект Playwright
+        working_selector: Селектор карточек концертов
+        start: С какой по счету карточки извлекать (при скроллинге - только новые)
+        
+    Returns:
+        list[dict]: Сырые поля карточек (date, link_text, link_href, venues,
+            button_text, ticket_href и селекторы, которыми они найдены)
+    """
+    # Каскады в порядке профиля: выученный селектор пробуется первым
+    selectors = {
+        "date": selector_profile.ordered("date", DATE_SELECTORS),
+        "link": selector_profile.ordered("link", LINK_SELECTORS),
+        "venue": VENUE_SELECTOR,
+        "button": selector_profile.ordered("button", BUTTON_SELECTORS),
+        "ticket": selector_profile.ordered("ticket", TICKET_LINK_SELECTORS),
+    }
+    with metrics.span("card_extract"):
+        raw_cards = page.evaluate(EXTRACT_CARDS_JS, [working_selector, selectors, start])
+    selector_profile.record_cards(raw_cards)
+    logger.debug("Извлечены поля %s карточек (с #%s) за один вызов page.evaluate", len(raw_cards), start + 1)
+    return raw_cards
+
+
+class TicketStatus(StrEnum):
+    """Статус билетов концерта (значение - текст для XLSX и истории)"""
+    ON_SALE = "Продаются"
+    SOLD_OUT = "Проданы"
+    PASSED = "Мероприятие прошло"
+    # Страница билетов не загрузилась (после всех повторов)
+    TIMED_OUT = "Таймаут"
+    UNKNOWN = ""
+
+
+@dataclass(slots=True)
+class ConcertRecord:
+    """
+    Данные одного концерта
+    
+    Поля нормализованы при разборе карточки: дата разобрана в datetime (исходный
+    текст остается для XLSX), места - int, статус - TicketStatus, key - стабильный
+    ключ из ссылки карточки (см. concert_key). Без __dict__ на каждую запись.
+    """
+    key: str | None = None
+    date_text: str = ""
+    date: datetime | None = None
+    city: str = ""
+    venue: str = ""
+    program: str = ""
+    status: TicketStatus = TicketStatus.UNKNOWN
+    available_seats: int | None = None
+    seat_sections: dict | None = None
+    
+    def to_row(self):
+        """Строка XLSX (порядок как в XLSX_HEADERS)"""
+        return [self.date_text, self.city, self.venue, self.program, self.status.value,
+                self.available_seats if self.available_seats is not None else ""]
+    
+    def to_dict(self):
+        """Словарь для JSON (кэш, журнал): дата - ISO строка, статус - текст"""
+        data = asdict(self)
+        data["date"] = self.date.isoformat() if self.date else None
+        data["status"] = self.status.value
+        return data
+    
+    @classmethod
+    def from_dict(cls, data, key=None):
+        """
+        Запись из словаря to_dict или из прежнего формата concert_data
+        
+        Прежний формат (date, ticket_status, available_seats строкой) остается
+        в кэше и журнале, записанных до перехода на ConcertRecord.
+        """
+        if "ticket_status" in data:
+            date_text = data.get("date", "")
+            seats = data.get("available_seats")
+            return cls(
+                key=key, date_text=date_text, date=parse_concert_date(date_text),
+                city=data.get("city", ""), venue=data.get("venue", ""), program=data.get("program", ""),
+                status=TicketStatus(data["ticket_status"]),
+                available_seats=int(seats) if seats not in (None, "") else None,
+                seat_sections=data.get("seat_sections"),
+            )
+        date = data.get("date")
+        return cls(
+            key=data.get("key") or key, date_text=data.get("date_text", ""),
+            date=datetime.fromisoformat(date) if date else None,
+            city=data.get("city", ""), venue=data.get("venue", ""), program=data.get("program", ""),
+            status=TicketStatus(data.get("status", "")), available_seats=data.get("available_seats"),
+            seat_sections=data.get("seat_sections"),
+        )
+
+
+# Текст ссылки карточки: "<программа> в <городе>"
+CITY_PATTERN = re.compile(r'в\s+([А-Яа-яЁё\-]+)')
+PROGRAM_SEPARATOR = " в "
+
+
+def build_concert_data(raw, idx, today=None):
+    """
+    Разбор сырых полей карточки в запись концерта (без обращений к браузеру)
+    
+    Args:
+        raw: Сырые поля карточки из extract_cards
+        idx: Номер концерта для логирования
+        today: Дата запуска для дат карточек без года (None - сейчас)
+        
+    Returns:
+        tuple: (ConcertRecord, ссылка на билеты или None)
+    """
+    concert_data = ConcertRecord(key=concert_key(raw))
+    ticket_url = None
+    
+    # Дата
+    if raw["date"]:
+        concert_data.date_text = raw["date"]
+        concert_data.date = parse_concert_date(raw["date"], today)
+        logger.debug("[ID:%s] ✓ Дата найдена (селектор '%s'): '%s'", idx, raw['date_selector'], raw['date'])
+    else:
+        logger.warning("[ID:%s] ✗ Дата не найдена", idx)
+    
+    # Город и программа из текста ссылки
+    if raw["link_text"] is not None:
+        full_text = raw["link_text"]
+        logger.debug("[ID:%s] Полный текст ссылки (селектор '%s'): '%s'", idx, raw['link_selector'], full_text)
+        
+        # Извлечение города
+        city_match = CITY_PATTERN.search(full_text)
+        if city_match:
+            concert_data.city = city_match.group(1)
+            logger.debug("[ID:%s] ✓ Город найден: '%s'", idx, concert_data.city)
+        else:
+            logger.warning("[ID:%s] ✗ Город не найден в тексте", idx)
+        
+        # Извлечение программы
+        concert_data.program = full_text.partition(PROGRAM_SEPARATOR)[0].strip()
+        logger.debug("[ID:%s] ✓ Программа найдена: '%s'", idx, concert_data.program)
+    else:
+        logger.warning("[ID:%s] ✗ Ссылка с информацией не найдена", idx)
+    
+    # Площадка обычно последний элемент (после даты и времени)
+    venues = raw["venues"]
+    if len(venues) >= 3:
+        concert_data.venue = venues[-1]
+        logger.debug("[ID:%s] ✓ Площадка найдена: '%s'", idx, concert_data.venue)
+    elif len(venues) >= 2:
+        # Если элементов меньше, берем второй
+        concert_data.venue = venues[1]
+        logger.debug("[ID:%s] ✓ Площадка найдена (вариант 2): '%s'", idx, concert_data.venue)
+    else:
+        logger.warning("[ID:%s] ✗ Площадка не найдена", idx)
+    
+    # Статус билетов
+    if raw["button_text"] is not None:
+        button_text = raw["button_text"]
+        logger.debug("[ID:%s] Текст кнопки (селектор '%s'): '%s'", idx, raw['button_selector'], button_text)
+        
+        if "Все билеты проданы" in button_text:
+            concert_data.status = TicketStatus.SOLD_OUT
+            logger.debug("[ID:%s] ✓ Статус: Проданы", idx)
+        else:
+            concert_data.status = TicketStatus.ON_SALE
+            logger.debug("[ID:%s] ✓ Статус: Продаются", idx)
+            
+            # Если билеты продаются, нужна страница билетов для вместимости
+            if raw["ticket_href"]:
+                ticket_url = raw["ticket_href"]
+                logger.debug("[ID:%s] Ссылка на билеты (селектор '%s'): %s",
+                             idx, raw['ticket_selector'], ticket_url)
+            else:
+                logger.warning("[ID:%s] ✗ Ссылка на билеты не найдена", idx)
+    else:
+        logger.warning("[ID:%s] ✗ Кнопка билетов не найдена", idx)
+    
+    return concert_data, ticket_url
+
+
+class ListingEndpointChanged(Exception):
+    """Ответ страницы/пагинации списка концертов не похож на ожидаемый"""
+
+
+# Якорь пагинации Elementor Pro (infinite scroll / "загрузить еще")
+LOAD_MORE_ANCHOR_SELECTOR = ".e-load-more-anchor"
+HTTP_LISTING_MAX_PAGES = 200
+
+
+def _node_text(node):
+    """Аналог textContent.trim() для узла selectolax"""
+    return node.text(deep=True, separator="", strip=False).strip()
+
+
+def _raw_card_from_node(card, base_url, cascades):
+    """
+    Сырые поля карточки из HTML (те же каскады и тот же формат, что EXTRACT_CARDS_JS)
+    
+    Args:
+        card: Узел карточки selectolax
+        base_url: URL страницы для относительных ссылок
+        cascades: Каскады селекторов полей в порядке профиля ({"date": [...], "link": ...})
+    """
+    raw = {
+        "date": "", "date_selector": None,
+        "link_text": None, "link_href": None, "link_selector": None,
+        "venues": [],
+        "button_text": None, "button_selector": None,
+        "ticket_href": None, "ticket_selector": None,
+    }
+    for sel in cascades["date"]:
+        el = card.css_first(sel)
+        if el is not None and _node_text(el):
+            raw["date"] = _node_text(el)
+            raw["date_selector"] = sel
+            break
+    for sel in cascades["link"]:
+        el = card.css_first(sel)
+        if el is not None:
+            raw["link_text"] = _node_text(el)
+            raw["link_href"] = el.attributes.get("href") and urljoin(base_url, el.attributes["href"])
+            raw["link_selector"] = sel
+            break
+    raw["venues"] = [_node_text(el) for el in card.css(VENUE_SELECTOR)]
+    for sel in cascades["button"]:
+        el = card.css_first(sel)
+        if el is not None:
+            raw["button_text"] = _node_text(el)
+            raw["button_selector"] = sel
+            break
+    for sel in cascades["ticket"]:
+        el = card.css_first(sel)
+        href = el.attributes.get("href") if el is not None else None
+        if href and ("qtickets" in href or "ticket" in href):
+            raw["ticket_href"] = urljoin(base_url, href)
+            raw["ticket_selector"] = sel
+            break
+    return raw
+
+
+def parse_listing_html(html, page_url):
+    """
+    Разбор HTML страницы (или фрагмента) списка концертов без браузера
+    
+    Args:
+        html: HTML страницы
+        page_url: URL страницы (для относительных ссылок)
+        
+    Returns:
+        tuple: (сырые поля карточек, рабочий селектор, URL следующей страницы или None)
+    """
+    from selectolax.lexbor import LexborHTMLParser
+    
+    tree = LexborHTMLParser(html)
+    
+    working_selector = None
+    cards = []
+    for selector in selector_profile.ordered("card", CARD_SELECTORS):
+        cards = tree.css(selector)
+        if cards:
+            working_selector = selector
+            break
+    selector_profile.record("card", working_selector)
+    
+    next_page_url = None
+    anchor = tree.css_first(LOAD_MORE_ANCHOR_SELECTOR)
+    if anchor is not None:
+        page_num = int(anchor.attributes.get("data-page") or 0)
+        max_page = int(anchor.attributes.get("data-max-page") or 0)
+        next_page = anchor.attributes.get("data-next-page")
+        if next_page and page_num < max_page:
+            next_page_url = urljoin(page_url, next_page)
+    
+    cascades = {
+        "date": selector_profile.ordered("date", DATE_SELECTORS),
+        "link": selector_profile.ordered("link", LINK_SELECTORS),
+        "button": selector_profile.ordered("button", BUTTON_SELECTORS),
+        "ticket": selector_profile.ordered("ticket", TICKET_LINK_SELECTORS),
+    }
+    raw_cards = [_raw_card_from_node(card, page_url, cascades) for card in cards]
+    selector_profile.record_cards(raw_cards)
+    return raw_cards, working_selector, next_page_url
+
+
+def fetch_listing_http(base_url, timeout=15.0, max_pages=HTTP_LISTING_MAX_PAGES, html_pages=None, on_cards=None):
+    """
+    Загрузка всех карточек концертов напрямую через пагинацию Elementor
+    
+    Повторяет запросы, которые делает контейнер карточек при скролле: следует
+    по data-next-page якоря пагинации, переиспользуя соединения одного HTTP клиента.
+    
+    Args:
+        base_url: URL страницы концертов
+        timeout: Таймаут одного запроса, секунды
+        max_pages: Защита от бесконечной пагинации
+        html_pages: Список, в который добавляются (url, html) загруженных страниц (для архива)
+        on_cards: Вызывается с карточками каждой страницы пагинации сразу после ее разбора
+        
+    Returns:
+        list[dict]: Сырые поля карточек (формат extract_cards)
+        
+    Raises:
+        ListingEndpointChanged: Ответ не похож на ожидаемую страницу списка
+    """
+    import httpx
+    
+    raw_cards = []
+    seen_keys = set()
+    page_url = base_url
+    pages = 0
+    headers = {"User-Agent": BROWSER_CONTEXT_OPTIONS["user_agent"]}
+    
+    with httpx.Client(headers=headers, timeout=timeout, follow_redirects=True) as client:
+        while page_url and pages < max_pages:
+            pages += 1
+            response = client.get(page_url)
+            if response.status_code != 200:
+                raise ListingEndpointChanged(f"{page_url}: HTTP {response.status_code}")
+            if "html" not in response.headers.get("content-type", ""):
+                raise ListingEndpointChanged(f"{page_url}: неожиданный тип ответа "
+                                             f"'{response.headers.get('content-type')}'")
+            
+            if html_pages is not None:
+                html_pages.append((str(response.url), response.text))
+            page_cards, working_selector, next_page_url = parse_listing_html(response.text, str(response.url))
+            if not working_selector:
+                raise ListingEndpointChanged(f"{page_url}: карточки концертов не найдены")
+            
+            logger.debug("HTTP страница #%s: %s карточек (селектор: '%s')",
+                         pages, len(page_cards), working_selector)
+            page_cards = unique_cards(page_cards, seen_keys)
+            raw_cards.extend(page_cards)
+            if on_cards and page_cards:
+                on_cards(page_cards)
+            page_url = next_page_url
+    
+    if page_url:
+        logger.warning("Достигнут лимит страниц пагинации (%s). Загружено: %s", max_pages, len(raw_cards))
+    logger.info("✓ HTTP: загружено %s карточек за %s запросов", len(raw_cards), pages)
+    return raw_cards
+
+
+def load_listing_http(base_url, html_pages=None, on_cards=None):
+    """
+    Быстрый путь без браузера
+    
+    Args:
+        base_url: URL страницы концертов
+        html_pages: Список для (url, html) загруженных страниц (см. fetch_listing_http)
+        on_cards: Обработчик карточек каждой страницы (см. fetch_listing_http)
+    
+    Returns:
+        list[dict] или None: Сырые поля карточек; None - нужен путь через Playwright
+    """
+    logger.info("Загрузка списка концертов по HTTP: %s", base_url)
+    try:
+        with metrics.span("listing_http"):
+            return fetch_listing_http(base_url, html_pages=html_pages, on_cards=on_cards)
+    except ImportError as e:
+        logger.warning("✗ HTTP режим недоступен (не установлены зависимости: %s), используем браузер", e.name)
+    except ListingEndpointChanged as e:
+        logger.warning("✗ Формат списка концертов изменился (%s), используем браузер", e)
+    except Exception as e:
+        logger.warning("✗ Ошибка HTTP загрузки списка (%s), используем браузер", e)
+    return None
+
+
+def load_listing_page(page, url, resource_policy=None, html_pages=None, on_cards=None):
+    """
+    Переход на страницу концертов, скроллинг и извлечение карточек в открытой странице
+    
+    Если скроллинг остановлен по бюджету памяти, список продолжается со следующей
+    страницы пагинации в новой странице браузера (прежняя закрывается), уже
+    переданные карточки не повторяются. Новая страница закрывается в конце.
+    
+    Args:
+        page: Page объект sync Playwright
+        url: URL страницы концертов
+        resource_policy: ResourcePolicy контекста страницы (определяет wait_until)
+        html_pages: Список, в который добавляется (url, html) отрисованной страницы (для архива)
+        on_cards: Обработчик новых карточек во время скроллинга (см. scroll_to_load_all_concerts)
+    
+    Returns:
+        list[dict] или None: Сырые поля карточек; None - карточки не найдены
+    """
+    emitted_cards = []
+    seen_keys = set()
+    
+    def collect_and_emit(batch):
+        emitted_cards.extend(batch)
+        if on_cards:
+            on_cards(batch)
+    
+    first_page = page
+    working_selector = None
+    while True:
+        # Переход на страницу концертов
+        logger.info("Переход на URL: %s", url)
+        with metrics.span("page_goto"):
+            page.goto(url, wait_until=resource_policy.wait_until if resource_policy else "networkidle",
+                      timeout=30000)
+        logger.info("Страница успешно загружена")
+        
+        # Ожидание загрузки контента (страница динамическая)
+        logger.info("Ожидание появления карточек концертов")
+        with metrics.span("listing_ready"):
+            cards_wait = wait_for_concert_cards(page)
+        
+        # Скроллим для загрузки всех концертов (новые карточки сразу уходят в on_cards)
+        with metrics.span("scroll_to_load_all_concerts"):
+            _, page_selector, scroll_wait, resume_url = scroll_to_load_all_concerts(
+                page, on_cards=collect_and_emit, seen_keys=seen_keys)
+        logger.info("Ожидание загрузки списка: %.2f с", cards_wait + scroll_wait)
+        
+        if not page_selector:
+            break
+        working_selector = page_selector
+        if html_pages is not None:
+            html_pages.append((page.url, page.content()))
+        if not resume_url:
+            break
+        
+        # Продолжение списка на новой странице: renderer прежней закрывается вместе с ее DOM
+        previous_page, page = page, page.context.new_page()
+        previous_page.close()
+        url = resume_url
+    
+    if page is not first_page:
+        page.close()
+    if not working_selector:
+        return None
+    
+    logger.info("Карточки извлечены во время скроллинга: %s (селектор: '%s')", len(emitted_cards), working_selector)
+    return emitted_cards
+
+
+def load_listing_browser(url, resource_policy=None, html_pages=None, on_cards=None):
+    """
+    Загрузка списка концертов через Playwright: переход, скроллинг, извлечение
+    
+    Args:
+        url: URL страницы концертов
+        resource_policy: ResourcePolicy для блокировки тяжелых ресурсов (None - без блокировки)
+        html_pages: Список для (url, html) отрисованной страницы (см. load_listing_page)
+        on_cards: Обработчик новых карточек во время скроллинга (см. load_listing_page)
+    
+    Returns:
+        list[dict] или None: Сырые поля карточек; None - карточки не найдены
+    """
+    from playwright.sync_api import sync_playwright
+    
+    with sync_playwright() as p:
+        logger.info("Запуск Playwright")
+        
+        # Запуск браузера
+        logger.info("Запуск браузера Chromium в headless режиме")
+        with metrics.span("browser_launch"):
+            browser = p.chromium.launch(headless=True)
+        logger.info("Браузер успешно запущен")
+        
+        try:
+            # Создание контекста и страницы
+            logger.info("Создание контекста браузера")
+            context = browser.new_context(**BROWSER_CONTEXT_OPTIONS)
+            if resource_policy:
+                resource_policy.install(context)
+            logger.info("Контекст создан")
+            
+            logger.info("Создание новой страницы")
+            page = context.new_page()
+            logger.info("Страница создана")
+            
+            return load_listing_page(page, url, resource_policy, html_pages, on_cards)
+        
+        finally:
+            if resource_policy:
+                logger.info("Ресурсы страницы концертов: %s", resource_policy.summary())
+            logger.info("Закрытие браузера")
+            browser.close()
+            logger.info("Браузер закрыт")
+
+
+class ListingBrowser:
+    """
+    Долгоживущий браузер для страницы концертов (режим демона)
+    
+    Браузер и контекст запускаются один раз, страница пересоздается каждые
+    recycle_after загрузок списка. Работает на sync Playwright, поэтому все
+    вызовы должны идти из одного потока.
+    """
+    
+    def __init__(self, resource_policy=None, recycle_after=10):
+        self.resource_policy = resource_policy
+        self.recycle_after = max(1, recycle_after)
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._page = None
+        self._page_loads = 0
+    
+    def start(self):
+        """Запуск Playwright, браузера и контекста"""
+        from playwright.sync_api import sync_playwright
+        
+        if self._browser:
+            return
+        logger.info("Запуск браузера страницы концертов")
+        with metrics.span("browser_launch"):
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=True)
+        self._context = self._browser.new_context(**BROWSER_CONTEXT_OPTIONS)
+        if self.resource_policy:
+            self.resource_policy.install(self._context)
+    
+    def load(self, url):
+        """
+        Загрузка списка концертов в теплом браузере
+        
+        Returns:
+            list[dict] или None: Сырые поля карточек
+        """
+        self.start()
+        if self._page and (self._page_loads >= self.recycle_after or self._page.is_closed()):
+            logger.info("Замена страницы концертов после %s загрузок", self._page_loads)
+            self._page.close()
+            self._page = None
+        if not self._page:
+            self._page = self._context.new_page()
+            self._page_loads = 0
+        self._page_loads += 1
+        return load_listing_page(self._page, url, self.resource_policy)
+    
+    def close(self):
+        """Закрытие браузера и остановка Playwright"""
+        if not self._browser:
+            return
+        try:
+            if self._browser:
+                self._browser.close()
+            if self._playwright:
+                self._playwright.stop()
+        except Exception as e:
+            logger.error("✗ Ошибка при закрытии браузера страницы концертов: %s", e)
+        self._browser = self._playwright = self._context = self._page = None
+        if self.resource_policy:
+            logger.info("Ресурсы страницы концертов: %s", self.resource_policy.summary())
+
+
+# Кэш концертов между запусками
+DEFAULT_CACHE_PATH = "concerts_cache.sqlite3"
+
+# Сколько секунд кэш считается актуальным для статуса (нет статуса - не кэшируется)
+STATUS_CACHE_TTLS = {
+    TicketStatus.PASSED: 7 * 24 * 3600,
+    TicketStatus.SOLD_OUT: 6 * 3600,
+}
+
+# Поля карточки, по которым считается хэш (без служебных имен селекторов)
+CARD_HASH_FIELDS = ("date", "link_text", "link_href", "venues", "button_text", "ticket_href")
+
+
+def concert_key(raw):
+    """
+    Стабильный ключ концерта: ссылка на билеты или ссылка карточки с датой
+    
+    Ссылка карточки ведет на страницу программы и общая у всех дат этой
+    программы (у карточек без ссылки на билеты, например распроданных), поэтому
+    к ней добавляется дата концерта.
+    """
+    if raw.get("ticket_href"):
+        return raw["ticket_href"]
+    link_href = raw.get("link_href")
+    if not link_href:
+        return None
+    date_text = " ".join((raw.get("date") or "").split())
+    return f"{link_href}#{date_text}" if date_text else link_href
+
+
+def card_hash(raw):
+    """Хэш содержимого карточки (меняется при любом изменении полей)"""
+    content = json.dumps([raw.get(field) for field in CARD_HASH_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def unique_cards(raw_cards, seen):
+    """
+    Карточки, ключ которых еще не встречался (бесконечный скролл повторяет карточки)
+    
+    Args:
+        raw_cards: Сырые поля карточек
+        seen: Множество уже принятых ключей (дополняется)
+    """
+    result = []
+    for raw in raw_cards:
+        dedup_key = concert_key(raw) or card_hash(raw)
+        if dedup_key not in seen:
+            seen.add(dedup_key)
+            result.append(raw)
+    return result
+
+
+class ConcertCache:
+    """
+    Кэш распарсенных концертов в SQLite
+    
+    Хранит последние данные концерта, хэш карточки и время получения по
+    стабильному ключу. Для неизменившихся карточек в конечных статусах
+    (пока не истек TTL статуса) страница билетов не открывается повторно.
+    """
+    
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttls=None):
+        self.path = str(path)
+        self.ttls = STATUS_CACHE_TTLS if ttls is None else ttls
+        self.hits = 0
+        self.misses = 0
+        
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS concerts ("
+            " key TEXT PRIMARY KEY,"
+            " card_hash TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        logger.info("Кэш концертов: %s", self.path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def lookup(self, key, content_hash, now=None):
+        """
+        Актуальные данные концерта из кэша
+        
+        Returns:
+            ConcertRecord или None: если карточка не изменилась и TTL статуса не истек
+        """
+        if not key:
+            self.misses += 1
+            return None
+        
+        row = self._conn.execute(
+            "SELECT card_hash, status, data, fetched_at FROM concerts WHERE key = ?", (key,)
+        ).fetchone()
+        
+        now = time.time() if now is None else now
+        if row:
+            cached_hash, status, data, fetched_at = row
+            ttl = self.ttls.get(status, 0)
+            if cached_hash == content_hash and now - fetched_at < ttl:
+                self.hits += 1
+                return ConcertRecord.from_dict(json.loads(data), key)
+        
+        self.misses += 1
+        return None
+    
+    def store(self, key, content_hash, concert_data, now=None):
+        """Сохранение итоговой записи концерта (ConcertRecord)"""
+        if not key:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO concerts (key, card_hash, status, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (key, content_hash, concert_data.status.value,
+             json.dumps(concert_data.to_dict(), ensure_ascii=False), time.time() if now is None else now),
+        )
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
+
+
+# Журнал запуска для продолжения после сбоя (--resume)
+DEFAULT_JOURNAL_PATH = "parser_journal.sqlite3"
+
+
+class RunJournal:
+    """
+    Журнал обработанных концертов текущего запуска в SQLite
+    
+    Каждый сохраненный концерт отмечается сразу, поэтому после падения или
+    прерывания запуск с resume=True продолжает незавершенный запуск: концерты
+    с той же карточкой берутся из журнала, остальные обрабатываются заново.
+    Концерты со статусом TicketStatus.TIMED_OUT не считаются обработанными.
+    
+    --resume нужен только последний незавершенный запуск, поэтому журнал хранит
+    один запуск: при открытии удаляются все остальные, при finish() - текущий.
+    """
+    
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, resume=False):
+        self.path = str(path)
+        self.resumed = 0
+        
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " started_at REAL NOT NULL,"
+            " finished_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS done ("
+            " run_id INTEGER NOT NULL,"
+            " key TEXT NOT NULL,"
+            " card_hash TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, key))"
+        )
+        
+        row = None
+        if resume:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1"
+            ).fetchone()
+        if row:
+            self.run_id = row[0]
+            count = self._conn.execute("SELECT COUNT(*) FROM done WHERE run_id = ?", (self.run_id,)).fetchone()[0]
+            logger.info("Журнал: продолжаем запуск #%s (обработано концертов: %s)", self.run_id, count)
+        else:
+            if resume:
+                logger.info("Журнал: незавершенных запусков нет, начинаем новый")
+            self.run_id = self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),)).lastrowid
+        # Прежние запуски продолжить уже нельзя (--resume берет последний незавершенный)
+        self._delete_runs("run_id != ?")
+        self._conn.commit()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def lookup(self, key, content_hash):
+        """
+        Данные концерта, уже обработанного в этом запуске
+        
+        Returns:
+            ConcertRecord или None: если концерт отмечен и карточка не изменилась
+        """
+        if not key:
+            return None
+        row = self._conn.execute(
+            "SELECT card_hash, data FROM done WHERE run_id = ? AND key = ?", (self.run_id, key)
+        ).fetchone()
+        if row and row[0] == content_hash:
+            self.resumed += 1
+            return ConcertRecord.from_dict(json.loads(row[1]), key)
+        return None
+    
+    def mark_done(self, key, content_hash, concert_data):
+        """Отметка сохраненного концерта (концерты с таймаутом не отмечаются)"""
+        if not key or concert_data.status == TicketStatus.TIMED_OUT:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO done (run_id, key, card_hash, data) VALUES (?, ?, ?, ?)",
+            (self.run_id, key, content_hash, json.dumps(concert_data.to_dict(), ensure_ascii=False)),
+        )
+        self._conn.commit()
+    
+    def _delete_runs(self, condition):
+        """Удаление запусков и их концертов по условию на run_id (параметр - текущий запуск)"""
+        self._conn.execute(f"DELETE FROM done WHERE {condition}", (self.run_id,))
+        self._conn.execute(f"DELETE FROM runs WHERE {condition}", (self.run_id,))
+    
+    def finish(self):
+        """Запуск завершен: его концерты больше не нужны, следующий --resume начнет новый запуск"""
+        self._delete_runs("run_id = ?")
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
+
+
+# Архив сырых страниц (запись и повторный разбор без браузера)
+DEFAULT_ARCHIVE_DIR = "archive"
+
+
+class ConcertArchive:
+    """
+    Архив сырых страниц для повторного разбора без браузера и сети
+    
+    Содержимое хранится по sha256 в objects/<2 символа>/<хэш>.zst (сжатие zstd),
+    одинаковые страницы и ответы записываются один раз. Запуск описывается
+    манифестом runs/<run_id>.json: страницы списка концертов и снимки страниц
+    билетов со ссылками на объекты.
+    """
+    
+    def __init__(self, path=DEFAULT_ARCHIVE_DIR, level=10):
+        import zstandard
+        
+        self.path = Path(path)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self.written = 0
+        self.deduplicated = 0
+    
+    def _object_path(self, digest):
+        return self.path / "objects" / digest[:2] / f"{digest}.zst"
+    
+    def put(self, data):
+        """
+        Сохранение содержимого (str или bytes)
+        
+        Returns:
+            str: sha256 содержимого (ключ объекта)
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = self._object_path(digest)
+        if object_path.exists():
+            self.deduplicated += 1
+            return digest
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = object_path.with_suffix(".tmp")
+        tmp_path.write_bytes(self._compressor.compress(data))
+        os.replace(tmp_path, object_path)
+        self.written += 1
+        return digest
+    
+    def get(self, digest):
+        """Содержимое объекта (bytes)"""
+        return self._decompressor.decompress(self._object_path(digest).read_bytes())
+    
+    def get_text(self, digest):
+        return self.get(digest).decode("utf-8")
+    
+    def put_json(self, obj):
+        return self.put(json.dumps(obj, ensure_ascii=False, sort_keys=True))
+    
+    def get_json(self, digest):
+        return json.loads(self.get(digest))
+    
+    def save_run(self, manifest):
+        """Запись манифеста запуска в runs/<run_id>.json"""
+        runs_dir = self.path / "runs"
+        runs_dir.mkdir(parents=True, exist_ok=True)
+        run_path = runs_dir / f"{manifest['run_id']}.json"
+        _write_atomic(run_path, json.dumps(manifest, ensure_ascii=False, indent=1))
+        return run_path
+    
+    def load_run(self, run_id=None):
+        """
+        Манифест запуска
+        
+        Args:
+            run_id: Идентификатор запуска (None - последний записанный)
+        
+        Raises:
+            FileNotFoundError: Запуска нет в архиве
+        """
+        runs_dir = self.path / "runs"
+        if run_id is None:
+            runs = sorted(runs_dir.glob("*.json")) if runs_dir.exists() else []
+            if not runs:
+                raise FileNotFoundError(f"В архиве {self.path} нет записанных запусков")
+            run_path = runs[-1]
+        else:
+            run_path = runs_dir / f"{run_id}.json"
+        return json.loads(run_path.read_text(encoding="utf-8"))
+
+
+class RunRecorder:
+    """Запись страниц одного запуска в ConcertArchive"""
+    
+    def __init__(self, archive, base_url, engine):
+        self.archive = archive
+        self.manifest = {
+            "run_id": datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
+            "base_url": base_url,
+            "engine": engine,
+            "listing": [],
+            "tickets": {},
+        }
+    
+    def add_listing_pages(self, html_pages):
+        """Страницы списка концертов: [(url, html)]"""
+        for url, html in html_pages:
+            self.manifest["listing"].append({"url": url, "html": self.archive.put(html)})
+    
+    def add_ticket(self, snapshot, error=""):
+        """
+        Снимок страницы билетов из fetch_ticket_page(snapshot=True)
+        
+        Args:
+            snapshot: Снимок страницы (ключ "snapshot" результата)
+            error: Ошибка загрузки страницы из результата ("" - страница загружена)
+        """
+        self.manifest["tickets"][snapshot["url"]] = {
+            "error": error,
+            "html": self.archive.put(snapshot["html"]) if snapshot["html"] else None,
+            "iframe_html": self.archive.put(snapshot["iframe_html"]) if snapshot["iframe_html"] else None,
+            "payloads": [self.archive.put_json(payload) for payload in snapshot["payloads"]],
+            "banner": snapshot["banner"],
+            "hover_sections": snapshot["hover_sections"],
+        }
+    
+    def save(self):
+        run_path = self.archive.save_run(self.manifest)
+        logger.info("Архив: запуск %s записан (%s страниц списка, %s страниц билетов, "
+                    "новых объектов %s, повторов %s)", self.manifest["run_id"], len(self.manifest["listing"]),
+                    len(self.manifest["tickets"]), self.archive.written, self.archive.deduplicated)
+        return run_path
+
+
+def load_listing_archive(archive, manifest):
+    """
+    Сырые поля карточек из записанных страниц списка (разбор selectolax, как в HTTP режиме)
+    
+    Returns:
+        list[dict] или None: None - в архиве нет страниц списка или на них нет карточек
+    """
+    raw_cards = []
+    for listing_page in manifest["listing"]:
+        page_cards, working_selector, _ = parse_listing_html(archive.get_text(listing_page["html"]),
+                                                             listing_page["url"])
+        logger.info("Архив: %s карточек со страницы %s (селектор: '%s')",
+                    len(page_cards), listing_page["url"], working_selector)
+        raw_cards.extend(page_cards)
+    return raw_cards or None
+
+
+def replay_ticket_result(archive, entry):
+    """
+    Результат страницы билетов по снимку из архива (формат fetch_ticket_page)
+    
+    Места по JSON ответам схемы зала пересчитываются parse_seat_payload, результат
+    наведения курсора берется как записан. Страница, которая не загрузилась при
+    записи, воспроизводится с той же ошибкой.
+    """
+    if entry.get("error"):
+        return failed_ticket_result(entry["error"])
+    
+    result = failed_ticket_result()
+    if entry["banner"] is not None:
+        result["event_passed"] = True
+        result["message"] = entry["banner"]
+        return result
+    
+    with metrics.span("seat_payload_parse"):
+        seat_sections = merge_seat_payloads(archive.get_json(digest) for digest in entry["payloads"])
+    if seat_sections:
+        result["seats_source"] = "network"
+    elif entry["hover_sections"]:
+        seat_sections = entry["hover_sections"]
+        result["seats_source"] = "hover"
+    result["seat_sections"] = seat_sections
+    result["available_seats"] = sum(seat_sections.values())
+    return result
+
+
+class ReplayTicketPool:
+    """
+    Страницы билетов из архива вместо браузера
+    
+    Интерфейс как у TicketPagePool (start/submit/close), результат готов сразу.
+    """
+    
+    def __init__(self, archive, manifest):
+        self.archive = archive
+        self.tickets = manifest["tickets"]
+        self.missing = 0
+    
+    def start(self):
+        pass
+    
+    def submit(self, ticket_url, concert_idx):
+        future = Future()
+        entry = self.tickets.get(ticket_url)
+        if entry is None:
+            self.missing += 1
+            logger.warning("[ID:%s] ✗ Страницы билетов нет в архиве: %s", concert_idx, ticket_url)
+            future.set_result(failed_ticket_result("нет в архиве"))
+            return future
+        try:
+            future.set_result(replay_ticket_result(self.archive, entry))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def close(self):
+        if self.missing:
+            logger.warning("Архив: страниц билетов не найдено: %s", self.missing)
+
+
+# История запусков в Parquet (партиционирование по дате запуска)
+DEFAULT_HISTORY_DIR = "history"
+
+RU_MONTHS = {
+    "января": 1, "февраля": 2, "марта": 3, "апреля": 4, "мая": 5, "июня": 6,
+    "июля": 7, "августа": 8, "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12,
+}
+DATE_TEXT_PATTERN = re.compile(r'(\d{1,2})\s+([А-Яа-яЁё]+)(?:\s+(\d{4}))?')
+DATE_NUMERIC_PATTERN = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})\b')
+
+
+def parse_concert_date(text, today=None):
+    """
+    Разбор даты концерта из текста карточки ("21 октября", "21 октября 2025", "21.10.2025")
+    
+    Год, если его нет в тексте, выбирается так, чтобы дата была не раньше
+    чем месяц назад (в афише - предстоящие концерты).
     
-    Args:
-        page: Page объект Playwright
-        
     Returns:
-        tuple: (количество концертов, рабочий селектор)
+        datetime или None
     """
-    logger.info("Начинаем скроллинг страницы для загрузки всех концертов")
+    if not text:
+        return None
+    today = today or datetime.now()
     
-    # Пробуем разные селекторы
-    selectors_to_try = [
-        "div.elementor-loop-container > div",
-        "div[data-elementor-type='loop-item']",
-        "article.elementor-post",
-        "div.e-loop-item",
-    ]
+    match = DATE_NUMERIC_PATTERN.search(text)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        year = year + 2000 if year < 100 else year
+    else:
+        match = DATE_TEXT_PATTERN.search(text)
+        if not match or match.group(2).lower() not in RU_MONTHS:
+            return None
+        day, month = int(match.group(1)), RU_MONTHS[match.group(2).lower()]
+        year = int(match.group(3)) if match.group(3) else None
     
-    working_selector = None
-    for selector in selectors_to_try:
-        test_blocks = page.query_selector_all(selector)
-        if len(test_blocks) > 0:
-            working_selector = selector
-            logger.info(f"✓ Найден рабочий селектор: '{selector}' ({len(test_blocks)} элементов)")
-            break
+    try:
+        if year is not None:
+            return datetime(year, month, day)
+        parsed = datetime(today.year, month, day)
+        if (today - parsed).days > 31:
+            parsed = datetime(today.year + 1, month, day)
+        return parsed
+    except ValueError:
+        return None
+
+
+HISTORY_STATUS_CATEGORIES = [status.value for status in TicketStatus]
+
+
+def history_frame(records, run_ts):
+    """
+    Записи запуска в DataFrame с типизированной схемой истории
     
-    if not working_selector:
-        logger.error("✗ Не найден рабочий селектор для концертов")
-        return 0, None
+    Args:
+        records: Записи концертов (ConcertRecord)
+        run_ts: Время запуска
+    """
+    import pandas as pd
     
-    previous_count = 0
-    no_change_count = 0
-    scroll_iteration = 0
+    frame = pd.DataFrame.from_records(
+        [
+            {
+                "concert_key": record.key or "",
+                "date_text": record.date_text,
+                "concert_date": record.date,
+                "city": record.city,
+                "venue": record.venue,
+                "program": record.program,
+                "status": record.status.value,
+                "available_seats": record.available_seats or None,
+            }
+            for record in records
+        ],
+        columns=["concert_key", "date_text", "concert_date", "city", "venue", "program",
+                 "status", "available_seats"],
+    )
+    frame.insert(0, "run_ts", pd.Timestamp(run_ts))
+    frame["run_date"] = pd.Timestamp(run_ts).strftime("%Y-%m-%d")
     
-    while True:
-        scroll_iteration += 1
-        
-        # Скроллим вниз
-        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        page.wait_for_timeout(2000)  # Ждем загрузки новых элементов
-        
-        # Считаем количество концертов
-        concert_blocks = page.query_selector_all(working_selector)
-        current_count = len(concert_blocks)
-        
-        logger.info(f"Скроллинг #{scroll_iteration}: найдено концертов: {current_count}")
-        
-        # Если количество не изменилось
-        if current_count == previous_count:
-            no_change_count += 1
-            logger.info(f"Количество концертов не изменилось ({no_change_count}/3)")
-            
-            # Если 3 раза подряд количество не менялось, значит все загружено
-            if no_change_count >= 3:
-                logger.info(f"✓ Все концерты загружены. Итого: {current_count}")
-                break
-        else:
-            no_change_count = 0
-        
-        previous_count = current_count
-        
-        # Защита от бесконечного цикла
-        if scroll_iteration > 50:
-            logger.warning(f"Достигнут лимит скроллинга (50 итераций). Загружено: {current_count}")
-            break
+    for column in ("concert_key", "date_text", "city", "venue", "program"):
+        frame[column] = frame[column].astype("string")
+    frame["concert_date"] = pd.to_datetime(frame["concert_date"])
+    frame["status"] = pd.Categorical(frame["status"], categories=HISTORY_STATUS_CATEGORIES)
+    frame["available_seats"] = frame["available_seats"].astype("Int64")
+    # Распроданный концерт - 0 свободных мест, иначе продажи последних мест теряются в выборках
+    frame.loc[frame["status"] == TicketStatus.SOLD_OUT.value, "available_seats"] = frame["available_seats"].fillna(0)
+    return frame
+
+
+def append_run_history(records, run_ts, history_dir=DEFAULT_HISTORY_DIR):
+    """
+    Дописывание записей запуска в Parquet датасет history/run_date=YYYY-MM-DD/
+    
+    Каждое дописывание - отдельный файл внутри партиции, существующие файлы не
+    переписываются (в имени - время с микросекундами и случайный суффикс: демон
+    может дописать историю несколько раз за секунду).
+    
+    Returns:
+        int: Количество записанных строк
+    """
+    import uuid
+    
+    frame = history_frame(records, run_ts)
+    if frame.empty:
+        return 0
+    frame.to_parquet(
+        history_dir,
+        engine="pyarrow",
+        partition_cols=["run_date"],
+        index=False,
+        basename_template=f"run_{run_ts.strftime('%Y%m%dT%H%M%S%f')}_{uuid.uuid4().hex[:8]}_{{i}}.parquet",
+    )
+    logger.info("История: записано %s строк в %s", len(frame), history_dir)
+    return len(frame)
+
+
+def load_history(history_dir=DEFAULT_HISTORY_DIR, since=None,
+                 columns=("run_ts", "concert_key", "status", "available_seats")):
+    """
+    Загрузка истории запусков (только нужные столбцы и партиции)
+    
+    Args:
+        history_dir: Папка Parquet датасета
+        since: Дата (datetime/str YYYY-MM-DD) - читать партиции начиная с нее
+        columns: Столбцы для чтения (None - все)
+    """
+    import pandas as pd
+    
+    filters = None
+    if since is not None:
+        since = since if isinstance(since, str) else since.strftime("%Y-%m-%d")
+        filters = [("run_date", ">=", since)]
+    frame = pd.read_parquet(history_dir, engine="pyarrow", columns=list(columns) if columns else None,
+                            filters=filters)
+    return frame.sort_values(["concert_key", "run_ts"], kind="stable").reset_index(drop=True)
+
+
+def seats_sold_since_previous_run(history):
+    """
+    Продано мест между двумя последними запусками по каждому концерту
+    
+    Returns:
+        DataFrame: concert_key, previous_seats, available_seats, sold (только последний запуск)
+    """
+    history = history.sort_values(["concert_key", "run_ts"], kind="stable")
+    previous_seats = history.groupby("concert_key", sort=False)["available_seats"].shift()
+    latest = history["run_ts"] == history["run_ts"].max()
+    result = history.loc[latest, ["concert_key", "available_seats"]].copy()
+    result.insert(1, "previous_seats", previous_seats[latest])
+    result["sold"] = (result["previous_seats"] - result["available_seats"]).clip(lower=0)
+    return result.reset_index(drop=True)
+
+
+def sales_velocity(history):
+    """
+    Скорость продаж: мест в час по каждому концерту за всю историю
+    
+    Считаются только уменьшения свободных мест (возвраты билетов не вычитаются).
+    
+    Returns:
+        DataFrame: concert_key, sold_total, hours, seats_per_hour (по убыванию скорости)
+    """
+    import pandas as pd
+    
+    history = history.dropna(subset=["available_seats"]).sort_values(["concert_key", "run_ts"], kind="stable")
+    grouped = history.groupby("concert_key", sort=False)
+    sold = (-grouped["available_seats"].diff()).clip(lower=0)
+    hours = grouped["run_ts"].diff().dt.total_seconds() / 3600
+    
+    result = pd.DataFrame({"concert_key": history["concert_key"], "sold": sold, "hours": hours})
+    result = result.groupby("concert_key").agg(sold_total=("sold", "sum"), hours=("hours", "sum"))
+    result["seats_per_hour"] = (result["sold_total"] / result["hours"]).where(result["hours"] > 0)
+    return result.sort_values("seats_per_hour", ascending=False).reset_index()
+
+
+def status_changes(history):
+    """
+    Смены статуса между последовательными запусками
+    
+    Returns:
+        DataFrame: concert_key, run_ts, previous_status, status
+    """
+    history = history.sort_values(["concert_key", "run_ts"], kind="stable")
+    status = history["status"].astype("string")
+    previous_status = status.groupby(history["concert_key"], sort=False).shift()
+    changed = previous_status.notna() & (previous_status != status)
+    result = history.loc[changed, ["concert_key", "run_ts"]].copy()
+    result["previous_status"] = previous_status[changed]
+    result["status"] = status[changed]
+    return result.reset_index(drop=True)
+
+
+def apply_ticket_result(concert_data, ticket_result, idx):
+    """
+    Перенос результата страницы билетов в данные концерта
+    
+    Args:
+        concert_data: ConcertRecord из карточки (изменяется на месте)
+        ticket_result: Результат fetch_ticket_page или None (страницы билетов нет)
+        idx: Номер концерта для логирования
+    
+    Returns:
+        bool: Статус подтвержден карточкой или страницей билетов (не выведен из отсутствия мест)
+    """
+    if ticket_result is not None and ticket_result["error"]:
+        # Страница не загрузилась (таймаут, ошибка навигации, пул) - это не признак прошедшего концерта
+        concert_data.status = TicketStatus.TIMED_OUT
+        logger.warning("[ID:%s] ✗ Страница билетов не загружена (%s), статус '%s'",
+                       idx, ticket_result["error"], TicketStatus.TIMED_OUT)
+        return False
+    
+    if ticket_result is not None:
+        if ticket_result["event_passed"]:
+            # Меняем статус билетов
+            concert_data.status = TicketStatus.PASSED
+            logger.debug("[ID:%s] Статус изменен на 'Мероприятие прошло'", idx)
+        elif ticket_result["available_seats"] > 0:
+            concert_data.available_seats = ticket_result["available_seats"]
+            concert_data.seat_sections = ticket_result["seat_sections"]
+            logger.debug("[ID:%s] Места по секциям (%s): %s",
+                         idx, ticket_result['seats_source'], ticket_result['seat_sections'])
     
-    return current_count, working_selector
+    # Проверка: если не удалось спарсить свободные места и статус не "Проданы"
+    if (not concert_data.available_seats
+            and concert_data.status not in (TicketStatus.SOLD_OUT, TicketStatus.PASSED)):
+        logger.warning("[ID:%s] ✗ Свободные места не найдены, меняем статус", idx)
+        concert_data.status = TicketStatus.PASSED
+        logger.debug("[ID:%s] Статус изменен на 'Мероприятие прошло'", idx)
+        return False
+    return True
 
 
-def parse_concerts():
+def parse_concerts(ticket_concurrency=DEFAULT_TICKET_CONCURRENCY, per_host_limit=DEFAULT_PER_HOST_LIMIT,
+                   base_url=BASE_URL, engine="browser", cache_path=DEFAULT_CACHE_PATH, block_resources=True,
+                   output_path=None, metrics_json=DEFAULT_METRICS_JSON, metrics_prom=DEFAULT_METRICS_PROM,
+                   history_dir=DEFAULT_HISTORY_DIR, workers=1, record_archive=None, replay_archive=None,
+                   replay_run=None, journal_path=DEFAULT_JOURNAL_PATH, resume=False, retries=3,
+                   profile_path=DEFAULT_SELECTOR_PROFILE, ticket_engine="browser", seat_endpoints=None,
+                   memory_budget_mb=None, trace_memory=False, jsonl_path=None, write_xlsx=True):
     """
     Парсинг ВСЕХ концертов с сайта museshow.ru с автоскроллингом
+    
+    Страницы билетов загружаются параллельно пулом TicketPagePool по мере
+    обхода карточек, результаты собираются и сохраняются в исходном порядке
+    уже во время загрузки списка (готовые записи в начале очереди).
+    
+    Args:
+        ticket_concurrency: Количество одновременно открытых страниц билетов
+        per_host_limit: Максимум одновременных загрузок с одного хоста
+        base_url: URL страницы концертов
+        engine: "browser" - список через Playwright, "http" - напрямую через
+            пагинацию (с автоматическим откатом на Playwright)
+        cache_path: Путь к SQLite кэшу концертов (None - без кэша)
+        block_resources: Блокировать картинки, медиа, шрифты и трекеры (ResourcePolicy)
+        output_path: Путь к XLSX файлу (None - concerts_<дата_время>.xlsx)
+        metrics_json: Куда записать JSON сводку метрик (None - не записывать)
+        metrics_prom: Куда записать метрики в формате Prometheus (None - не записывать)
+        history_dir: Parquet датасет истории запусков (None - не записывать)
+        workers: Количество процессов для страниц билетов (больше 1 - ShardedTicketPool,
+            в каждом процессе свой браузер и ticket_concurrency страниц)
+        record_archive: Папка ConcertArchive для записи сырых страниц запуска (None - не записывать)
+        replay_archive: Папка ConcertArchive для повторного разбора без браузера и сети
+            (список и страницы билетов берутся из архива)
+        replay_run: Запуск из replay_archive (None - последний)
+        journal_path: SQLite журнал обработанных концертов (None - без журнала)
+        resume: Продолжить последний незавершенный запуск из журнала
+        retries: Попыток загрузки страницы билетов при таймауте
+        profile_path: JSON профиль селекторов (None - полные каскады, профиль не сохраняется)
+        ticket_engine: "browser" - страницы билетов в браузере, "api" - места по API
+            qtickets (QticketsApiPool), браузер - только для концертов, где API не ответил
+        seat_endpoints: Шаблоны адресов API мест (None - QTICKETS_SEAT_ENDPOINTS)
+        memory_budget_mb: Бюджет памяти парсера и браузера, МБ (None - только замеры);
+            при превышении пересоздаются страницы и контексты браузера (MemoryMonitor)
+        trace_memory: Замерять кучу Python через tracemalloc
+        jsonl_path: Поток JSON lines (ConcertJsonlSink): "-" - stdout, файл или FIFO
+            (None - без потока). С потоком XLSX собирается одним проходом в конце запуска
+        write_xlsx: Записывать XLSX отчет
+    
+    Returns:
+        dict: Итоги запуска (run_id, файл, количество карточек и обработанных концертов,
+            попадания кэша, сводка по этапам из RunMetrics.summary, время по шардам,
+            концерты с местами по API, максимумы памяти, строки потока JSON lines)
     """
     logger.info("=" * 80)
     logger.info("НАЧАЛО РАБОТЫ ПОЛНОЦЕННОГО ПАРСЕРА")
-    logger.info(f"Время запуска: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("Время запуска: %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     logger.info("=" * 80)
     
-    # Создаем XLSX файл с датой и временем
-    xlsx_filename = get_xlsx_filename_with_timestamp()
-    init_xlsx_file(xlsx_filename)
+    metrics.reset()
+    memory.configure(budget_mb=memory_budget_mb, trace_python=trace_memory)
+    if profile_path:
+        selector_profile.load(profile_path)
+    else:
+        selector_profile.learned = {}
+        selector_profile.reset()
+    run_ts = datetime.now()
+    run_started = time.perf_counter()
+    run_summary = {"run_id": run_ts.strftime("%Y-%m-%d_%H-%M-%S"), "xlsx": None, "cards": 0, "parsed": 0, "timed_out": 0, "resumed": 0,
+                   "cache_hits": 0, "cache_misses": 0, "stages": {}}
     
-    with sync_playwright() as p:
-        logger.info("Запуск Playwright")
+    archive = recorder = replay_manifest = None
+    if replay_archive:
+        archive = ConcertArchive(replay_archive)
+        replay_manifest = archive.load_run(replay_run)
+        logger.info("Повторный разбор запуска %s из архива %s", replay_manifest["run_id"], replay_archive)
+    elif record_archive:
+        try:
+            recorder = RunRecorder(ConcertArchive(record_archive), base_url, engine)
+        except ImportError as e:
+            logger.warning("✗ Архив не записывается (не установлен %s)", e.name)
+    html_pages = [] if recorder else None
+    
+    # Без потока XLSX пишется по ходу запуска с контрольными точками (файл открывается
+    # один раз на весь запуск), с потоком - собирается в конце из тех же записей
+    sink = ConcertJsonlSink(jsonl_path, run_id=run_summary["run_id"]) if jsonl_path else None
+    xlsx_filename = (output_path or get_xlsx_filename_with_timestamp()) if write_xlsx else None
+    run_summary["xlsx"] = xlsx_filename
+    xlsx_writer = ConcertXlsxWriter(xlsx_filename) if xlsx_filename and not sink else None
+    
+    # Браузер пула стартует в фоне, пока загружается страница концертов
+    # (с местами по API - только при первой странице, для которой API не ответил)
+    if replay_manifest:
+        browser_pool = ReplayTicketPool(archive, replay_manifest)
+    elif workers > 1:
+        browser_pool = ShardedTicketPool(workers=workers, concurrency=ticket_concurrency,
+                                         per_host_limit=per_host_limit, block_resources=block_resources,
+                                         record=recorder is not None, retries=retries,
+                                         memory_budget_mb=memory_budget_mb)
+    else:
+        browser_pool = TicketPagePool(concurrency=ticket_concurrency, per_host_limit=per_host_limit,
+                                      resource_policy=ResourcePolicy() if block_resources else None,
+                                      record=recorder is not None, retry_policy=RetryPolicy(attempts=retries))
+    ticket_pool = browser_pool
+    if ticket_engine == "api" and not replay_manifest:
+        ticket_pool = QticketsApiPool(browser_pool, endpoints=seat_endpoints or QTICKETS_SEAT_ENDPOINTS,
+                                      record=recorder is not None)
+    ticket_pool.start()
+    
+    cache = ConcertCache(cache_path) if cache_path else None
+    journal = RunJournal(journal_path, resume=resume) if journal_path else None
+    run_completed = False
+    # Сохраненные записи в порядке карточек (история и XLSX из потока)
+    history_records = []
+    
+    try:
+        # Конвейер: поток загрузки списка передает новые карточки в очередь сразу
+        # по мере скроллинга/пагинации, а основной поток разбирает их и ставит
+        # страницы билетов в пул, не дожидаясь конца списка
+        card_queue = queue.Queue()
+        listing_result = {}  # ошибка потока загрузки списка
         
-        # Запуск браузера
-        logger.info("Запуск браузера Chromium в headless режиме")
-        browser = p.chromium.launch(headless=True)
-        logger.info("Браузер успешно запущен")
+        def produce_cards():
+            try:
+                with metrics.span("listing"):
+                    raw_cards = None
+                    if replay_manifest:
+                        raw_cards = load_listing_archive(archive, replay_manifest)
+                        if raw_cards:
+                            card_queue.put(raw_cards)
+                    else:
+                        if engine == "http":
+                            raw_cards = load_listing_http(base_url, html_pages, on_cards=card_queue.put)
+                        if raw_cards is None:
+                            if html_pages:
+                                html_pages.clear()
+                            raw_cards = load_listing_browser(base_url,
+                                                             ResourcePolicy() if block_resources else None,
+                                                             html_pages, on_cards=card_queue.put)
+            except Exception as e:
+                listing_result["error"] = e
+            finally:
+                card_queue.put(None)
         
-        # Создание контекста и страницы
-        logger.info("Создание контекста браузера")
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        logger.info("Контекст создан")
+        producer = threading.Thread(target=produce_cards, name="listing", daemon=True)
+        producer.start()
         
-        logger.info("Создание новой страницы")
-        page = context.new_page()
-        logger.info("Страница создана")
+        # (idx, ключ, хэш карточки, concert_data, future страницы билетов или None,
+        #  источник данных, длительности этапов, время разбора карточки) в порядке карточек
+        parsed_cards = []
+        # Ключи уже принятых карточек: при откате с HTTP на браузер карточки
+        # приходят повторно (повторы внутри одной загрузки отсеивает сам список)
+        seen_keys = set()
+        idx = 0
+        parsed_count = 0
+        collected = 0  # карточки до этой позиции уже сохранены
         
-        try:
-            # Переход на страницу концертов
-            url = "https://museshow.ru/concerts/"
-            logger.info(f"Переход на URL: {url}")
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            logger.info("Страница успешно загружена")
-            
-            # Ожидание загрузки контента (страница динамическая)
-            logger.info("Ожидание загрузки динамического контента (5 секунд)")
-            page.wait_for_timeout(5000)  # Даем время на загрузку JS
-            
-            # Скроллим для загрузки всех концертов
-            total_concerts, working_selector = scroll_to_load_all_concerts(page)
-            
-            if not working_selector:
-                logger.error("Не удалось найти концерты на странице")
-                return
-            
-            # Получаем все блоки концертов используя найденный селектор
-            concert_cards = page.query_selector_all(working_selector)
-            logger.info(f"Начинаем парсинг {len(concert_cards)} концертов (селектор: '{working_selector}')")
-            
-            parsed_count = 0
-            
-            # Парсинг каждой карточки
-            for idx, card in enumerate(concert_cards, 1):
-                logger.info("=" * 60)
-                logger.info(f"ОБРАБОТКА КОНЦЕРТА #{idx} (ID:{idx})")
-                logger.info("=" * 60)
+        def collect(position):
+            """Результат страницы билетов карточки и сохранение записи (XLSX, поток, кэш, журнал)"""
+            nonlocal parsed_count
+            idx, key, content_hash, concert_data, ticket_future, source, stages, card_started = parsed_cards[position]
+            # Обработанная карточка больше не держит future и результат страницы билетов
+            parsed_cards[position] = None
+            current_concert_key.set(key)
+            try:
+                ticket_result = None
+                if ticket_future is not None:
+                    with metrics.span("ticket_wait", stages):
+                        try:
+                            ticket_result = ticket_future.result()
+                        except Exception as e:
+                            # Пул не смог загрузить страницу (запуск браузера, fallback) - запись
+                            # сохраняется со статусом "Таймаут", а не теряется
+                            logger.error("[ID:%s] ✗ Ошибка пула страниц билетов: %s", idx, e)
+                            ticket_result = failed_ticket_result("worker_failed")
+                    snapshot = ticket_result.pop("snapshot", None)
+                    if recorder and snapshot:
+                        recorder.add_ticket(snapshot, ticket_result["error"])
+                from_cache = source in ("cache", "journal")
+                status_confirmed = (from_cache
+                                    or apply_ticket_result(concert_data, ticket_result, idx))
                 
-                concert_data = {
-                    "date": "",
-                    "city": "",
-                    "venue": "",
-                    "program": "",
-                    "ticket_status": "",
-                    "available_seats": ""
-                }
+                # Сохранение данных
+                logger.debug("[ID:%s] Сохранение данных концерта", idx)
+                logger.debug("[ID:%s] Итоговые данные: %s", idx, concert_data)
+                if xlsx_writer:
+                    xlsx_writer.add(concert_data)
+                if sink:
+                    stages["card_to_result"] = time.perf_counter() - card_started
+                    sink.write(concert_data, idx=idx, source=source, stages=stages)
+                if cache and not from_cache and status_confirmed:
+                    cache.store(key, content_hash, concert_data)
+                if journal:
+                    journal.mark_done(key, content_hash, concert_data)
+                if concert_data.status == TicketStatus.TIMED_OUT:
+                    run_summary["timed_out"] += 1
+                history_records.append(concert_data)
+                
+                parsed_count += 1
+                logger.info("[ID:%s] ✓ УСПЕШНО ОБРАБОТАН (%s/%s): %s", idx, parsed_count, len(parsed_cards),
+                            concert_data.status)
                 
+            except Exception as e:
+                logger.error("[ID:%s] ✗ ОШИБКА при обработке: %s", idx, e, exc_info=True)
+        
+        # Разбор каждой карточки (локально, без обращений к браузеру); между пачками
+        # списка сохраняются уже готовые карточки из начала очереди
+        while True:
+            try:
+                batch = card_queue.get(timeout=COLLECT_POLL_INTERVAL)
+            except queue.Empty:
+                batch = ()
+            if batch is None:
+                break
+            for raw in unique_cards(batch, seen_keys):
                 try:
-                    # Извлечение даты
-                    logger.info(f"[ID:{idx}] Извлечение даты концерта")
-                    
-                    # Пробуем разные селекторы для даты
-                    date_selectors = [
-                        "div.jet-listing-dynamic-field__content",
-                        "div[class*='date']",
-                        "div.elementor-widget-container",
-                        "div",
-                    ]
-                    
-                    date_text = ""
-                    for date_sel in date_selectors:
-                        date_elements = card.query_selector_all(date_sel)
-                        if date_elements and len(date_elements) > 0:
-                            date_text = date_elements[0].text_content().strip()
-                            if date_text:
-                                concert_data["date"] = date_text
-                                logger.info(f"[ID:{idx}] ✓ Дата найдена (селектор '{date_sel}'): '{date_text}'")
-                                break
-                    
-                    if not date_text:
-                        logger.warning(f"[ID:{idx}] ✗ Дата не найдена")
-                    
-                    # Извлечение города и программы
-                    logger.info(f"[ID:{idx}] Извлечение города и программы")
-                    
-                    # Пробуем найти ссылку с информацией о концерте
-                    link_selectors = ["a[href*='-21-']", "a[href*='concert']", "a"]
-                    link_element = None
-                    for link_sel in link_selectors:
-                        link_element = card.query_selector(link_sel)
-                        if link_element:
-                            logger.info(f"[ID:{idx}] Ссылка найдена селектором '{link_sel}'")
-                            break
-                    
-                    if link_element:
-                        full_text = link_element.text_content().strip()
-                        logger.info(f"[ID:{idx}] Полный текст ссылки: '{full_text}'")
-                        
-                        # Извлечение города
-                        city_match = re.search(r'в\s+([А-Яа-яЁё\-]+)', full_text)
-                        if city_match:
-                            concert_data["city"] = city_match.group(1)
-                            logger.info(f"[ID:{idx}] ✓ Город найден: '{concert_data['city']}'")
-                        else:
-                            logger.warning(f"[ID:{idx}] ✗ Город не найден в тексте")
-                        
-                        # Извлечение программы
-                        program_parts = full_text.split(' в ')
-                        if program_parts:
-                            concert_data["program"] = program_parts[0].strip()
-                            logger.info(f"[ID:{idx}] ✓ Программа найдена: '{concert_data['program']}'")
-                        else:
-                            logger.warning(f"[ID:{idx}] ✗ Программа не найдена")
-                    else:
-                        logger.warning(f"[ID:{idx}] ✗ Ссылка с информацией не найдена")
-                    
-                    # Извлечение площадки
-                    logger.info(f"[ID:{idx}] Извлечение площадки")
-                    
-                    # Ищем все div с классом jet-listing-dynamic-field__content
-                    venue_elements = card.query_selector_all("div.jet-listing-dynamic-field__content")
-                    
-                    # Площадка обычно последний элемент (после даты и времени)
-                    if len(venue_elements) >= 3:
-                        venue_text = venue_elements[-1].text_content().strip()
-                        concert_data["venue"] = venue_text
-                        logger.info(f"[ID:{idx}] ✓ Площадка найдена: '{venue_text}'")
-                    elif len(venue_elements) >= 2:
-                        # Если элементов меньше, берем второй
-                        venue_text = venue_elements[1].text_content().strip()
-                        concert_data["venue"] = venue_text
-                        logger.info(f"[ID:{idx}] ✓ Площадка найдена (вариант 2): '{venue_text}'")
-                    else:
-                        logger.warning(f"[ID:{idx}] ✗ Площадка не найдена")
-                    
-                    # Извлечение статуса билетов
-                    logger.info(f"[ID:{idx}] Извлечение статуса билетов")
-                    
-                    # Пробуем разные селекторы для кнопки
-                    button_selectors = [
-                        "a.elementor-button span.elementor-button-text",
-                        "span.elementor-button-text",
-                        "a.elementor-button",
-                        "a[class*='button']",
-                    ]
-                    
-                    button = None
-                    for btn_sel in button_selectors:
-                        button = card.query_selector(btn_sel)
-                        if button:
-                            logger.info(f"[ID:{idx}] Кнопка найдена селектором '{btn_sel}'")
-                            break
+                    card_started = time.perf_counter()
+                    key = concert_key(raw)
+                    content_hash = card_hash(raw)
+                    idx += 1
                     
-                    if button:
-                        button_text = button.text_content().strip()
-                        logger.info(f"[ID:{idx}] Текст кнопки: '{button_text}'")
-                        
-                        if "Все билеты проданы" in button_text:
-                            concert_data["ticket_status"] = "Проданы"
-                            logger.info(f"[ID:{idx}] ✓ Статус: Проданы")
-                        else:
-                            concert_data["ticket_status"] = "Продаются"
-                            logger.info(f"[ID:{idx}] ✓ Статус: Продаются")
-                            
-                            # Если билеты продаются, пытаемся получить вместимость
-                            logger.info(f"[ID:{idx}] Попытка получить вместимость зала")
-                            
-                            # Пробуем найти ссылку на билеты
-                            ticket_link_selectors = [
-                                "a.elementor-button[href*='qtickets']",
-                                "a[href*='qtickets']",
-                                "a[href*='ticket']",
-                                "a.elementor-button",
-                            ]
-                            
-                            ticket_link = None
-                            for tl_sel in ticket_link_selectors:
-                                ticket_link = card.query_selector(tl_sel)
-                                if ticket_link:
-                                    href = ticket_link.get_attribute("href")
-                                    if href and ("qtickets" in href or "ticket" in href):
-                                        logger.info(f"[ID:{idx}] Ссылка на билеты найдена селектором '{tl_sel}'")
-                                        break
-                                    else:
-                                        ticket_link = None
-                            
-                            if ticket_link:
-                                ticket_url = ticket_link.get_attribute("href")
-                                logger.info(f"[ID:{idx}] Ссылка на билеты: {ticket_url}")
-                                
-                                try:
-                                    logger.info(f"[ID:{idx}] Открытие страницы билетов в новой вкладке")
-                                    ticket_page = context.new_page()
-                                    ticket_page.goto(ticket_url, wait_until="networkidle", timeout=15000)
-                                    logger.info(f"[ID:{idx}] Страница билетов загружена")
-                                    
-                                    # Проверка на плашку "мероприятие прошло"
-                                    logger.info(f"[ID:{idx}] Проверка на плашку 'мероприятие прошло'")
-                                    event_passed = ticket_page.query_selector("div.jquery-message-container")
-                                    if event_passed:
-                                        message_text = event_passed.text_content().strip()
-                                        logger.warning(f"[ID:{idx}] ✗ Мероприятие прошло: '{message_text}'")
-                                        # Меняем статус билетов
-                                        concert_data["ticket_status"] = "Мероприятие прошло"
-                                        logger.info(f"[ID:{idx}] Статус изменен на 'Мероприятие прошло'")
-                                        ticket_page.close()
-                                        # Не прерываем, продолжаем сохранение данных
-                                    else:
-                                        # Получаем iframe со схемой зала
-                                        logger.info(f"[ID:{idx}] Поиск iframe со схемой зала")
-                                        iframe_element = ticket_page.query_selector("iframe")
-                                        if iframe_element:
-                                            ticket_iframe = iframe_element.content_frame()
-                                            if ticket_iframe:
-                                                logger.info(f"[ID:{idx}] ✓ Iframe найден")
-                                                # Парсим свободные места
-                                                available_seats = parse_available_seats(ticket_iframe, idx)
-                                                concert_data["available_seats"] = str(available_seats) if available_seats > 0 else ""
-                                            else:
-                                                logger.warning(f"[ID:{idx}] ✗ Не удалось получить content_frame")
-                                        else:
-                                            logger.warning(f"[ID:{idx}] ✗ Iframe не найден")
-                                        
-                                        ticket_page.close()
-                                        logger.info(f"[ID:{idx}] Страница билетов закрыта")
-                                    
-                                except PlaywrightTimeout:
-                                    logger.error(f"[ID:{idx}] ✗ Таймаут при загрузке страницы билетов")
-                                except Exception as e:
-                                    logger.error(f"[ID:{idx}] ✗ Ошибка при получении вместимости: {e}")
-                            else:
-                                logger.warning(f"[ID:{idx}] ✗ Ссылка на билеты не найдена")
-                    else:
-                        logger.warning(f"[ID:{idx}] ✗ Кнопка билетов не найдена")
+                    logger.debug("=" * 60)
+                    logger.debug("ОБРАБОТКА КОНЦЕРТА #%s (ID:%s)", idx, idx)
+                    logger.debug("=" * 60)
+                    current_concert_key.set(key)
                     
-                    # Проверка: если не удалось спарсить свободные места и статус не "Проданы"
-                    if not concert_data["available_seats"] and concert_data["ticket_status"] != "Проданы":
-                        logger.warning(f"[ID:{idx}] ✗ Свободные места не найдены, меняем статус")
-                        concert_data["ticket_status"] = "Мероприятие прошло"
-                        logger.info(f"[ID:{idx}] Статус изменен на 'Мероприятие прошло'")
+                    journaled_data = journal.lookup(key, content_hash) if journal else None
+                    if journaled_data is not None:
+                        logger.debug("[ID:%s] ✓ Уже обработан в продолжаемом запуске: %s", idx, key)
+                        parsed_cards.append((idx, key, content_hash, journaled_data, None, "journal", {},
+                                             card_started))
+                        continue
+                    cached_data = cache.lookup(key, content_hash) if cache else None
+                    if cached_data is not None:
+                        logger.debug("[ID:%s] ✓ Карточка не изменилась, данные из кэша (статус '%s'): %s",
+                                     idx, cached_data.status, key)
+                        parsed_cards.append((idx, key, content_hash, cached_data, None, "cache", {}, card_started))
+                        continue
                     
-                    # Сохранение данных
-                    logger.info(f"[ID:{idx}] Сохранение данных концерта")
-                    logger.info(f"[ID:{idx}] Итоговые данные: {concert_data}")
-                    save_concert_to_xlsx(concert_data, xlsx_filename)
+                    stages = {}
+                    with metrics.span("card_build", stages):
+                        concert_data, ticket_url = build_concert_data(raw, idx, run_ts)
+                    ticket_future = None
+                    if ticket_url:
+                        logger.debug("[ID:%s] Страница билетов поставлена в очередь пула", idx)
+                        ticket_future = ticket_pool.submit(ticket_url, idx)
+                        if sink:
+                            ticket_future.add_done_callback(timing_callback(stages, "ticket_page"))
                     
-                    parsed_count += 1
-                    logger.info(f"[ID:{idx}] ✓ УСПЕШНО ОБРАБОТАН")
-                    logger.info(f"Прогресс: {parsed_count}/{len(concert_cards)} концертов")
+                    parsed_cards.append((idx, key, content_hash, concert_data, ticket_future,
+                                         "page" if ticket_url else "card", stages, card_started))
                     
                 except Exception as e:
-                    logger.error(f"[ID:{idx}] ✗ ОШИБКА при обработке: {e}", exc_info=True)
-            
-            logger.info("=" * 80)
-            logger.info(f"ПАРСИНГ ЗАВЕРШЕН")
-            logger.info(f"Успешно обработано концертов: {parsed_count} из {len(concert_cards)}")
-            logger.info(f"Данные сохранены в файл: {xlsx_filename}")
-            logger.info("=" * 80)
+                    logger.error("[ID:%s] ✗ ОШИБКА при обработке: %s", idx, e, exc_info=True)
             
+            while collected < len(parsed_cards) and (parsed_cards[collected][4] is None
+                                                    or parsed_cards[collected][4].done()):
+                collect(collected)
+                collected += 1
+        
+        producer.join()
+        if "error" in listing_result:
+            raise listing_result["error"]
+        if recorder:
+            recorder.add_listing_pages(html_pages)
+        
+        if not parsed_cards:
+            logger.error("Не удалось найти концерты на странице")
+            return run_summary
+        
+        run_summary["cards"] = len(parsed_cards)
+        logger.info("Список загружен: %s концертов (сохранено %s), страницы билетов уже загружаются",
+                    len(parsed_cards), collected)
+        
+        # Остальные результаты страниц билетов - в исходном порядке карточек
+        total_cards = len(parsed_cards)
+        for position in range(collected, total_cards):
+            collect(position)
+        
+        run_summary["parsed"] = parsed_count
+        
+        if history_dir:
+            try:
+                with metrics.span("history_save"):
+                    append_run_history(history_records, run_ts, history_dir)
+            except ImportError as e:
+                logger.warning("✗ История не записана (не установлен %s)", e.name)
+            except Exception as e:
+                logger.error("✗ Ошибка записи истории: %s", e)
+        
+        current_concert_key.set(None)
+        logger.info("=" * 80)
+        logger.info("ПАРСИНГ ЗАВЕРШЕН")
+        logger.info("Успешно обработано концертов: %s из %s", parsed_count, total_cards)
+        if xlsx_filename:
+            logger.info("Данные сохранены в файл: %s", xlsx_filename)
+        if sink:
+            logger.info("Поток JSON lines: %s строк", sink.lines_written)
+        if cache:
+            logger.info("Кэш: попаданий %s, промахов %s", cache.hits, cache.misses)
+        selector_profile.log_stats()
+        if profile_path:
+            selector_profile.save(profile_path)
+        if journal:
+            logger.info("Журнал: из продолжаемого запуска %s, со статусом '%s' %s (повторятся при --resume)",
+                        journal.resumed, TicketStatus.TIMED_OUT, run_summary["timed_out"])
+        logger.info("=" * 80)
+        run_completed = True
+        
+    except Exception as e:
+        logger.error("КРИТИЧЕСКАЯ ОШИБКА: %s", e, exc_info=True)
+    
+    finally:
+        if xlsx_writer:
+            xlsx_writer.close()
+        if sink:
+            sink.close()
+            run_summary["jsonl"] = {"lines": sink.lines_written,
+                                    "first_line_s": round(sink.first_line_at - run_started, 3)
+                                    if sink.first_line_at else None}
+            # XLSX - постобработка готовых записей потока одним проходом
+            if xlsx_filename and history_records:
+                try:
+                    save_concerts_xlsx(history_records, xlsx_filename)
+                except Exception as e:
+                    logger.error("✗ Не удалось записать XLSX: %s", e)
+        ticket_pool.close()
+        if recorder:
+            try:
+                recorder.save()
+            except OSError as e:
+                logger.error("✗ Не удалось записать архив: %s", e)
+        if workers > 1 and not replay_manifest:
+            run_summary["shards"] = {shard_id: {"pages": stats["jobs"], "elapsed": stats["elapsed"],
+                                                "error": stats.get("error", "")}
+                                     for shard_id, stats in sorted(browser_pool.shard_stats.items())}
+        if isinstance(ticket_pool, QticketsApiPool):
+            run_summary["ticket_api"] = {"api": ticket_pool.api_hits, "fallback": ticket_pool.fallbacks}
+        if cache:
+            run_summary["cache_hits"] = cache.hits
+            run_summary["cache_misses"] = cache.misses
+            cache.close()
+        if journal:
+            run_summary["resumed"] = journal.resumed
+            # Запуск с таймаутами остается незавершенным, чтобы --resume догрузил только их
+            if run_completed and not run_summary["timed_out"]:
+                journal.finish()
+            journal.close()
+        metrics.record("total", time.perf_counter() - run_started)
+        run_summary["memory"] = memory.log_summary()
+        
+        for name in ("cards", "parsed", "timed_out", "resumed", "cache_hits", "cache_misses"):
+            metrics.set_gauge(f"concerts_{name}", run_summary[name])
+        run_summary["stages"] = metrics.summary()
+        try:
+            if metrics_json:
+                metrics.write_json(metrics_json)
+            if metrics_prom:
+                metrics.write_prometheus(metrics_prom)
+        except OSError as e:
+            logger.error("✗ Не удалось записать метрики: %s", e)
+        
+        for stage, stats in run_summary["stages"].items():
+            logger.info("Этап %s: %s раз, всего %.2f с, p50 %.3f с, p95 %.3f с, p99 %.3f с",
+                        stage, stats['count'], stats['total'], stats['p50'], stats['p95'], stats['p99'])
+        logger.info("Работа парсера завершена")
+    
+    return run_summary
+
+
+# Режим демона: теплый браузер и адаптивное расписание опроса
+DAEMON_LISTING_INTERVAL = 15 * 60
+# (дней до концерта, интервал опроса страницы билетов в секундах)
+DAEMON_POLL_INTERVALS = ((1, 5 * 60), (7, 15 * 60), (30, 60 * 60))
+DAEMON_FAR_INTERVAL = 3 * 60 * 60
+DAEMON_SOLD_OUT_INTERVAL = 6 * 60 * 60
+DAEMON_MIN_INTERVAL = 2 * 60
+# Быстрые продажи (мест в час) - интервал опроса сокращается вдвое
+DAEMON_FAST_SELLING_RATE = 20
+DAEMON_RECYCLE_PAGES = 50
+# Максимальная пауза главного цикла (реакция на SIGTERM)
+DAEMON_TICK = 1.0
+
+
+def poll_interval(concert_date, ticket_status, seats_per_hour=0.0, now=None):
+    """
+    Интервал опроса страницы билетов концерта
+    
+    Чем ближе концерт и чем быстрее продаются билеты, тем чаще опрос.
+    
+    Args:
+        concert_date: datetime концерта или None (дата не распознана)
+        ticket_status: Статус билетов
+        seats_per_hour: Скорость продаж по последним опросам
+        now: Текущее время (для расчета дней до концерта)
+    
+    Returns:
+        float или None: Интервал в секундах; None - больше не опрашивать
+    """
+    if ticket_status == TicketStatus.PASSED:
+        return None
+    if ticket_status == TicketStatus.SOLD_OUT:
+        return DAEMON_SOLD_OUT_INTERVAL
+    
+    interval = DAEMON_FAR_INTERVAL
+    if concert_date is not None:
+        days_left = (concert_date - (now or datetime.now())).total_seconds() / 86400
+        for max_days, days_interval in DAEMON_POLL_INTERVALS:
+            if days_left <= max_days:
+                interval = days_interval
+                break
+    if seats_per_hour >= DAEMON_FAST_SELLING_RATE:
+        interval /= 2
+    return max(DAEMON_MIN_INTERVAL, interval)
+
+
+class ConcertDaemon:
+    """
+    Долгоживущий режим парсера
+    
+    Браузер страницы концертов и пул страниц билетов запускаются один раз.
+    Список концертов перечитывается каждые listing_interval секунд, а страницы
+    билетов опрашиваются по очереди с приоритетом (heapq по времени следующего
+    опроса): скорые и быстро продающиеся концерты чаще, дальние и распроданные
+    реже, прошедшие не опрашиваются. Страницы браузеров пересоздаются каждые
+    recycle_pages загрузок. Каждый результат опроса сразу пишется в поток
+    JSON lines (jsonl_path). SIGTERM/SIGINT завершают работу после текущих загрузок.
+    
+    Использование:
+        daemon = ConcertDaemon(base_url=BASE_URL)
+        daemon.install_signal_handlers()
+        daemon.run()
+    """
+    
+    def __init__(self, base_url=BASE_URL, engine="browser", ticket_concurrency=DEFAULT_TICKET_CONCURRENCY,
+                 per_host_limit=DEFAULT_PER_HOST_LIMIT, block_resources=True, cache_path=DEFAULT_CACHE_PATH,
+                 history_dir=DEFAULT_HISTORY_DIR, listing_interval=DAEMON_LISTING_INTERVAL,
+                 recycle_pages=DAEMON_RECYCLE_PAGES, metrics_json=DEFAULT_METRICS_JSON,
+                 metrics_prom=DEFAULT_METRICS_PROM, profile_path=DEFAULT_SELECTOR_PROFILE,
+                 ticket_engine="browser", seat_endpoints=None, memory_budget_mb=None, trace_memory=False,
+                 jsonl_path=None):
+        self.base_url = base_url
+        self.profile_path = profile_path
+        self.engine = engine
+        self.history_dir = history_dir
+        self.listing_interval = listing_interval
+        self.metrics_json = metrics_json
+        self.metrics_prom = metrics_prom
+        memory.configure(budget_mb=memory_budget_mb, trace_python=trace_memory)
+        
+        self.pool = TicketPagePool(concurrency=ticket_concurrency, per_host_limit=per_host_limit,
+                                   resource_policy=ResourcePolicy() if block_resources else None,
+                                   recycle_after=recycle_pages)
+        if ticket_engine == "api":
+            self.pool = QticketsApiPool(self.pool, endpoints=seat_endpoints or QTICKETS_SEAT_ENDPOINTS)
+        self.listing_browser = ListingBrowser(ResourcePolicy() if block_resources else None,
+                                              recycle_after=max(1, recycle_pages // 10))
+        self.cache = ConcertCache(cache_path) if cache_path else None
+        self.sink = (ConcertJsonlSink(jsonl_path, run_id=datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+                     if jsonl_path else None)
+        # Не больше задач в пуле, чем он успевает обработать - порядок задает очередь с приоритетом
+        self.max_in_flight = self.pool.concurrency * 2
+        
+        self.concerts = {}
+        self._schedule = []
+        self._schedule_seq = 0
+        self._in_flight = {}
+        self._pending_records = []
+        self._stop = threading.Event()
+    
+    def stop(self, signum=None, frame=None):
+        """Запрос остановки (обработчик сигналов)"""
+        if signum is not None:
+            logger.info("Получен сигнал %s, завершаем работу", signal.Signals(signum).name)
+        self._stop.set()
+    
+    def install_signal_handlers(self):
+        """Обработка SIGTERM и SIGINT (только из главного потока)"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+    
+    def _schedule_poll(self, key, delay):
+        state = self.concerts[key]
+        state["due"] = time.monotonic() + delay
+        self._schedule_seq += 1
+        heapq.heappush(self._schedule, (state["due"], self._schedule_seq, key))
+    
+    def _record(self, concert_data, idx=None, source="page", stages=None):
+        self._pending_records.append(concert_data)
+        if self.sink:
+            self.sink.write(concert_data, idx=idx, source=source, stages=stages)
+    
+    def refresh_listing(self):
+        """Перечитывание списка концертов: новые и измененные карточки ставятся в очередь сразу"""
+        with metrics.span("listing"):
+            raw_cards = load_listing_http(self.base_url) if self.engine == "http" else None
+            if raw_cards is None:
+                raw_cards = self.listing_browser.load(self.base_url)
+        if raw_cards is None:
+            logger.error("Не удалось найти концерты на странице")
+            return
+        
+        seen = set()
+        new_count = changed_count = 0
+        for idx, raw in enumerate(raw_cards, 1):
+            try:
+                key = concert_key(raw)
+                current_concert_key.set(key)
+                content_hash = card_hash(raw)
+                seen.add(key)
+                state = self.concerts.get(key)
+                if state is not None and state["content_hash"] == content_hash:
+                    state["idx"] = idx
+                    continue
+                
+                new_count += state is None
+                changed_count += state is not None
+                cached_data = self.cache.lookup(key, content_hash) if self.cache else None
+                if cached_data is not None:
+                    self.concerts[key] = {"idx": idx, "content_hash": content_hash, "card_data": cached_data,
+                                          "ticket_url": None, "due": None}
+                    self._record(cached_data, idx, "cache")
+                    continue
+                
+                stages = {}
+                with metrics.span("card_build", stages):
+                    concert_data, ticket_url = build_concert_data(raw, idx)
+                self.concerts[key] = {
+                    "idx": idx, "content_hash": content_hash, "card_data": concert_data,
+                    "ticket_url": ticket_url, "concert_date": concert_data.date,
+                    "last_seats": None, "last_polled": None, "seats_per_hour": 0.0, "due": None,
+                }
+                if ticket_url:
+                    self._schedule_poll(key, 0)
+                else:
+                    concert_data = replace(concert_data)
+                    apply_ticket_result(concert_data, None, idx)
+                    self._record(concert_data, idx, "card", stages)
+            except Exception as e:
+                logger.error("[ID:%s] ✗ ОШИБКА при обработке: %s", idx, e, exc_info=True)
+        current_concert_key.set(None)
+        
+        # Концерты, пропавшие из списка, больше не опрашиваются (записи в очереди устаревают)
+        removed = [key for key in self.concerts if key not in seen]
+        for key in removed:
+            del self.concerts[key]
+        logger.info("Список концертов: %s карточек, новых %s, изменилось %s, удалено %s, в очереди %s",
+                    len(raw_cards), new_count, changed_count, len(removed), len(self._schedule))
+    
+    def _dispatch_due(self):
+        """Отправка в пул концертов, время опроса которых наступило"""
+        now = time.monotonic()
+        while self._schedule and len(self._in_flight) < self.max_in_flight:
+            due, _, key = self._schedule[0]
+            if due > now:
+                break
+            heapq.heappop(self._schedule)
+            state = self.concerts.get(key)
+            if state is None or state["due"] != due:
+                continue
+            state["due"] = None
+            future = self.pool.submit(state["ticket_url"], state["idx"])
+            # Состояние карточки, для которой загружается страница, и время постановки
+            self._in_flight[future] = (key, state, time.perf_counter())
+    
+    def _on_ticket_result(self, future):
+        key, polled_state, submitted = self._in_flight.pop(future)
+        state = self.concerts.get(key)
+        if state is not polled_state:
+            # Карточка изменилась или пропала, пока страница загружалась: места прежней
+            # карточки к новой не применяются (новая опрашивается по своему расписанию)
+            logger.debug("[ID:%s] Результат страницы билетов устарел, пропущен", polled_state["idx"])
+            return
+        idx = state["idx"]
+        current_concert_key.set(key)
+        try:
+            ticket_result = future.result()
         except Exception as e:
-            logger.error(f"КРИТИЧЕСКАЯ ОШИБКА: {e}", exc_info=True)
+            ticket_result = failed_ticket_result(str(e))
+        
+        if ticket_result["error"]:
+            # Страница не загрузилась - прежние данные остаются, повтор по обычному расписанию
+            logger.warning("[ID:%s] ✗ Страница билетов не загружена (%s), повтор позже", idx, ticket_result["error"])
+            self._schedule_poll(key, poll_interval(state["concert_date"], TicketStatus.ON_SALE,
+                                                   state["seats_per_hour"]))
+            return
+        
+        concert_data = replace(state["card_data"])
+        status_confirmed = apply_ticket_result(concert_data, ticket_result, idx)
+        self._record(concert_data, idx, "page", {"ticket_page": time.perf_counter() - submitted})
+        if self.cache and status_confirmed:
+            self.cache.store(key, state["content_hash"], concert_data)
+        
+        # Скорость продаж по двум последним опросам
+        now = time.monotonic()
+        seats = ticket_result["available_seats"] if not ticket_result["event_passed"] else None
+        if seats is not None and state["last_seats"] is not None and state["last_polled"] is not None:
+            hours = (now - state["last_polled"]) / 3600
+            if hours > 0:
+                state["seats_per_hour"] = max(0, state["last_seats"] - seats) / hours
+        state["last_seats"], state["last_polled"] = seats, now
+        
+        interval = poll_interval(state["concert_date"], concert_data.status, state["seats_per_hour"])
+        if interval is None:
+            logger.info("[ID:%s] ✓ %s, опрос завершен", idx, concert_data.status)
+            return
+        self._schedule_poll(key, interval)
+        logger.info("[ID:%s] ✓ %s, мест %s, следующий опрос через %.0f мин",
+                    idx, concert_data.status, concert_data.available_seats or "-", interval / 60)
+    
+    def _flush(self):
+        """Запись накопленных результатов в историю и метрик цикла"""
+        if self.history_dir and self._pending_records:
+            try:
+                with metrics.span("history_save"):
+                    append_run_history(self._pending_records, datetime.now(), self.history_dir)
+            except ImportError as e:
+                logger.warning("✗ История не записана (не установлен %s)", e.name)
+            except Exception as e:
+                logger.error("✗ Ошибка записи истории: %s", e)
+        self._pending_records = []
+        
+        selector_profile.log_stats()
+        if self.profile_path:
+            selector_profile.save(self.profile_path)
+        selector_profile.reset()
+        
+        metrics.set_gauge("daemon_concerts", len(self.concerts))
+        metrics.set_gauge("daemon_scheduled", len(self._schedule))
+        metrics.set_gauge("daemon_pages_recycled", self.pool.recycled)
+        memory.update_gauges()
+        try:
+            if self.metrics_json:
+                metrics.write_json(self.metrics_json)
+            if self.metrics_prom:
+                metrics.write_prometheus(self.metrics_prom)
+        except OSError as e:
+            logger.error("✗ Не удалось записать метрики: %s", e)
+        # Выборки метрик копятся только за цикл, иначе память демона растет
+        metrics.reset()
+    
+    def run(self):
+        """Главный цикл до SIGTERM/SIGINT"""
+        logger.info("=" * 80)
+        logger.info("ЗАПУСК ПАРСЕРА В РЕЖИМЕ ДЕМОНА (список каждые %.0f мин)", self.listing_interval / 60)
+        logger.info("=" * 80)
+        metrics.reset()
+        if self.profile_path:
+            selector_profile.load(self.profile_path)
+        self.pool.start()
+        next_listing = time.monotonic()
+        
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_listing:
+                    try:
+                        self.refresh_listing()
+                    except Exception as e:
+                        logger.error("✗ Ошибка загрузки списка концертов: %s", e, exc_info=True)
+                    self._flush()
+                    next_listing = time.monotonic() + self.listing_interval
+                
+                self._dispatch_due()
+                
+                wake_at = min(next_listing, self._schedule[0][0]) if self._schedule else next_listing
+                timeout = min(DAEMON_TICK, max(0.0, wake_at - time.monotonic()))
+                if self._in_flight:
+                    done, _ = futures_wait(list(self._in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            self._on_ticket_result(future)
+                        except Exception as e:
+                            # Один сбойный результат не останавливает демон
+                            logger.error("✗ Ошибка обработки результата страницы билетов: %s", e, exc_info=True)
+                else:
+                    self._stop.wait(timeout)
         
         finally:
-            logger.info("Закрытие браузера")
-            browser.close()
-            logger.info("Браузер закрыт")
-            logger.info("Работа парсера завершена")
+            logger.info("Остановка демона: ожидание %s загрузок", len(self._in_flight))
+            for future in list(self._in_flight):
+                try:
+                    future.result(timeout=30)
+                    self._on_ticket_result(future)
+                except Exception as e:
+                    logger.warning("✗ Загрузка не завершена при остановке: %s", e)
+            self.pool.close()
+            self.listing_browser.close()
+            self._flush()
+            if self.cache:
+                logger.info("Кэш: попаданий %s, промахов %s", self.cache.hits, self.cache.misses)
+                self.cache.close()
+            if self.sink:
+                self.sink.close()
+            memory.log_summary()
+            logger.info("Демон остановлен")
 
 
-if __name__ == "__main__":
+def print_history_report(history_dir=DEFAULT_HISTORY_DIR, top=20):
+    """Отчет по истории запусков в консоль"""
+    import pandas as pd
+    
+    history = load_history(history_dir)
+    runs = history["run_ts"].nunique()
+    print(f"История: {len(history)} строк, запусков: {runs}, концертов: {history['concert_key'].nunique()}")
+    
+    with pd.option_context("display.max_rows", top, "display.width", 160):
+        sold = seats_sold_since_previous_run(history)
+        print("\nПродано с предыдущего запуска:")
+        print(sold[sold["sold"] > 0].sort_values("sold", ascending=False).head(top).to_string(index=False))
+        
+        print("\nСкорость продаж (мест в час):")
+        print(sales_velocity(history).head(top).to_string(index=False))
+        
+        print("\nСмены статуса:")
+        print(status_changes(history).tail(top).to_string(index=False))
+
+
+CLI_COMMANDS = ("scrape", "export", "benchmark")
+
+
+def export_history(history_dir=DEFAULT_HISTORY_DIR, output_path=None, output_format="xlsx", since=None):
+    """
+    Выгрузка истории запусков в XLSX или CSV
+    
+    Args:
+        history_dir: Папка Parquet датасета
+        output_path: Путь к файлу (по умолчанию history_<дата_время>.<формат>)
+        output_format: "xlsx" или "csv"
+        since: Дата YYYY-MM-DD - выгружать запуски начиная с нее
+    
+    Returns:
+        str: Путь к файлу или None, если история пуста
+    """
+    history = load_history(history_dir, since=since, columns=None)
+    if history.empty:
+        logger.warning("История в %s пуста, выгружать нечего", history_dir)
+        return None
+    
+    history = history.drop(columns=["run_date"], errors="ignore")
+    output_path = output_path or f"history_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.{output_format}"
+    if output_format == "csv":
+        history.to_csv(output_path, index=False, encoding="utf-8-sig")
+    else:
+        history.to_excel(output_path, index=False, sheet_name="История", freeze_panes=(1, 0))
+    logger.info("История выгружена: %s (%s строк)", output_path, len(history))
+    return output_path
+
+
+def export_jsonl_xlsx(jsonl_path, output_path=None, run_id=None):
+    """
+    XLSX отчет из сохраненного потока JSON lines одним проходом
+    
+    Args:
+        jsonl_path: Файл потока ConcertJsonlSink
+        output_path: Путь к XLSX (по умолчанию concerts_<run_id>.xlsx)
+        run_id: Запуск из файла (None - последний)
+    
+    Returns:
+        str: Путь к файлу или None, если записей запуска в потоке нет
+    """
+    run_id, records = read_concerts_jsonl(jsonl_path, run_id)
+    if not records:
+        logger.warning("В потоке %s нет концертов запуска %s", jsonl_path, run_id)
+        return None
+    
+    output_path = output_path or f"concerts_{run_id or datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+    save_concerts_xlsx(records, output_path)
+    return output_path
+
+
+def main(argv=None):
+    """
+    Точка входа командной строки (скрипт museshow-parser)
+    
+    Подкоманды: scrape (по умолчанию), export, benchmark. Вызов без подкоманды
+    (`concerts_parser.py --concurrency 8`) работает как раньше - это scrape.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in CLI_COMMANDS and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "scrape")
+    
+    if argv[0] == "benchmark":
+        # Бенчмарк со своими параметрами - скрипт репозитория рядом с модулем (в пакет
+        # не устанавливается), загружается по пути, а не по общему имени benchmark
+        import importlib.util
+        
+        benchmark_path = Path(__file__).with_name("benchmark.py")
+        if not benchmark_path.exists():
+            print("benchmark.py есть только в репозитории проекта: poetry run python benchmark.py",
+                  file=sys.stderr)
+            return 2
+        spec = importlib.util.spec_from_file_location("museshow_benchmark", benchmark_path)
+        benchmark = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(benchmark)
+        return benchmark.main(argv[1:])
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING"], default="INFO",
+                        help="INFO - рабочий режим, DEBUG - подробный лог по каждому селектору")
+    common.add_argument("--log-format", choices=["text", "json"], default="text",
+                        help="формат лога: читаемый текст или JSON lines с полем concert_key")
+    
+    arg_parser = argparse.ArgumentParser(prog="museshow-parser", description="Парсер концертов museshow.ru")
+    commands = arg_parser.add_subparsers(dest="command", metavar="{scrape,export,benchmark}")
+    scrape_parser = commands.add_parser("scrape", parents=[common], help="собрать концерты в XLSX и/или поток JSON lines (по умолчанию)")
+    scrape_parser.add_argument("--concurrency", type=int, default=DEFAULT_TICKET_CONCURRENCY,
+                               help="количество одновременно открытых страниц билетов")
+    scrape_parser.add_argument("--per-host-limit", type=int, default=DEFAULT_PER_HOST_LIMIT,
+                               help="максимум одновременных загрузок с одного хоста")
+    scrape_parser.add_argument("--workers", type=int, default=1,
+                               help="процессов для страниц билетов (в каждом свой браузер и --concurrency страниц)")
+    scrape_parser.add_argument("--base-url", default=BASE_URL, help="URL страницы концертов")
+    scrape_parser.add_argument("--engine", choices=["browser", "http"], default="browser",
+                               help="загрузка списка: через браузер или напрямую по HTTP (с откатом на браузер)")
+    scrape_parser.add_argument("--ticket-engine", choices=["browser", "api"], default="browser",
+                               help="места: страница билетов в браузере или API qtickets (с откатом на браузер)")
+    scrape_parser.add_argument("--seat-endpoint", action="append", default=None, metavar="TEMPLATE",
+                               help="шаблон адреса API мест с {origin} и {event_id} (можно несколько)")
+    scrape_parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="путь к SQLite кэшу концертов")
+    scrape_parser.add_argument("--no-cache", action="store_true", help="не использовать кэш концертов")
+    scrape_parser.add_argument("--resume", action="store_true",
+                               help="продолжить последний незавершенный запуск (обработанные концерты из журнала)")
+    scrape_parser.add_argument("--journal", default=DEFAULT_JOURNAL_PATH, help="путь к SQLite журналу запусков")
+    scrape_parser.add_argument("--retries", type=int, default=3,
+                               help="попыток загрузки страницы билетов при таймауте")
+    scrape_parser.add_argument("--output", default=None, help="путь к XLSX файлу (по умолчанию concerts_<дата_время>.xlsx)")
+    scrape_parser.add_argument("--jsonl", default=None, metavar="TARGET",
+                               help="поток JSON lines по концерту на строку: - (stdout), файл или именованный канал")
+    scrape_parser.add_argument("--no-xlsx", action="store_true", help="не записывать XLSX отчет")
+    scrape_parser.add_argument("--metrics-json", default=DEFAULT_METRICS_JSON, help="JSON сводка метрик запуска")
+    scrape_parser.add_argument("--metrics-prom", default=DEFAULT_METRICS_PROM,
+                               help="метрики в формате Prometheus (для textfile collector node_exporter)")
+    scrape_parser.add_argument("--no-block-resources", action="store_true",
+                               help="не блокировать картинки, шрифты, медиа и трекеры (ждать networkidle)")
+    scrape_parser.add_argument("--history-dir", default=DEFAULT_HISTORY_DIR,
+                               help="Parquet датасет истории запусков")
+    scrape_parser.add_argument("--no-history", action="store_true", help="не дописывать историю запусков")
+    scrape_parser.add_argument("--daemon", action="store_true",
+                               help="режим демона: теплый браузер, опрос по расписанию до SIGTERM")
+    scrape_parser.add_argument("--listing-interval", type=float, default=DAEMON_LISTING_INTERVAL / 60,
+                               help="режим демона: интервал перечитывания списка концертов, мин")
+    scrape_parser.add_argument("--recycle-pages", type=int, default=DAEMON_RECYCLE_PAGES,
+                               help="режим демона: пересоздавать страницу браузера после N загрузок")
+    scrape_parser.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                               help="бюджет памяти парсера и браузера, МБ: при превышении страницы и контексты "
+                                    "браузера пересоздаются")
+    scrape_parser.add_argument("--trace-memory", action="store_true",
+                               help="замерять кучу Python через tracemalloc (медленнее)")
+    scrape_parser.add_argument("--record", metavar="ARCHIVE_DIR", nargs="?", const=DEFAULT_ARCHIVE_DIR,
+                               help="записать сырые страницы запуска в архив (zstd, без повторов)")
+    scrape_parser.add_argument("--replay", metavar="ARCHIVE_DIR", nargs="?", const=DEFAULT_ARCHIVE_DIR,
+                               help="разобрать записанный запуск из архива без браузера и сети")
+    scrape_parser.add_argument("--replay-run", default=None,
+                               help="идентификатор запуска для --replay (по умолчанию последний)")
+    scrape_parser.add_argument("--selector-profile", default=DEFAULT_SELECTOR_PROFILE,
+                               help="JSON профиль выученных селекторов")
+    scrape_parser.add_argument("--no-selector-profile", action="store_true",
+                               help="всегда проходить полные каскады селекторов")
+    
+    export_parser = commands.add_parser("export", parents=[common],
+                                        help="выгрузить историю запусков в XLSX/CSV или XLSX из потока JSON lines")
+    export_parser.add_argument("--history-dir", default=DEFAULT_HISTORY_DIR, help="Parquet датасет истории запусков")
+    export_parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx", help="формат файла")
+    export_parser.add_argument("--output", default=None,
+                               help="путь к файлу (по умолчанию history_<дата_время>.<формат>)")
+    export_parser.add_argument("--since", default=None, help="выгружать запуски начиная с даты YYYY-MM-DD")
+    export_parser.add_argument("--report", action="store_true",
+                               help="вместо выгрузки вывести отчет (продажи, скорость, смены статуса)")
+    export_parser.add_argument("--from-jsonl", default=None, metavar="PATH",
+                               help="собрать XLSX концертов из сохраненного потока JSON lines (scrape --jsonl)")
+    export_parser.add_argument("--run-id", default=None, help="запуск для --from-jsonl (по умолчанию последний)")
+    
+    commands.add_parser("benchmark", help="офлайн-бенчмарк (параметры: benchmark --help)")
+    args = arg_parser.parse_args(argv)
+    
+    setup_logging(level=getattr(logging, args.log_level), log_format=args.log_format)
+    
+    if args.command == "export":
+        if args.from_jsonl:
+            if args.format != "xlsx":
+                export_parser.error("--from-jsonl выгружается только в XLSX")
+            if not Path(args.from_jsonl).exists():
+                export_parser.error(f"файл потока JSON lines не найден: {args.from_jsonl}")
+            export_jsonl_xlsx(args.from_jsonl, args.output, args.run_id)
+        elif args.report:
+            print_history_report(args.history_dir)
+        else:
+            export_history(args.history_dir, args.output, args.format, args.since)
+        return
+    
+    if args.daemon:
+        daemon = ConcertDaemon(base_url=args.base_url, engine=args.engine, ticket_concurrency=args.concurrency,
+                               per_host_limit=args.per_host_limit, block_resources=not args.no_block_resources,
+                               cache_path=None if args.no_cache else args.cache,
+                               history_dir=None if args.no_history else args.history_dir,
+                               listing_interval=args.listing_interval * 60, recycle_pages=args.recycle_pages,
+                               metrics_json=args.metrics_json, metrics_prom=args.metrics_prom,
+                               profile_path=None if args.no_selector_profile else args.selector_profile,
+                               ticket_engine=args.ticket_engine, seat_endpoints=args.seat_endpoint,
+                               memory_budget_mb=args.memory_budget, trace_memory=args.trace_memory,
+                               jsonl_path=args.jsonl)
+        daemon.install_signal_handlers()
+        daemon.run()
+        return
+    
+    if args.replay:
+        # Повторный разбор не должен влиять на кэш и историю настоящих запусков
+        args.no_cache = args.no_history = True
+    
     logger.info("ЗАПУСК ПОЛНОЦЕННОГО ПАРСЕРА КОНЦЕРТОВ MUSESHOW.RU")
-    parse_concerts()
+    parse_concerts(ticket_concurrency=args.concurrency, per_host_limit=args.per_host_limit,
+                   base_url=args.base_url, engine=args.engine,
+                   cache_path=None if args.no_cache else args.cache,
+                   block_resources=not args.no_block_resources, output_path=args.output,
+                   metrics_json=args.metrics_json, metrics_prom=args.metrics_prom,
+                   history_dir=None if args.no_history else args.history_dir, workers=args.workers,
+                   record_archive=args.record, replay_archive=args.replay, replay_run=args.replay_run,
+                   journal_path=None if args.replay else args.journal, resume=args.resume, retries=args.retries,
+                   profile_path=None if args.no_selector_profile else args.selector_profile,
+                   ticket_engine=args.ticket_engine, seat_endpoints=args.seat_endpoint,
+                   memory_budget_mb=args.memory_budget, trace_memory=args.trace_memory,
+                   jsonl_path=args.jsonl, write_xlsx=not args.no_xlsx)
     logger.info("Парсер завершил работу")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Общие фикстуры: локальный HTTP сервер с заранее записанными ответами, сырые карточки, логирование"""
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import concerts_parser
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Ответы по таблице маршрутов сервера: путь -> (статус, content-type, тело)"""
+    
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        status, content_type, body = self.server.routes.get(self.path, (404, "text/plain", "Not Found"))
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Запуск сервера с таблицей маршрутов
+    
+    Returns:
+        callable: serve(routes) -> базовый URL; у функции есть список requests с путями запросов
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.routes = {}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    def serve(routes):
+        server.routes.update(routes)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+    
+    serve.requests = server.requests
+    yield serve
+    server.shutdown()
+    server.server_close()
+
+
+
+@pytest.fixture
+def raw_card():
+    """
+    Фабрика сырых полей карточки (формат extract_cards / parse_listing_html)
+    
+    Returns:
+        callable: raw_card(**поля) -> dict; переданные поля заменяют значения по умолчанию
+    """
+    def make(**fields):
+        card = {"date": "1 декабря", "date_selector": "div.jet-listing-dynamic-field__content",
+                "link_text": "Хиты Queen в Москве", "link_href": "https://museshow.ru/program/queen/",
+                "link_selector": "a[href*='concert']", "venues": ["ДК Горбунова"],
+                "button_text": "Купить билет", "button_selector": "span.elementor-button-text",
+                "ticket_href": "https://qtickets.ru/event/1", "ticket_selector": "a[href*='qtickets']"}
+        card.update(fields)
+        return card
+    
+    return make
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    """Логгер парсера после теста как после импорта (main и setup_logging его перенастраивают)"""
+    yield
+    package_logger = logging.getLogger("museshow_parser")
+    if concerts_parser._log_listener:
+        concerts_parser._log_listener.stop()
+        concerts_parser._log_listener = None
+    for handler in list(package_logger.handlers):
+        package_logger.removeHandler(handler)
+        handler.close()
+    package_logger.setLevel(logging.NOTSET)
+    package_logger.propagate = True
@@ -0,0 +1,66 @@
+"""Архив сырых страниц: запись, чтение и повторный разбор запуска"""
+
+from pathlib import Path
+
+import pytest
+
+from concerts_parser import ConcertArchive, RunRecorder, load_listing_archive, replay_ticket_result
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_objects_round_trip_and_deduplicate(tmp_path):
+    archive = ConcertArchive(tmp_path)
+    
+    digest = archive.put("<html>Концерты</html>")
+    assert archive.put("<html>Концерты</html>".encode("utf-8")) == digest
+    json_digest = archive.put_json({"zones": [{"name": "Партер", "free_seats": 3}]})
+    
+    assert archive.get_text(digest) == "<html>Концерты</html>"
+    assert archive.get_json(json_digest) == {"zones": [{"name": "Партер", "free_seats": 3}]}
+    assert (tmp_path / "objects" / digest[:2] / f"{digest}.zst").exists()
+    assert (archive.written, archive.deduplicated) == (2, 1)
+
+
+def test_recorded_run_replays_listing_and_tickets(tmp_path):
+    archive = ConcertArchive(tmp_path)
+    recorder = RunRecorder(archive, "https://museshow.ru/concerts/", "http")
+    recorder.manifest["run_id"] = "2026-10-17_12-00-00"
+    recorder.add_listing_pages([("https://museshow.ru/concerts/",
+                                 (FIXTURES / "listing_page1.html").read_text(encoding="utf-8"))])
+    recorder.add_ticket({"url": "https://museshow.qtickets.ru/event/101", "html": "<html></html>",
+                         "iframe_html": "<svg></svg>", "banner": None, "hover_sections": None,
+                         "payloads": [{"zones": [{"name": "Партер", "free_seats": 10},
+                                                 {"name": "Балкон", "free_seats": 4}]}]})
+    recorder.add_ticket({"url": "https://museshow.qtickets.ru/event/102", "html": "<html></html>",
+                         "iframe_html": "", "payloads": [], "banner": "Мероприятие прошло",
+                         "hover_sections": None})
+    recorder.save()
+    
+    manifest = ConcertArchive(tmp_path).load_run()
+    cards = load_listing_archive(archive, manifest)
+    on_sale = replay_ticket_result(archive, manifest["tickets"]["https://museshow.qtickets.ru/event/101"])
+    passed = replay_ticket_result(archive, manifest["tickets"]["https://museshow.qtickets.ru/event/102"])
+    
+    assert manifest["run_id"] == "2026-10-17_12-00-00"
+    assert [card["link_text"] for card in cards] == ["Хиты Queen в Москве", "Земфира в Санкт-Петербурге"]
+    assert on_sale["seat_sections"] == {"Партер": 10, "Балкон": 4}
+    assert on_sale["seats_source"] == "network"
+    assert passed["event_passed"]
+    assert passed["message"] == "Мероприятие прошло"
+
+
+def test_load_run_picks_latest_or_named(tmp_path):
+    archive = ConcertArchive(tmp_path)
+    for run_id in ("2026-10-17_12-00-00", "2026-10-18_12-00-00"):
+        archive.save_run({"run_id": run_id, "listing": [], "tickets": {}})
+    
+    assert archive.load_run()["run_id"] == "2026-10-18_12-00-00"
+    assert archive.load_run("2026-10-17_12-00-00")["run_id"] == "2026-10-17_12-00-00"
+    with pytest.raises(FileNotFoundError):
+        archive.load_run("2026-10-19_12-00-00")
+
+
+def test_empty_archive_has_no_runs(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ConcertArchive(tmp_path).load_run()
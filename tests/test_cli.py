@@ -0,0 +1,23 @@
+"""Командная строка: ошибки аргументов подкоманд"""
+
+import pytest
+
+from concerts_parser import main
+
+
+def test_export_from_missing_jsonl_is_an_argument_error(monkeypatch, tmp_path, capsys):
+    monkeypatch.chdir(tmp_path)
+    
+    with pytest.raises(SystemExit) as exit_info:
+        main(["export", "--from-jsonl", "missing.jsonl"])
+    
+    assert exit_info.value.code == 2
+    assert "missing.jsonl" in capsys.readouterr().err
+
+
+def test_history_report_flag_is_gone(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--history-report"])
+    
+    assert exit_info.value.code == 2
+    assert "--history-report" in capsys.readouterr().err
@@ -0,0 +1,40 @@
+"""Кэш концертов: TTL по статусу и изменившиеся карточки"""
+
+import pytest
+
+from concerts_parser import ConcertCache, ConcertRecord, TicketStatus
+
+KEY = "https://qtickets.ru/event/1"
+HOUR = 3600
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with ConcertCache(tmp_path / "cache.sqlite3") as cache:
+        yield cache
+
+
+@pytest.mark.parametrize("status, ttl", [(TicketStatus.PASSED, 7 * 24 * HOUR), (TicketStatus.SOLD_OUT, 6 * HOUR)])
+def test_terminal_status_is_cached_until_ttl(cache, status, ttl):
+    cache.store(KEY, "hash", ConcertRecord(key=KEY, date_text="1 декабря", status=status), now=0)
+    
+    cached = cache.lookup(KEY, "hash", now=ttl - 1)
+    
+    assert cached.status == status
+    assert cached.date_text == "1 декабря"
+    assert cache.lookup(KEY, "hash", now=ttl) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_on_sale_is_never_served_from_cache(cache):
+    cache.store(KEY, "hash", ConcertRecord(key=KEY, status=TicketStatus.ON_SALE, available_seats=12), now=0)
+    
+    assert cache.lookup(KEY, "hash", now=1) is None
+
+
+def test_changed_card_is_a_miss(cache):
+    cache.store(KEY, "hash", ConcertRecord(key=KEY, status=TicketStatus.PASSED), now=0)
+    
+    assert cache.lookup(KEY, "other hash", now=1) is None
+    assert cache.lookup(None, "hash", now=1) is None
+    assert cache.misses == 2
@@ -0,0 +1,28 @@
+"""Разбор даты концерта из текста карточки"""
+
+from datetime import datetime
+
+import pytest
+
+from concerts_parser import parse_concert_date
+
+TODAY = datetime(2025, 12, 20)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("21 декабря", datetime(2025, 12, 21)),
+    # Без года: прошедшая больше месяца назад дата - следующий год
+    ("5 января", datetime(2026, 1, 5)),
+    ("1 декабря", datetime(2025, 12, 1)),
+    ("21 октября 2024", datetime(2024, 10, 21)),
+    ("Пт, 21 Марта, 19:00", datetime(2026, 3, 21)),
+    ("21.10.2025", datetime(2025, 10, 21)),
+    ("21.10.25", datetime(2025, 10, 21)),
+])
+def test_parsed_dates(text, expected):
+    assert parse_concert_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text", ["", None, "Скоро", "31 февраля", "21 брюмера"])
+def test_unparsed_dates(text):
+    assert parse_concert_date(text, TODAY) is None
@@ -0,0 +1,18 @@
+"""Ключи концертов и отсев повторов карточек"""
+
+from concerts_parser import concert_key, unique_cards
+
+
+def test_ticket_link_is_the_key(raw_card):
+    assert concert_key(raw_card(ticket_href="https://qtickets.ru/event/1")) == "https://qtickets.ru/event/1"
+
+
+def test_program_link_key_includes_date(raw_card):
+    assert concert_key(raw_card(date="1  декабря", ticket_href=None)) == "https://museshow.ru/program/queen/#1 декабря"
+    assert concert_key(raw_card(date="", ticket_href=None)) == "https://museshow.ru/program/queen/"
+
+
+def test_dates_of_one_program_without_ticket_links_are_kept(raw_card):
+    cards = [raw_card(date=date, ticket_href=None) for date in ("1 декабря", "2 декабря", "1 декабря")]
+
+    assert unique_cards(cards, set()) == cards[:2]
@@ -0,0 +1,53 @@
+"""Демон: результаты страниц билетов, устаревшие за время загрузки"""
+
+from concurrent.futures import Future
+
+import concerts_parser
+from concerts_parser import ConcertDaemon, TicketStatus, failed_ticket_result
+
+
+class PendingPool:
+    """Пул без браузера: задачи остаются в ожидании, пока тест не задаст результат"""
+    
+    concurrency = 1
+    recycled = 0
+    
+    def __init__(self, *args, **kwargs):
+        self.submitted = []
+    
+    def submit(self, ticket_url, concert_idx):
+        future = Future()
+        self.submitted.append(future)
+        return future
+
+
+def seats_result(seats):
+    result = failed_ticket_result()
+    result.update(available_seats=seats, seat_sections={"Партер": seats}, seats_source="api")
+    return result
+
+
+def test_result_for_changed_card_is_dropped(monkeypatch, raw_card):
+    listing = [[raw_card(link_href="https://museshow.ru/queen/")],
+               [raw_card(link_href="https://museshow.ru/queen/", button_text="Осталось мало билетов")]]
+    monkeypatch.setattr(concerts_parser, "TicketPagePool", PendingPool)
+    monkeypatch.setattr(concerts_parser, "load_listing_http", lambda base_url: listing.pop(0))
+    daemon = ConcertDaemon(engine="http", cache_path=None, history_dir=None, profile_path=None)
+    
+    daemon.refresh_listing()
+    daemon._dispatch_due()
+    stale_future = daemon.pool.submitted[0]
+    # Карточка изменилась, пока страница билетов прежней карточки загружалась
+    daemon.refresh_listing()
+    daemon._dispatch_due()
+    current_future = daemon.pool.submitted[1]
+    
+    stale_future.set_result(seats_result(100))
+    daemon._on_ticket_result(stale_future)
+    assert daemon._pending_records == []
+    
+    current_future.set_result(seats_result(7))
+    daemon._on_ticket_result(current_future)
+    [record] = daemon._pending_records
+    assert record.status == TicketStatus.ON_SALE
+    assert record.available_seats == 7
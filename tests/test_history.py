@@ -0,0 +1,59 @@
+"""История запусков в Parquet: дописывание и выборки по продажам"""
+
+from datetime import datetime
+
+from concerts_parser import (ConcertRecord, TicketStatus, append_run_history, load_history, sales_velocity,
+                             seats_sold_since_previous_run, status_changes)
+
+
+def record(key, seats, status=TicketStatus.ON_SALE):
+    return ConcertRecord(key=key, date_text="1 декабря", status=status, available_seats=seats)
+
+
+def test_appends_in_the_same_second_are_kept(tmp_path):
+    run_ts = datetime(2026, 10, 17, 12, 0, 0)
+    
+    append_run_history([record("a", 10), record("b", 5)], run_ts, tmp_path)
+    append_run_history([record("a", 8), record("b", 5)], run_ts, tmp_path)
+    
+    history = load_history(tmp_path)
+    assert len(history) == 4
+    assert sorted(history["available_seats"].tolist()) == [5, 5, 8, 10]
+
+
+def sales_history(tmp_path):
+    """Три запуска: "a" продается, у "b" возврат билета, "c" распродан в последнем запуске"""
+    runs = [
+        (datetime(2026, 10, 17, 12), [record("a", 10), record("b", 5), record("c", 2)]),
+        (datetime(2026, 10, 17, 14), [record("a", 8), record("b", 5), record("c", 1)]),
+        (datetime(2026, 10, 17, 17), [record("a", 5), record("b", 7),
+                                      record("c", None, status=TicketStatus.SOLD_OUT)]),
+    ]
+    for run_ts, records in runs:
+        append_run_history(records, run_ts, tmp_path)
+    return load_history(tmp_path)
+
+
+def test_seats_sold_since_previous_run(tmp_path):
+    sold = seats_sold_since_previous_run(sales_history(tmp_path)).set_index("concert_key")
+    
+    assert sold["previous_seats"].to_dict() == {"a": 8, "b": 5, "c": 1}
+    assert sold["available_seats"].to_dict() == {"a": 5, "b": 7, "c": 0}
+    assert sold["sold"].to_dict() == {"a": 3, "b": 0, "c": 1}
+
+
+def test_sales_velocity(tmp_path):
+    velocity = sales_velocity(sales_history(tmp_path))
+    
+    assert velocity["concert_key"].tolist() == ["a", "c", "b"]
+    assert velocity.set_index("concert_key")["sold_total"].to_dict() == {"a": 5, "c": 2, "b": 0}
+    assert velocity.set_index("concert_key")["seats_per_hour"].to_dict() == {"a": 1.0, "c": 0.4, "b": 0.0}
+
+
+def test_status_changes(tmp_path):
+    changes = status_changes(sales_history(tmp_path))
+    
+    assert changes[["concert_key", "previous_status", "status"]].values.tolist() == [
+        ["c", TicketStatus.ON_SALE.value, TicketStatus.SOLD_OUT.value],
+    ]
+    assert changes["run_ts"].tolist() == [datetime(2026, 10, 17, 17)]
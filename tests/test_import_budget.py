@@ -0,0 +1,11 @@
+"""Импорт concerts_parser: бюджет времени и отложенная загрузка тяжелых зависимостей"""
+
+from benchmark import IMPORT_BUDGET_MS, measure_import_time
+
+
+def test_import_is_lazy_and_within_budget():
+    # Отдельный процесс: в процессе pytest модуль уже импортирован
+    result = measure_import_time()
+    
+    assert result["heavy_modules"] == []
+    assert result["import_ms"] < IMPORT_BUDGET_MS
@@ -0,0 +1,76 @@
+"""Список концертов без браузера: разбор сохраненного HTML и пагинация Elementor по HTTP"""
+
+from pathlib import Path
+
+import pytest
+
+from concerts_parser import ListingEndpointChanged, fetch_listing_http, parse_listing_html
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def page(name):
+    return 200, "text/html; charset=utf-8", (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_parse_listing_page():
+    html = (FIXTURES / "listing_page1.html").read_text(encoding="utf-8")
+    
+    cards, working_selector, next_page_url = parse_listing_html(html, "https://museshow.ru/concerts/")
+    
+    assert working_selector == "div.elementor-loop-container > div"
+    assert next_page_url == "https://museshow.ru/concerts/page/2/"
+    assert [card["link_href"] for card in cards] == ["https://museshow.ru/queen-21-moscow/",
+                                                     "https://museshow.ru/zemfira-21-spb/"]
+    first, sold_out = cards
+    assert first["date"] == "1 декабря"
+    assert first["venues"] == ["1 декабря", "19:00", "ДК Горбунова"]
+    assert first["button_text"] == "Купить билет"
+    assert first["ticket_href"] == "https://museshow.qtickets.ru/event/101"
+    assert sold_out["button_text"] == "Все билеты проданы"
+    assert sold_out["ticket_href"] is None
+
+
+def test_last_page_has_no_next_url():
+    html = (FIXTURES / "listing_page2.html").read_text(encoding="utf-8")
+    
+    _, _, next_page_url = parse_listing_html(html, "https://museshow.ru/concerts/page/2/")
+    
+    assert next_page_url is None
+
+
+def test_fetch_follows_pagination_and_drops_repeats(stub_server):
+    base_url = stub_server({"/concerts/": page("listing_page1.html"),
+                            "/concerts/page/2/": page("listing_page2.html")})
+    html_pages = []
+    batches = []
+    
+    cards = fetch_listing_http(base_url + "/concerts/", html_pages=html_pages, on_cards=batches.append)
+    
+    assert stub_server.requests == ["/concerts/", "/concerts/page/2/"]
+    assert [card["link_text"] for card in cards] == ["Хиты Queen в Москве", "Земфира в Санкт-Петербурге",
+                                                     "Кино в Казани"]
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert [url for url, _ in html_pages] == [base_url + "/concerts/", base_url + "/concerts/page/2/"]
+
+
+def test_fetch_stops_at_page_limit(stub_server):
+    base_url = stub_server({"/concerts/": page("listing_page1.html"),
+                            "/concerts/page/2/": page("listing_page2.html")})
+    
+    cards = fetch_listing_http(base_url + "/concerts/", max_pages=1)
+    
+    assert stub_server.requests == ["/concerts/"]
+    assert len(cards) == 2
+
+
+@pytest.mark.parametrize("route", [
+    (404, "text/html", "<html><body>Not Found</body></html>"),
+    (200, "application/json", '{"html": ""}'),
+    (200, "text/html", "<html><body><p>Технические работы</p></body></html>"),
+])
+def test_unexpected_listing_response(stub_server, route):
+    base_url = stub_server({"/concerts/": route})
+    
+    with pytest.raises(ListingEndpointChanged):
+        fetch_listing_http(base_url + "/concerts/")
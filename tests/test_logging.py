@@ -0,0 +1,33 @@
+"""Логирование через очередь: форматирование в потоке QueueListener"""
+
+import json
+import logging
+
+import concerts_parser
+from concerts_parser import InProcessQueueHandler, setup_logging
+
+
+def test_queued_record_is_not_formatted_by_the_caller():
+    record = logging.LogRecord("museshow_parser", logging.ERROR, __file__, 1, "Концерт %s", ("#1",),
+                               (ZeroDivisionError, ZeroDivisionError("division by zero"), None))
+    
+    prepared = InProcessQueueHandler(None).prepare(record)
+    
+    assert prepared is record
+    assert prepared.msg == "Концерт %s"
+    assert prepared.exc_info is not None
+
+
+def test_json_log_keeps_traceback(tmp_path):
+    log_file = tmp_path / "parser.log"
+    logger = setup_logging(log_format="json", log_file=log_file)
+    
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("[ID:%s] ✗ Ошибка при обработке", 7)
+    concerts_parser._stop_log_listener()
+    
+    entry = json.loads(log_file.read_text(encoding="utf-8").splitlines()[-1])
+    assert entry["msg"] == "[ID:7] ✗ Ошибка при обработке"
+    assert "ZeroDivisionError" in entry["exc"]
@@ -0,0 +1,91 @@
+"""Места по API qtickets: записанные JSON ответы и загрузка страницы билетов браузером при неудаче"""
+
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+from concerts_parser import QticketsApiPool, failed_ticket_result
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SEATS_ENDPOINTS = ("{origin}/api/seats/{event_id}.json",)
+
+
+class FallbackPool:
+    """Пул страниц билетов без браузера: запоминает ссылки и сразу отвечает результатом страницы"""
+    
+    def __init__(self):
+        self.submitted = []
+        self.closed = False
+    
+    def submit(self, ticket_url, concert_idx):
+        self.submitted.append(ticket_url)
+        result = failed_ticket_result()
+        result.update(available_seats=3, seat_sections={"Партер": 3}, seats_source="network")
+        future = Future()
+        future.set_result(result)
+        return future
+    
+    def close(self):
+        self.closed = True
+
+
+def recorded(name):
+    return 200, "application/json", (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def api_pool():
+    pool = QticketsApiPool(FallbackPool(), endpoints=SEATS_ENDPOINTS, timeout=5.0)
+    yield pool
+    pool.close()
+
+
+def test_seats_from_api(stub_server, api_pool):
+    base_url = stub_server({"/api/seats/101.json": recorded("qtickets_seats_101.json")})
+    
+    result = api_pool.submit(f"{base_url}/event/101", 0).result(timeout=10)
+    
+    assert result["seats_source"] == "api"
+    assert result["seat_sections"] == {"Партер": 10, "Балкон": 4}
+    assert result["available_seats"] == 14
+    assert api_pool.api_hits == 1
+    assert api_pool.fallbacks == 0
+    assert api_pool.fallback.submitted == []
+
+
+@pytest.mark.parametrize("ticket_path, routes", [
+    # Прошедшее мероприятие: API отвечает 404
+    ("/event/777", {}),
+    # Схема зала без секций
+    ("/event/102", {"/api/seats/102.json": recorded("qtickets_seats_102_no_scheme.json")}),
+    # Ответ не JSON
+    ("/event/103", {"/api/seats/103.json": (200, "text/html", "<html><body>Вход</body></html>")}),
+])
+def test_fallback_to_ticket_page(stub_server, api_pool, ticket_path, routes):
+    base_url = stub_server(routes)
+    ticket_url = base_url + ticket_path
+    
+    result = api_pool.submit(ticket_url, 0).result(timeout=10)
+    
+    assert result["seats_source"] == "network"
+    assert api_pool.fallback.submitted == [ticket_url]
+    assert api_pool.fallbacks == 1
+    assert api_pool.api_hits == 0
+
+
+def test_link_without_event_id_skips_api(stub_server, api_pool):
+    base_url = stub_server({})
+    
+    result = api_pool.submit(f"{base_url}/afisha/", 0).result(timeout=10)
+    
+    assert stub_server.requests == []
+    assert result["seats_source"] == "network"
+    assert api_pool.fallbacks == 1
+
+
+def test_close_closes_fallback(api_pool):
+    api_pool.start()
+    api_pool.close()
+    
+    assert api_pool.fallback.closed
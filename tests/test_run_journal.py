@@ -0,0 +1,50 @@
+"""Журнал запусков: продолжение и очистка"""
+
+import sqlite3
+
+from concerts_parser import ConcertRecord, RunJournal, TicketStatus
+
+
+def count_rows(path):
+    with sqlite3.connect(path) as conn:
+        return (conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0],
+                conn.execute("SELECT COUNT(*) FROM done").fetchone()[0])
+
+
+def record(key):
+    return ConcertRecord(key=key, date_text="1 декабря", status=TicketStatus.ON_SALE, available_seats=5)
+
+
+def test_resume_returns_unfinished_run_concerts(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    journal = RunJournal(path)
+    journal.mark_done("a", "hash-a", record("a"))
+    journal.close()
+
+    journal = RunJournal(path, resume=True)
+    assert journal.lookup("a", "hash-a").available_seats == 5
+    assert journal.lookup("a", "changed") is None
+    journal.close()
+
+
+def test_finished_run_is_deleted(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    journal = RunJournal(path)
+    journal.mark_done("a", "hash-a", record("a"))
+    journal.finish()
+    journal.close()
+
+    assert count_rows(path) == (0, 0)
+
+
+def test_new_run_prunes_older_runs(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    for key in ("a", "b", "c"):
+        journal = RunJournal(path)
+        journal.mark_done(key, f"hash-{key}", record(key))
+        journal.close()
+
+    assert count_rows(path) == (1, 1)
+    journal = RunJournal(path, resume=True)
+    assert journal.lookup("c", "hash-c") is not None
+    journal.close()
@@ -0,0 +1,67 @@
+"""Метрики этапов: перцентили и текстовый формат Prometheus"""
+
+import json
+
+from concerts_parser import RunMetrics
+
+
+def test_nearest_rank_quantiles():
+    run_metrics = RunMetrics()
+    for seconds in range(100, 0, -1):
+        run_metrics.record("ticket_page_load", float(seconds))
+    run_metrics.record("listing", 2.5)
+    
+    summary = run_metrics.summary()
+    
+    assert summary["ticket_page_load"] == {"count": 100, "total": 5050.0, "p50": 50.0, "p95": 95.0,
+                                           "p99": 99.0, "max": 100.0}
+    assert summary["listing"] == {"count": 1, "total": 2.5, "p50": 2.5, "p95": 2.5, "p99": 2.5, "max": 2.5}
+
+
+def test_span_records_stage_and_concert_timings():
+    run_metrics = RunMetrics()
+    timings = {}
+    
+    with run_metrics.span("card_build", timings):
+        pass
+    
+    assert run_metrics.summary()["card_build"]["count"] == 1
+    assert timings["card_build"] >= 0
+
+
+def test_prometheus_text(tmp_path):
+    run_metrics = RunMetrics()
+    run_metrics.started_at = 1760000000
+    run_metrics.record("page_goto", 1.0)
+    run_metrics.record("page_goto", 3.0)
+    run_metrics.set_gauge("concerts_parsed", 2)
+    path = tmp_path / "parser_metrics.prom"
+    
+    run_metrics.write_prometheus(path)
+    
+    metric = "museshow_parser_stage_duration_seconds"
+    assert path.read_text(encoding="utf-8").splitlines()[1:] == [
+        f"# TYPE {metric} summary",
+        f'{metric}{{stage="page_goto",quantile="0.5"}} 1.0',
+        f'{metric}{{stage="page_goto",quantile="0.95"}} 3.0',
+        f'{metric}{{stage="page_goto",quantile="0.99"}} 3.0',
+        f'{metric}_sum{{stage="page_goto"}} 4.0',
+        f'{metric}_count{{stage="page_goto"}} 2',
+        "# TYPE museshow_parser_concerts_parsed gauge",
+        "museshow_parser_concerts_parsed 2",
+        "# TYPE museshow_parser_last_run_timestamp_seconds gauge",
+        "museshow_parser_last_run_timestamp_seconds 1760000000",
+    ]
+
+
+def test_json_summary(tmp_path):
+    run_metrics = RunMetrics()
+    run_metrics.record("listing", 2.0)
+    run_metrics.set_gauge("concerts_cards", 40)
+    path = tmp_path / "parser_metrics.json"
+    
+    run_metrics.write_json(path)
+    
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["gauges"] == {"concerts_cards": 40}
+    assert data["stages"]["listing"]["p99"] == 2.0
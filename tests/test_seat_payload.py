@@ -0,0 +1,49 @@
+"""Подсчет свободных мест по JSON данным схемы зала"""
+
+from concerts_parser import merge_seat_payloads, parse_seat_payload
+
+
+def test_flat_seat_list_uses_each_seat_zone():
+    payload = {"seats": [
+        {"zone": "Партер", "row": 1, "seat": 1, "is_free": True},
+        {"zone": "Балкон", "row": 1, "seat": 1, "is_free": True},
+        {"zone": "Балкон", "row": 1, "seat": 2, "is_free": True},
+        {"zone": "Балкон", "row": 1, "seat": 3, "is_free": False},
+    ]}
+
+    assert parse_seat_payload(payload) == {"Партер": 1, "Балкон": 2}
+
+
+def test_seat_zone_object_and_seat_name_is_not_a_section():
+    payload = [
+        {"zone": {"id": 7, "name": "Ложа"}, "name": "Место 5", "row": 2, "status": "free"},
+        {"zone": {"id": 7, "name": "Ложа"}, "name": "Место 6", "row": 2, "status": "sold"},
+    ]
+
+    assert parse_seat_payload(payload) == {"Ложа": 1}
+
+
+def test_seats_nested_in_sections():
+    payload = {"sections": [
+        {"name": "Партер", "seats": [{"row": 1, "place": 1, "available": True},
+                                     {"row": 1, "place": 2, "available": True}]},
+        {"name": "Амфитеатр", "seats": [{"row": 1, "place": 1, "sold": True}]},
+    ]}
+
+    assert parse_seat_payload(payload) == {"Партер": 2}
+
+
+def test_section_summaries_win_over_event_total():
+    payload = {"event": {"title": "Концерт", "free_seats": 14, "sectors": [
+        {"name": "Партер", "free_seats": 10},
+        {"name": "Балкон", "free_seats": 4},
+    ]}}
+
+    assert parse_seat_payload(payload) == {"Партер": 10, "Балкон": 4}
+
+
+def test_merge_takes_per_section_maximum():
+    summary = {"sectors": [{"name": "Партер", "free_seats": 3}, {"name": "Балкон", "free_seats": 1}]}
+    seats = {"seats": [{"section": "Партер", "row": 1, "seat": number, "is_free": True} for number in range(3)]}
+
+    assert merge_seat_payloads([summary, seats, summary]) == {"Партер": 3, "Балкон": 1}
@@ -0,0 +1,64 @@
+"""Профиль селекторов: порядок каскадов, сохранение и загрузка"""
+
+import json
+import logging
+
+from concerts_parser import LINK_SELECTORS, SelectorProfile
+
+CASCADE = ["a.exact", "a.fallback", "a"]
+
+
+def test_learned_selector_goes_first_but_not_the_generic_one():
+    profile = SelectorProfile()
+    assert profile.ordered("link", CASCADE) == CASCADE
+    
+    profile.learned = {"link": "a.fallback"}
+    assert profile.ordered("link", CASCADE) == ["a.fallback", "a.exact", "a"]
+    
+    # Самый общий селектор вперед не переносится, неизвестный - игнорируется
+    profile.learned = {"link": "a"}
+    assert profile.ordered("link", CASCADE) == CASCADE
+    profile.learned = {"link": "a.removed"}
+    assert profile.ordered("link", CASCADE) == CASCADE
+
+
+def test_save_keeps_the_most_frequent_winner(tmp_path):
+    path = tmp_path / "selector_profile.json"
+    profile = SelectorProfile()
+    profile.record_cards([{"link_selector": "a.fallback"}, {"link_selector": "a.fallback"},
+                          {"link_selector": "a.exact"}, {"link_selector": None}])
+    profile.record("card", "div.e-loop-item")
+    
+    profile.save(path)
+    
+    assert json.loads(path.read_text(encoding="utf-8"))["fields"] == {"link": "a.fallback",
+                                                                     "card": "div.e-loop-item"}
+    loaded = SelectorProfile()
+    loaded.load(path)
+    assert loaded.ordered("link", CASCADE)[0] == "a.fallback"
+
+
+def test_missing_or_broken_profile_uses_full_cascades(tmp_path):
+    profile = SelectorProfile()
+    profile.load(tmp_path / "missing.json")
+    assert profile.ordered("link", LINK_SELECTORS) == LINK_SELECTORS
+    
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding="utf-8")
+    profile.learned = {"link": LINK_SELECTORS[1]}
+    profile.load(broken)
+    assert profile.learned == {}
+
+
+def test_warns_when_learned_selector_stops_matching(caplog):
+    profile = SelectorProfile()
+    profile.learned = {"link": "a.exact"}
+    for selector in ["a.exact"] + ["a.fallback"] * 3:
+        profile.record("link", selector)
+    
+    with caplog.at_level(logging.INFO, logger="museshow_parser"):
+        profile.log_stats()
+    
+    assert (profile.hits["link"], profile.fallbacks["link"]) == (1, 3)
+    assert any(record.levelno == logging.WARNING and "a.exact" in record.getMessage()
+               for record in caplog.records)
@@ -0,0 +1,101 @@
+"""Страницы билетов, которые не загрузились: статус "Таймаут", а не "Мероприятие прошло\""""
+
+import json
+import sqlite3
+from concurrent.futures import Future
+
+import pytest
+
+import concerts_parser
+from concerts_parser import (ConcertArchive, ConcertRecord, ReplayTicketPool, RunRecorder,
+                             TicketStatus, apply_ticket_result, failed_ticket_result, replay_ticket_result)
+
+TICKET_URL = "https://qtickets.ru/event/1"
+
+
+def on_sale():
+    return ConcertRecord(key=TICKET_URL, status=TicketStatus.ON_SALE)
+
+
+@pytest.mark.parametrize("error", ["timeout", "Page.goto: net::ERR_CONNECTION_RESET", "worker_failed"])
+def test_load_error_is_not_a_passed_event(error):
+    concert = on_sale()
+    
+    assert not apply_ticket_result(concert, failed_ticket_result(error), 1)
+    assert concert.status == TicketStatus.TIMED_OUT
+
+
+def test_loaded_page_without_seats_is_a_passed_event():
+    concert = on_sale()
+    
+    assert not apply_ticket_result(concert, failed_ticket_result(), 1)
+    assert concert.status == TicketStatus.PASSED
+
+
+def test_timed_out_page_replays_as_timeout(tmp_path):
+    recorder = RunRecorder(ConcertArchive(tmp_path), "https://museshow.ru/concerts/", "browser")
+    recorder.add_ticket({"url": TICKET_URL, "html": "<html><body></body></html>", "iframe_html": "",
+                         "payloads": [], "banner": None, "hover_sections": None}, "timeout")
+    recorder.save()
+    
+    archive = ConcertArchive(tmp_path)
+    manifest = archive.load_run()
+    result = ReplayTicketPool(archive, manifest).submit(TICKET_URL, 1).result()
+    concert = on_sale()
+    apply_ticket_result(concert, result, 1)
+    
+    assert result["error"] == "timeout"
+    assert concert.status == TicketStatus.TIMED_OUT
+
+
+def test_manifest_without_error_field_replays_page(tmp_path):
+    archive = ConcertArchive(tmp_path)
+    entry = {"html": None, "iframe_html": None, "banner": None, "hover_sections": {"Партер": 5},
+             "payloads": [archive.put_json({"zones": [{"name": "Балкон", "free_seats": 2}]})]}
+    
+    result = replay_ticket_result(archive, entry)
+    
+    assert result["error"] == ""
+    assert result["seat_sections"] == {"Балкон": 2}
+
+
+class FailingPool:
+    """Пул, который не смог запустить браузер: каждая задача завершается исключением"""
+    
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def start(self):
+        pass
+    
+    def submit(self, ticket_url, concert_idx):
+        future = Future()
+        future.set_exception(RuntimeError("BrowserType.launch: Executable doesn't exist"))
+        return future
+    
+    def close(self):
+        pass
+
+
+def test_pool_failure_keeps_the_row(monkeypatch, tmp_path, raw_card):
+    def load_listing_http(base_url, html_pages=None, on_cards=None):
+        cards = [raw_card()]
+        on_cards(cards)
+        return cards
+    
+    monkeypatch.setattr(concerts_parser, "TicketPagePool", FailingPool)
+    monkeypatch.setattr(concerts_parser, "load_listing_http", load_listing_http)
+    jsonl_path = tmp_path / "concerts.jsonl"
+    journal_path = tmp_path / "journal.sqlite3"
+    
+    summary = concerts_parser.parse_concerts(engine="http", cache_path=None, history_dir=None, metrics_json=None,
+                                             metrics_prom=None, profile_path=None, write_xlsx=False,
+                                             jsonl_path=str(jsonl_path), journal_path=str(journal_path))
+    
+    [line] = jsonl_path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(line)["status"] == TicketStatus.TIMED_OUT
+    assert summary["timed_out"] == 1
+    # Запуск остается незавершенным, концерт не отмечен: --resume загрузит его снова
+    with sqlite3.connect(journal_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone() == (1,)
+        assert conn.execute("SELECT COUNT(*) FROM done").fetchone() == (0,)
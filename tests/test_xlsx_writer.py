@@ -0,0 +1,50 @@
+"""Потоковая запись XLSX: разметка листа и контрольные точки"""
+
+from openpyxl import load_workbook
+
+from concerts_parser import XLSX_HEADERS, XLSX_SHEET_TITLE, ConcertRecord, ConcertXlsxWriter, TicketStatus
+
+
+def concert(number):
+    return ConcertRecord(key=f"https://qtickets.ru/event/{number}", date_text=f"{number} декабря", city="Москве",
+                         venue="ДК Горбунова", program="Хиты Queen", status=TicketStatus.ON_SALE,
+                         available_seats=number * 10)
+
+
+def sheet_rows(path):
+    return [list(row) for row in load_workbook(path).active.iter_rows(values_only=True)]
+
+
+def test_layout_and_styles(tmp_path):
+    path = tmp_path / "concerts.xlsx"
+    
+    with ConcertXlsxWriter(path, batch_size=2) as writer:
+        for number in (1, 2, 3):
+            writer.add(concert(number))
+    
+    ws = load_workbook(path).active
+    assert ws.title == XLSX_SHEET_TITLE
+    assert ws.freeze_panes == "A2"
+    assert ws.column_dimensions["C"].width == 35
+    assert [cell.value for cell in ws[1]] == XLSX_HEADERS
+    assert [cell.value for cell in ws[2]] == ["1 декабря", "Москве", "ДК Горбунова", "Хиты Queen", "Продаются", 10]
+    assert ws.max_row == 4
+    # Четные строки Excel - с заливкой, Дата по центру, Площадка по левому краю
+    assert ws["A1"].style == ConcertXlsxWriter.HEADER_STYLE
+    assert ws["A2"].style == "concert_center_even"
+    assert ws["C3"].style == "concert_left"
+
+
+def test_checkpoint_leaves_a_valid_file_before_close(tmp_path):
+    path = tmp_path / "concerts.xlsx"
+    writer = ConcertXlsxWriter(path, batch_size=10, checkpoint_every=2)
+    assert sheet_rows(path) == [XLSX_HEADERS]
+    
+    for number in (1, 2, 3):
+        writer.add(concert(number))
+    # Процесс убит после третьей строки: в файле - снимок на последней контрольной точке
+    assert [row[0] for row in sheet_rows(path)[1:]] == ["1 декабря", "2 декабря"]
+    
+    writer.close()
+    assert [row[0] for row in sheet_rows(path)[1:]] == ["1 декабря", "2 декабря", "3 декабря"]
+    assert not (tmp_path / "concerts.xlsx.tmp").exists()